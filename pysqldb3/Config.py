@@ -1,9 +1,12 @@
+import configparser
+import functools
 import os
-import pyodbc
 import re
 from collections import defaultdict
 from dataclasses import dataclass
 
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.cfg')
+
 
 class SqlDriver:
     def __str__(self):
@@ -40,6 +43,9 @@ class SqlDriver:
 
     @staticmethod
     def get_drivers():
+        # Only needed when the config is missing its driver section, so pyodbc is imported here
+        import pyodbc
+
         odbc_drivers = list()
         native_drivers = list()
         if 'ODBC Driver' not in pyodbc.drivers():
@@ -58,7 +64,7 @@ class SqlDriver:
 
 
 def get_gdal_data_path():
-    return os.environ["GDAL_DATA"]
+    return os.environ.get("GDAL_DATA", '')
 
 
 def read_config(confi_path='.\config.cfg'):
@@ -88,8 +94,11 @@ def write_config(confi_path='.\config.cfg'):
     }
     existing_sections = read_config(confi_path)
 
+    changed = not os.path.isfile(confi_path)
+
     for rec_section in required_sections.keys():
         if rec_section not in existing_sections.keys():
+            changed = True
             if rec_section == 'ODBC Drivers':
                 odbc = SqlDriver()
                 existing_sections[rec_section]['ODBC_DRIVER']=odbc.odbc_driver
@@ -101,16 +110,33 @@ def write_config(confi_path='.\config.cfg'):
                 open_config = True
                 existing_sections[rec_section]=required_sections[rec_section]
 
-    with open(confi_path, 'w') as f:
-        for section in existing_sections.keys():
-            f.write(f'\n[{section}]\n')
-            for k in existing_sections[section].keys():
-                f.write(f'{k}={existing_sections[section][k]}\n')
+    # Only rewrite the file if something was added
+    if changed:
+        with open(confi_path, 'w') as f:
+            for section in existing_sections.keys():
+                f.write(f'\n[{section}]\n')
+                for k in existing_sections[section].keys():
+                    f.write(f'{k}={existing_sections[section][k]}\n')
     if open_config:
         os.startfile(confi_path)
     return existing_sections
 
 
+@functools.lru_cache(maxsize=None)
+def get_config(confi_path=CONFIG_PATH):
+    """
+    Reads the package config, writing any missing sections first. Runs once per path and is cached after that, so
+    driver discovery and config writing only happen the first time the config is needed, not on import.
+    :param confi_path: path to config file
+    :return: ConfigParser
+    """
+    write_config(confi_path=confi_path)
+
+    config = configparser.ConfigParser()
+    config.read(confi_path)
+    return config
+
+
 
 if __name__ == '__main__':
     sections= write_config(confi_path='.\config.cfg')
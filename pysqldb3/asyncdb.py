@@ -0,0 +1,671 @@
+import asyncio
+import csv
+import datetime
+import functools
+import getpass
+import io
+import os
+
+import pandas as pd
+
+from .Config import get_config
+from .query import Query
+from .sql import *
+from .util import *
+
+
+class AsyncQuery:
+    """
+    Query class for use by AsyncDbConnect. Mirrors Query (new/dropped/renamed table parsing, grants, renamed table
+    log updates and auto comments), but is run with await instead of in __init__.
+    """
+
+    def __str__(self):
+        # type (AsyncQuery) -> str
+        """
+        String query info
+        :return: Query print statement (time and results)
+        """
+        records = 0
+
+        if self.data:
+            records = len(self.data)
+
+        return '- Query run {dt}\n Query time: {qt} \n * Returned {r} rows *'.format(
+            dt=datetime.datetime.now(),
+            r=records,
+            qt=self.__query_time_format())
+
+    def __init__(self, dbo, query_string, strict=True, permission=True, temp=True, comment='', no_comment=False,
+                 timeme=True, lock_table=None, internal=False, params=None):
+        """
+        :param dbo: AsyncDbConnect object
+        :param query_string: String sql query to be run
+        :param strict: If true will raise on failed query attempts
+        :param permission: if True, grants select on new tables to public
+        :param temp: if True any new tables will be logged for deletion at a future date
+        :param comment: String to add to default comment
+        :param no_comment: Will not comment on newly created tables
+        :param timeme: Will print time of query
+        :param lock_table: table to lock (access exclusive, nowait) before running the query
+        :param internal: Boolean flag for internal processes
+        :param params: sequence of bind parameters for $1, $2... placeholders
+        """
+        # Explicitly in __init__
+        self.dbo = dbo
+        self.query_string = query_string
+        self.strict = strict
+        self.permission = permission
+        self.temp = temp
+        self.comment = comment
+        self.no_comment = no_comment
+        self.timeme = timeme
+        self.lock_table = lock_table
+        self.internal = internal
+        self.params = params
+
+        # Other initialized variables
+        self.query_start = datetime.datetime.now()
+        self.query_end = datetime.datetime.now()
+        self.query_time = None
+        self.has_data = False
+        self.data_columns = None
+        self.data = None
+        self.new_tables = list()
+        self.renamed_tables = dict()
+        self.dropped_tables = list()
+
+    def __query_time_format(self):
+        # type: (AsyncQuery) -> str
+        """
+        Formats the query duration time string
+        :return:
+        """
+        if self.query_time.seconds < 60:
+            if self.query_time.seconds < 1:
+                return 'Query run in {} microseconds'.format(self.query_time.microseconds)
+            else:
+                return 'Query run in {} seconds'.format(self.query_time.seconds)
+        else:
+            return 'Query run in {} seconds'.format(self.query_time)
+
+    async def __perform_lock_routine(self, conn):
+        if self.lock_table:
+            import asyncpg
+
+            try:
+                print("- Trying to obtain exclusive lock on table {}.".format(self.lock_table))
+                await conn.execute("LOCK TABLE {} IN ACCESS EXCLUSIVE MODE NOWAIT".format(self.lock_table))
+            except asyncpg.exceptions.LockNotAvailableError as a:
+                print("- Failed to obtain exclusive lock on table {}. Try again.".format(self.lock_table))
+                raise a
+
+    async def __execute(self, conn):
+        """
+        Executes the query string. fetch goes through asyncpg's per-connection prepared statement cache, so repeated
+        statements are only parsed and planned once; column names come from the first row, or from the prepared
+        statement when there are no rows. Strings with several statements (which cannot be prepared) are run without
+        results.
+        :param conn: asyncpg connection
+        :return: None
+        """
+        import asyncpg
+
+        try:
+            records = await conn.fetch(self.query_string, *(self.params or ()))
+        except asyncpg.exceptions.PostgresSyntaxError as e:
+            if self.params is not None or 'multiple commands' not in str(e):
+                raise
+            await conn.execute(self.query_string)
+            return
+
+        if records:
+            self.has_data = True
+            self.data_columns = list(records[0].keys())
+            self.data = [tuple(r) for r in records]
+            return
+
+        # No rows: only a prepared statement knows the columns (if any)
+        attributes = (await conn.prepare(self.query_string)).get_attributes()
+
+        if attributes:
+            self.has_data = True
+            self.data_columns = [a.name for a in attributes]
+            self.data = list()
+
+    async def __update_log_for_renamed_table(self, conn, new_schema_table, old_table):
+        _serv, _dab, schema, new_table = parse_table_string(new_schema_table, self.dbo.default_schema, PG)
+
+        log_exists = await self.dbo._internal_query(conn, PG_TABLE_EXISTS_QUERY.format(s=schema,
+                                                                                       t=self.dbo.log_table))
+
+        if log_exists == [(True,)]:
+            await self.dbo._internal_query(conn, "update {s}.{l} set table_name = '{nt}' where table_name = '{ot}'"
+                                           .format(s=schema, l=self.dbo.log_table, nt=new_table, ot=old_table))
+
+    async def __rename_index(self, conn, new_table, old_table):
+        """
+        Renames any indexes associated with a renamed table
+        :param conn: asyncpg connection
+        :param new_table: new table name
+        :param old_table: original table name
+        :return:
+        """
+        server, database, sch, tbl = parse_table_string(new_table, self.dbo.default_schema, PG)
+        old_table = old_table.replace('"', '').replace('\n', '').strip()
+
+        indices = await self.dbo._internal_query(conn, """
+            SELECT indexname
+            FROM pg_indexes
+            WHERE tablename = '{t}'
+            AND schemaname='{s}';
+        """.format(t=tbl, s=sch), strict=True) or []
+
+        for idx in indices:
+            if old_table in idx[0]:
+                new_idx = idx[0].replace(old_table, tbl)
+                await self.dbo._internal_query(conn, 'ALTER INDEX IF EXISTS {s}."{i}" RENAME to "{i2}"'.format(
+                    s=sch, i=idx[0], i2=new_idx))
+
+    async def __auto_comment(self, conn):
+        """
+        Automatically generates comment for tables created with the query
+        :param conn: asyncpg connection
+        :return:
+        """
+        if not self.no_comment:
+            for t in self.new_tables:
+                q = """COMMENT ON TABLE {t} IS 'Created by {u} on {d}\n{cmnt}'""".format(
+                    t=t,
+                    u=self.dbo.user,
+                    d=self.query_start.strftime('%Y-%m-%d %H:%M'),
+                    cmnt=self.comment
+                )
+                await self.dbo._internal_query(conn, q)
+
+    async def run(self, conn):
+        # type: (AsyncQuery, asyncpg.Connection) -> None
+        """
+        Runs SQL query via the same steps as Query
+        :param conn: asyncpg connection
+        :return: None
+        """
+        self.query_start = datetime.datetime.now()
+
+        # 1. Query string replacement for special characters
+        self.query_string = clean_query_special_characters(self.query_string)
+
+        # 2. Lock table, if required, and execute; the transaction is rolled back on failure
+        try:
+            async with conn.transaction():
+                await self.__perform_lock_routine(conn)
+                await self.__execute(conn)
+
+        except Exception as e:
+            print("- Query failed: " + str(e) + '\n\t')
+            print('- Query run {dt}\n\t{q}'.format(
+                dt=datetime.datetime.now(),
+                q=self.query_string))
+
+            if self.strict:
+                raise
+            else:
+                return
+
+        # 3. Document times
+        self.query_end = datetime.datetime.now()
+        self.query_time = self.query_end - self.query_start
+
+        # 4. Run new/dropped/renamed tables routine
+        if not self.internal:
+            self.renamed_tables = Query.query_renames_table(self.query_string, self.dbo.default_schema)
+            self.new_tables = Query.query_creates_table(self.query_string, self.dbo.default_schema, PG)
+            self.dropped_tables = Query.query_drops_table(self.query_string)
+
+            if self.permission:
+                for t in self.new_tables:
+                    await self.dbo._internal_query(conn, 'grant select on {t} to public;'.format(t=t))
+
+            for i in self.renamed_tables.keys():
+                await self.__update_log_for_renamed_table(conn, i, self.renamed_tables[i])
+
+                # Rename index
+                await self.__rename_index(conn, i, self.renamed_tables[i])
+
+                # Add standardized previous table name to dropped tables to remove from log
+                server, database, sch, tbl = parse_table_string(i, self.dbo.default_schema, PG)
+                org_table = get_query_table_schema_name(sch, PG) + '.' + get_query_table_schema_name(
+                    self.renamed_tables[i], PG)
+                self.dropped_tables.append(org_table)
+
+                new_name = get_query_table_schema_name(sch, PG) + '.' + get_query_table_schema_name(tbl, PG)
+
+                # If the standardized previous table name is in this query's new tables, replace with new name
+                if org_table in self.new_tables:
+                    self.new_tables[self.new_tables.index(org_table)] = new_name
+
+                # If the standardized previous table name is in the dbconnects's new tables, replace with new name
+                if org_table in self.dbo.tables_created:
+                    self.dbo.tables_created[self.dbo.tables_created.index(org_table)] = new_name
+
+            if self.timeme:
+                print(self)
+
+            await self.__auto_comment(conn)
+
+    def dfquery(self):
+        """
+        Returns data from query as a Pandas DataFrame
+        :return: Pandas DataFrame of the results of the query
+        """
+        return pd.DataFrame(self.data, columns=self.data_columns)
+
+
+class AsyncDbConnect:
+    """
+    Asyncio database connection class (PostgreSQL only, using asyncpg).
+    Queries share a pool of connections, so many queries can be awaited concurrently without a thread per query.
+    New tables are logged, commented and granted the same way as DbConnect; expired tables are dropped by the
+    cleanup of the next DbConnect made by the same user.
+    """
+
+    def __init__(self, user=None, password=None, server=None, database=None, port=5432, default=False, quiet=False,
+                 pool_min_size=1, pool_max_size=10):
+        # type: (AsyncDbConnect, str, str, str, str, int, bool, bool, int, int) -> None
+        """
+        :params:
+        user (string): default None (current user)
+        password (string): default None (uses PGPASSWORD/pgpass if not provided)
+        server (string): default None
+        database (string): default None
+        port (int): default 5432
+        default (bool): defaults to False; connects to the default database in config.cfg
+        quiet (bool): automatically performs all tasks quietly; defaults to False
+        pool_min_size (int): connections kept open by the pool; defaults to 1
+        pool_max_size (int): maximum connections the pool will open; defaults to 10
+        """
+        # Explicitly in __init__ fn call
+        self.user = user or getpass.getuser()
+        self.password = password
+        self.server = server
+        self.database = database
+        self.port = port
+        self.default_connect = default
+        self.quiet = quiet
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+
+        # Other initialized variables
+        self.type = PG
+        self.pool = None
+        self.queries = list()
+        self.internal_queries = list()
+        self.connection_start = None
+        self.tables_created = list()
+        self.tables_dropped = list()
+        self.data = None
+        self.internal_data = None
+        self.last_query = None
+        self.default_schema = 'public'
+        self.log_table = TEMP_LOG_TABLE.format(self.user)
+
+        self.__get_credentials()
+
+    def __str__(self):
+        # type: (AsyncDbConnect) -> str
+        """
+        :return: string of database connection info
+        """
+        return 'Async database connection ({typ}) to {db} on {srv} - user: {usr} \nConnection established {dt}'.format(
+            typ=self.type,
+            db=self.database,
+            srv=self.server,
+            usr=self.user,
+            dt=self.connection_start
+        )
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    def __get_credentials(self):
+        # type: (AsyncDbConnect) -> None
+        """
+        Gets the default database from config, if requested. Input prompts would block the event loop, so missing
+        details raise an error instead.
+        :return: None
+        """
+        if self.default_connect:
+            if get_config().get('DEFAULT DATABASE', 'type').upper() not in POSTGRES_TYPES:
+                raise ValueError('AsyncDbConnect only supports PostgreSQL; the default database is not PostgreSQL.')
+            self.server = get_config().get('DEFAULT DATABASE', 'server')
+            self.database = get_config().get('DEFAULT DATABASE', 'database')
+
+        if not all((self.server, self.database)):
+            raise ValueError('AsyncDbConnect requires a server and database.')
+
+    async def connect(self, quiet=False):
+        # type: (AsyncDbConnect, bool) -> None
+        """
+        Creates the connection pool
+        :param quiet: if true, does not print connection info
+        :return: None
+        """
+        import asyncpg
+
+        if self.pool:
+            return
+
+        self.pool = await asyncpg.create_pool(user=self.user, password=self.password, host=self.server,
+                                              port=self.port, database=self.database,
+                                              min_size=self.pool_min_size, max_size=self.pool_max_size)
+        self.connection_start = datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+
+        if not quiet and not self.quiet:
+            print(self)
+
+    async def close(self):
+        # type: (AsyncDbConnect) -> None
+        """
+        Closes the connection pool
+        :return: None
+        """
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+
+    async def _internal_query(self, conn, query, strict=False, params=None):
+        # type: (AsyncDbConnect, asyncpg.Connection, str, bool, Sequence) -> Optional[list]
+        """
+        Runs a housekeeping query on the connection of the query that needs it
+        :param conn: asyncpg connection
+        :param query: String sql query to be run
+        :param strict: If true will raise on failure
+        :param params: sequence of bind parameters for $1, $2... placeholders
+        :return: query data
+        """
+        qry = AsyncQuery(self, query, strict=strict, timeme=False, internal=True, params=params)
+        await qry.run(conn)
+
+        self.internal_queries.append(qry)
+        self.internal_data = qry.data
+        return qry.data
+
+    async def __log_temp_table(self, conn, schema, table, expiration):
+        """
+        Writes a table to the temp log to be deleted after the expiration date
+        :param conn: asyncpg connection
+        :param schema: database schema name
+        :param table: table name
+        :param expiration: date after which the table can be deleted
+        :return:
+        """
+        if table == self.log_table:
+            return
+
+        # Check if log exists; if not make one
+        if await self._internal_query(conn, PG_TABLE_EXISTS_QUERY.format(s=schema, t=self.log_table)) != [(True,)]:
+            await self._internal_query(conn, PG_CREATE_LOG_TABLE_QUERY.format(s=schema, log=self.log_table))
+
+        await self._internal_query(conn, numbered_placeholders(PG_ADD_TABLE_TO_LOG_QUERY.format(
+            s=schema,
+            log=self.log_table
+        ))[0], params=(self.user, schema, table, datetime.datetime.now().replace(second=0, microsecond=0),
+                       expiration.date()))
+
+    async def __run_table_logging(self, conn, new_tables, days=7):
+        """
+        Logs new tables made in the query
+        :param conn: asyncpg connection
+        :param new_tables: list of new tables
+        :param days: number of days the tables will be kept
+        :return:
+        """
+        for table in new_tables:
+            server, database, sch, tbl = parse_table_string(table, self.default_schema, PG)
+
+            # All archive tables should default to permanent
+            if sch != 'archive':
+                await self.__log_temp_table(conn, sch, tbl,
+                                            expiration=datetime.datetime.now() + datetime.timedelta(days=days))
+
+    async def __remove_dropped_tables_from_log(self, conn, tables_dropped):
+        """
+        Removes tables dropped in the query from the log
+        :param conn: asyncpg connection
+        :param tables_dropped: list of dropped tables
+        :return:
+        """
+        log_schemas = await self.__get_log_schemas(conn)
+
+        for table_str in tables_dropped:
+            server, database, schema, table = parse_table_string(table_str, self.default_schema, PG)
+
+            if schema in log_schemas:
+                # Delete from log to avoid dropping perm tables with same name
+                await self._internal_query(
+                    conn, """DELETE FROM {s}."{tmp}" WHERE table_schema = '{s}' AND table_name = '{t}'""".format(
+                        s=schema, t=table, tmp=self.log_table))
+
+    async def __get_log_schemas(self, conn):
+        """
+        Gets every schema that has a temp log table for this user
+        :param conn: asyncpg connection
+        :return: list of schema names
+        """
+        return [row[0] for row in await self._internal_query(
+            conn, PG_LOG_SCHEMAS_QUERY.format(log=self.log_table.lower())) or []]
+
+    async def __remove_nonexistent_tables_from_logs(self, conn):
+        """
+        Removes from the log tables any table that no longer exists in the database
+        :param conn: asyncpg connection
+        :return:
+        """
+        log_schemas = await self.__get_log_schemas(conn)
+
+        if log_schemas:
+            await self._internal_query(conn, ';\n'.join([
+                PG_DELETE_NONEXISTENT_FROM_LOG_QUERY.format(s=get_query_table_schema_name(sch, PG), log=self.log_table)
+                for sch in log_schemas]))
+
+    async def query(self, query, strict=True, permission=True, temp=True, timeme=True, no_comment=False, comment='',
+                    lock_table=None, return_df=False, days=7, params=None):
+        # type: (AsyncDbConnect, str, bool, bool, bool, bool, bool, str, str, bool, int, Sequence) -> Union[AsyncQuery, pd.DataFrame]
+        """
+        Runs AsyncQuery object from input SQL string and adds query to queries
+        :param query: String sql query to be run
+        :param strict: If true will raise on failed query attempts
+        :param permission: if True, grants select on new tables to public
+        :param temp: if True any new tables will be logged for deletion at a future date
+        :param timeme: Will print time of query
+        :param no_comment: Will not comment on newly created tables
+        :param comment: String to add to default comment
+        :param lock_table: table to lock before running the query
+        :param return_df: boolean that returns Pandas dataframe of data if true (defaults to false)
+        :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
+        :param params: sequence of bind parameters for $1, $2... placeholders
+        :return: AsyncQuery (self.data only holds the most recent of concurrent queries), or DataFrame if return_df
+        """
+        if not self.pool:
+            await self.connect(True)
+
+        # The query and its housekeeping queries run on one connection from the pool
+        async with self.pool.acquire() as conn:
+            qry = AsyncQuery(self, query, strict=strict, permission=permission, temp=temp, timeme=timeme,
+                             no_comment=no_comment, comment=comment, lock_table=lock_table, params=params)
+            await qry.run(conn)
+
+            self.queries.append(qry)
+            self.data = qry.data
+            self.tables_created += [nt for nt in qry.new_tables]
+            self.tables_dropped += [dt for dt in qry.dropped_tables]
+            self.last_query = qry.query_string
+
+            if qry.dropped_tables:
+                await self.__remove_dropped_tables_from_log(conn, qry.dropped_tables)
+
+            if qry.temp and qry.new_tables:
+                await self.__run_table_logging(conn, qry.new_tables, days=days)
+                await self.__remove_nonexistent_tables_from_logs(conn)
+
+        if return_df:
+            return qry.dfquery()
+
+        return qry
+
+    async def dfquery(self, query, strict=False, permission=True, temp=True, timeme=False, no_comment=False,
+                      comment='', lock_table=None, days=7, params=None):
+        """
+        Runs AsyncQuery object from input SQL string and adds query to queries. Outputs as a dataframe.
+        For dfquery, timeme and strict are default set to FALSE.
+        :param query: String sql query to be run
+        :param strict: If true will raise on failed query attempts
+        :param permission: if True, grants select on new tables to public
+        :param temp: if True any new tables will be logged for deletion at a future date
+        :param timeme: Will print time of query
+        :param no_comment: Will not comment on newly created tables
+        :param comment: String to add to default comment
+        :param lock_table: table to lock before running the query
+        :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
+        :param params: sequence of bind parameters for $1, $2... placeholders
+        :return: Pandas DataFrame
+        """
+        return await self.query(query, timeme=timeme, permission=permission, temp=temp, strict=strict,
+                                no_comment=no_comment, comment=comment, lock_table=lock_table, return_df=True,
+                                days=days, params=params)
+
+    async def drop_table(self, schema, table, cascade=False, strict=True):
+        # type: (AsyncDbConnect, str, str, bool, bool) -> None
+        """
+        Drops table from database and removes from the temp log table
+        :param schema: schema
+        :param table: table name
+        :param cascade: boolean if want to cascade
+        :param strict: boolean; defaults to True to raise on failure
+        :return:
+        """
+        await self.query('DROP TABLE IF EXISTS {}.{} {}'.format(schema, table, 'CASCADE' if cascade else ''),
+                         timeme=False, strict=strict)
+
+    async def query_to_csv(self, query, strict=True, output_file=None, open_file=False, sep=',', quote_strings=True,
+                           quiet=False):
+        """
+        Exports query results to a csv file.
+        :param query: SQL query as string type
+        :param strict: If true will raise on failed query attempts
+        :param output_file: File path for resulting csv file
+        :param open_file: If true will auto open the output csv file when done
+        :param sep: Delimiter for csv; defaults to comma (,)
+        :param quote_strings: Defaults to True (csv.QUOTE_ALL); if False, will csv.QUOTE_MINIMAL
+        :param quiet: if true, does not output query metrics or output location
+        :return:
+        """
+        # If no output specified, defaults to a generic data csv name with the date
+        if not output_file:
+            output_file = os.path.join(os.getcwd(),
+                                       'data_{}.csv'.format(datetime.datetime.now().strftime('%Y%m%d%H%M')))
+
+        qry = await self.query(query, strict=strict, timeme=(not quiet))
+
+        if not quiet:
+            print('Writing to %s' % output_file)
+
+        df = clean_df_before_output(qry.dfquery())
+
+        # Writing the file is blocking, so it is handed to the default executor
+        await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+            df.to_csv, output_file, index=False, quoting=csv.QUOTE_ALL if quote_strings else csv.QUOTE_MINIMAL,
+            sep=sep, encoding='utf8'))
+
+        if open_file:
+            os.startfile(output_file)
+
+    async def dataframe_to_table_schema(self, df, table, schema=None, overwrite=False, temp=True,
+                                        allow_max_varchar=False, column_type_overrides=None, days=7):
+        """
+        Translates Pandas DataFrame into empty database table.
+        :param df: Pandas DataFrame to be added to database
+        :param table: Table name to be used in database
+        :param schema: Database schema to use for destination in database (defaults to public)
+        :param overwrite: If table exists in database will overwrite if True (defaults to False)
+        :param temp: Optional flag to make table as not-temporary (defaults to True)
+        :param allow_max_varchar: Boolean to allow unlimited/max varchar columns; defaults to False
+        :param column_type_overrides: Dict of type key=column name, value=column type.
+        :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
+        :return: Table schema that was created from DataFrame
+        """
+        if not schema:
+            schema = self.default_schema
+
+        if allow_max_varchar:
+            allowed_length = VARCHAR_MAX[PG]
+        else:
+            allowed_length = 500
+
+        input_schema = list()
+
+        # Parse df for schema
+        for col_name, col_type in df.dtypes.items():
+            if column_type_overrides and col_name in column_type_overrides.keys():
+                input_schema.append([clean_column(col_name), column_type_overrides[col_name]])
+            else:
+                input_schema.append([clean_column(col_name), type_decoder(col_type, varchar_length=allowed_length)])
+
+        if overwrite:
+            await self.drop_table(schema=schema, table=table)
+
+        # Create table in database
+        qry = """
+                CREATE TABLE {s}.{t} (
+                {cols}
+                )
+        """.format(s=schema, t=table,
+                   cols=str(['"' + str(i[0]) + '" ' + i[1] for i in input_schema])[1:-1].replace("'", ""))
+
+        await self.query(qry.replace('\n', ' '), timeme=False, temp=temp, days=days)
+        return input_schema
+
+    async def dataframe_to_table(self, df, table, table_schema=None, schema=None, overwrite=False, temp=True,
+                                 allow_max_varchar=False, column_type_overrides=None, days=7):
+        """
+        Adds data from Pandas DataFrame to existing table, using COPY
+        :param df: Pandas DataFrame to be added to database
+        :param table: Table name to be used in database
+        :param table_schema: schema of dataframe (returned from dataframe_to_table_schema)
+        :param schema: Database schema to use for destination in database (defaults to public)
+        :param overwrite: If table exists in database will overwrite if True (defaults to False)
+        :param temp: Optional flag to make table temporary (defaults to True)
+        :param allow_max_varchar: Boolean to allow unlimited/max varchar columns; defaults to False
+        :param column_type_overrides: Dict of type key=column name, value=column type.
+                **Will not override a custom table_schema, if inputted**
+        :param days: if temp=True and table schema needs to be created, the number of days that the temp table will be
+                     kept. Defaults to 7.
+        :return: None
+        """
+        if not schema:
+            schema = self.default_schema
+
+        if not table_schema:
+            table_schema = await self.dataframe_to_table_schema(df, table, overwrite=overwrite, schema=schema,
+                                                                temp=temp, allow_max_varchar=allow_max_varchar,
+                                                                column_type_overrides=column_type_overrides,
+                                                                days=days)
+
+        # Nulls are written as \N so they are not confused with empty strings
+        data = df.to_csv(index=False, header=False, na_rep='\\N').encode('utf8')
+
+        if not self.pool:
+            await self.connect(True)
+
+        async with self.pool.acquire() as conn:
+            result = await conn.copy_to_table(get_unique_table_schema_string(table, PG),
+                                              source=io.BytesIO(data),
+                                              columns=[str(i[0]) for i in table_schema],
+                                              schema_name=get_unique_table_schema_string(schema, PG),
+                                              format='csv', null='\\N')
+
+        print('\n{c} rows added to {s}.{t}\n'.format(c=result.split()[-1], s=schema, t=table))
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+
+TABLE_EXISTS = 'table_exists'
+TABLE_COLUMNS = 'table_columns'
+SCHEMAS = 'schemas'
+
+
+class MetadataCache:
+    """
+    Per-connection cache for catalog lookups (table_exists, get_table_columns, get_schemas) used by DbConnect.
+    Entries expire after ttl seconds and the least recently used entry is evicted once max_size is reached.
+
+    Keys are tuples starting with the kind of lookup; table lookups are keyed as
+    (kind, schema, table, ...) so they can be invalidated by schema and table name.
+    """
+
+    def __str__(self):
+        return 'Metadata cache - {n} entries, {h} hits / {m} misses'.format(
+            n=len(self.entries),
+            h=self.hits,
+            m=self.misses
+        )
+
+    def __init__(self, ttl=60, max_size=256):
+        """
+        :param ttl: seconds an entry is valid for (defaults to 60)
+        :param max_size: maximum number of entries kept (defaults to 256)
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+
+        # Other initialized variables
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Gets a cached value
+        :param key: tuple key
+        :return: cached value, or None if missing or expired
+        """
+        with self.__lock:
+            entry = self.entries.get(key)
+
+            if entry is None or entry[1] < time.time():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        """
+        Caches a value, evicting the least recently used entry if full
+        :param key: tuple key
+        :param value: value to cache (None is not cached)
+        :return: None
+        """
+        if value is None:
+            return
+
+        with self.__lock:
+            self.entries[key] = (value, time.time() + self.ttl)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate_table(self, schema, table):
+        """
+        Removes every entry for a table (existence and columns, on any server/database)
+        :param schema: cleaned schema name
+        :param table: cleaned table name
+        :return: None
+        """
+        with self.__lock:
+            for key in [k for k in self.entries if k[0] != SCHEMAS and k[1] == schema and k[2] == table]:
+                del self.entries[key]
+
+    def invalidate(self, kind=None):
+        """
+        Removes every entry of a kind of lookup, or all entries if kind is None
+        :param kind: TABLE_EXISTS, TABLE_COLUMNS or SCHEMAS
+        :return: None
+        """
+        with self.__lock:
+            if not kind:
+                self.entries.clear()
+            else:
+                for key in [k for k in self.entries if k[0] == kind]:
+                    del self.entries[key]
+
+
+class StatementCache:
+    """
+    LRU cache of prepared statements for one connection, used by Query for queries run with params.
+    Handles are statement names (PG PREPARE/EXECUTE) or cursors that have already prepared the statement (pyodbc
+    reuses a cursor's prepared statement when the same sql is executed again).
+    """
+
+    def __str__(self):
+        return 'Statement cache - {n} statements, {h} hits / {m} misses'.format(
+            n=len(self.statements),
+            h=self.hits,
+            m=self.misses
+        )
+
+    def __init__(self, max_size=100):
+        """
+        :param max_size: maximum number of prepared statements kept (defaults to 100)
+        """
+        self.max_size = max_size
+
+        # Other initialized variables
+        self.statements = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__counter = 0
+
+    def next_name(self):
+        """
+        Statement names are never reused, so a statement that outlives its cache entry cannot clash with a new one
+        :return: unique statement name
+        """
+        self.__counter += 1
+        return 'pysqldb_stmt_{}'.format(self.__counter)
+
+    def get(self, sql):
+        """
+        Gets the handle for a prepared statement
+        :param sql: query string
+        :return: handle, or None if the statement has not been prepared
+        """
+        handle = self.statements.get(sql)
+
+        if handle is None:
+            self.misses += 1
+            return None
+
+        self.statements.move_to_end(sql)
+        self.hits += 1
+        return handle
+
+    def add(self, sql, handle):
+        """
+        Adds a prepared statement
+        :param sql: query string
+        :param handle: statement name or cursor
+        :return: list of handles evicted to stay within max_size (to be deallocated/closed by the caller)
+        """
+        self.statements[sql] = handle
+        self.statements.move_to_end(sql)
+
+        evicted = list()
+        while len(self.statements) > self.max_size:
+            evicted.append(self.statements.popitem(last=False)[1])
+
+        return evicted
+
+    def remove(self, sql):
+        """
+        Removes a statement (ex. after a failure, when it may not exist on the server)
+        :param sql: query string
+        :return: handle, or None
+        """
+        return self.statements.pop(sql, None)
@@ -55,7 +55,7 @@ def pg_to_sql(pg, ms, org_table, LDAP=False, spatial=True, org_schema=None, dest
             spatial=spatial,
             dest_name=dest_table,
             nlt_spatial=nlt_spatial,
-            gdal_data=GDAL_DATA_LOC
+            gdal_data=get_gdal_data_loc()
         )
     else:
         cmd = PG_TO_SQL_CMD.format(
@@ -74,7 +74,7 @@ def pg_to_sql(pg, ms, org_table, LDAP=False, spatial=True, org_schema=None, dest
             spatial=spatial,
             dest_name=dest_table,
             nlt_spatial=nlt_spatial,
-            gdal_data=GDAL_DATA_LOC
+            gdal_data=get_gdal_data_loc()
         )
 
     if print_cmd:
@@ -89,6 +89,7 @@ def pg_to_sql(pg, ms, org_table, LDAP=False, spatial=True, org_schema=None, dest
         raise subprocess.CalledProcessError(cmd=print_cmd_string([ms.password, pg.password], cmd), returncode=1)
 
     ms.tables_created.append(dest_schema + "." + dest_table)
+    ms.invalidate_metadata(dest_table, schema=dest_schema)
 
     if temp:
         ms.log_temp_table(dest_schema, dest_table, ms.user)
@@ -142,7 +143,7 @@ def sql_to_pg_qry(ms, pg, query, LDAP=False, spatial=True, dest_schema=None, pri
             spatial=spatial,
             table_name=dest_table,
             nlt_spatial=nlt_spatial,
-            gdal_data=GDAL_DATA_LOC
+            gdal_data=get_gdal_data_loc()
         )
     else:
         cmd = SQL_TO_PG_QRY_CMD.format(
@@ -161,7 +162,7 @@ def sql_to_pg_qry(ms, pg, query, LDAP=False, spatial=True, dest_schema=None, pri
             spatial=spatial,
             table_name=dest_table,
             nlt_spatial=nlt_spatial,
-            gdal_data=GDAL_DATA_LOC
+            gdal_data=get_gdal_data_loc()
         )
 
     if print_cmd:
@@ -182,13 +183,14 @@ def sql_to_pg_qry(ms, pg, query, LDAP=False, spatial=True, dest_schema=None, pri
     clean_geom_column(pg, dest_table, dest_schema)
 
     pg.tables_created.append(dest_schema + "." + dest_table)
+    pg.invalidate_metadata(dest_table, schema=dest_schema)
 
     if temp:
         pg.log_temp_table(dest_schema, dest_table, pg.user)
 
 
 def sql_to_pg(ms, pg, org_table, LDAP=False, spatial=True, org_schema=None, dest_schema=None, print_cmd=False,
-              dest_table=None, temp=True, gdal_data_loc=GDAL_DATA_LOC, pg_encoding='UTF8'):
+              dest_table=None, temp=True, gdal_data_loc=None, pg_encoding='UTF8'):
     """
     Migrates tables from SQL Server to PostgreSQL, generates spatial tables in PG if spatial in MS.
 
@@ -202,10 +204,13 @@ def sql_to_pg(ms, pg, org_table, LDAP=False, spatial=True, org_schema=None, dest
     :param print_cmd: Option to print he ogr2ogr command line statement (defaults to False) - used for debugging
     :param dest_table: Table name of final migrated table in PostgreSQL database
     :param temp: flag, defaults to true, for temporary tables
-    :param gdal_data_loc: location of GDAL data
+    :param gdal_data_loc: location of GDAL data (defaults to the location in the config)
     :param pg_encoding: encoding to use for PG client (defaults to UTF-8)
     :return:
     """
+    if not gdal_data_loc:
+        gdal_data_loc = get_gdal_data_loc()
+
     if not org_schema:
         org_schema = ms.default_schema
 
@@ -283,6 +288,7 @@ def sql_to_pg(ms, pg, org_table, LDAP=False, spatial=True, org_schema=None, dest
     clean_geom_column(pg, dest_table, dest_schema)
 
     pg.tables_created.append(dest_schema + "." + dest_table)
+    pg.invalidate_metadata(dest_table, schema=dest_schema)
 
     if temp:
         pg.log_temp_table(dest_schema, dest_table, pg.user)
@@ -333,7 +339,7 @@ def pg_to_pg(from_pg, to_pg, org_table, org_schema=None, dest_schema=None, print
         from_pg_table=org_table,
         to_pg_name=dest_table,
         nlt_spatial=nlt_spatial,
-        gdal_data=GDAL_DATA_LOC
+        gdal_data=get_gdal_data_loc()
     )
 
     if print_cmd:
@@ -350,6 +356,7 @@ def pg_to_pg(from_pg, to_pg, org_table, org_schema=None, dest_schema=None, print
     clean_geom_column(to_pg, dest_table, dest_schema)
 
     to_pg.tables_created.append(dest_schema + "." + dest_table)
+    to_pg.invalidate_metadata(dest_table, schema=dest_schema)
 
     if temp:
         to_pg.log_temp_table(dest_schema, dest_table, to_pg.user)
@@ -398,7 +405,7 @@ def pg_to_pg_qry(from_pg, to_pg, query, dest_schema=None, print_cmd=False, dest_
         to_pg_schema=dest_schema,
         to_pg_name=dest_table,
         nlt_spatial=nlt_spatial,
-        gdal_data=GDAL_DATA_LOC
+        gdal_data=get_gdal_data_loc()
     )
 
     if print_cmd:
@@ -415,6 +422,7 @@ def pg_to_pg_qry(from_pg, to_pg, query, dest_schema=None, print_cmd=False, dest_
     clean_geom_column(to_pg, dest_table, dest_schema)
 
     to_pg.tables_created.append(dest_schema + "." + dest_table)
+    to_pg.invalidate_metadata(dest_table, schema=dest_schema)
 
     if temp:
         to_pg.log_temp_table(dest_schema, dest_table, to_pg.user)
\ No newline at end of file
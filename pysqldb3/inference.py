@@ -0,0 +1,220 @@
+import numpy as np
+import pandas as pd
+
+from .util import MS, PG, varchar_type
+
+# Leading zeros (ex. zip codes) are kept as text
+INT_PATTERN = r'[+-]?(?:0|[1-9]\d*)'
+DECIMAL_PATTERN = r'[+-]?(?:(?:0|[1-9]\d*)(?:\.\d*)?|\.\d+)'
+FLOAT_PATTERN = DECIMAL_PATTERN + r'(?:[eE][+-]?\d+)?'
+DATE_PATTERN = r'\d{4}-\d{2}-\d{2}'
+TIMESTAMP_PATTERN = r'\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?'
+BOOLEAN_VALUES = ['true', 'false']
+
+SMALLINT_RANGE = (-32768, 32767)
+INT_RANGE = (-2147483648, 2147483647)
+BIGINT_DIGITS = 18
+NUMERIC_MAX_PRECISION = 38
+
+TYPE_NAMES = {
+    PG: {'integer': 'integer', 'boolean': 'boolean', 'timestamp': 'timestamp', 'numeric_max': 'numeric'},
+    MS: {'integer': 'int', 'boolean': 'bit', 'timestamp': 'datetime2', 'numeric_max': 'float'}
+}
+
+
+class TypeInference:
+    """
+    Infers the narrowest database type for each column of delimited text data, fed in as chunks of string
+    DataFrames (ex. pd.read_csv(..., dtype=str, chunksize=...)). Picks smallint/integer/bigint, numeric (p, s), float,
+    boolean, date or timestamp where every non-null value fits, and otherwise varchar sized to the longest value.
+
+    By default every row is profiled. With sample_size, a reservoir sample of that many rows is kept instead and
+    profiled by types(); types inferred from a sample may be too narrow for rows outside of it.
+    """
+
+    def __str__(self):
+        return 'Type inference - {r} rows seen, {c} columns{s}'.format(
+            r=self.rows,
+            c=len(self.profiles),
+            s=', sample of {}'.format(self.sample_size) if self.sample_size else ''
+        )
+
+    def __init__(self, db_type, sample_size=None, random_state=None):
+        """
+        :param db_type: PG or MS; sets the type names used
+        :param sample_size: number of rows to sample; if None (default), profiles every row
+        :param random_state: seed for the reservoir sample
+        """
+        if db_type not in TYPE_NAMES:
+            raise ValueError('db_type must be {} or {}.'.format(PG, MS))
+
+        self.db_type = db_type
+        self.sample_size = sample_size
+
+        # Other initialized variables
+        self.rows = 0
+        self.profiles = dict()
+        self.reservoir = None
+        self.__random = np.random.default_rng(random_state)
+
+    def update(self, chunk):
+        """
+        Adds a chunk of rows
+        :param chunk: DataFrame of str values (nulls as NaN/None)
+        :return: None
+        """
+        if self.sample_size:
+            self.__sample(chunk)
+        else:
+            self.__profile(chunk)
+
+        self.rows += len(chunk)
+
+    def types(self):
+        """
+        :return: dict of column name: type, in column order; usable as column_type_overrides
+        """
+        if self.sample_size and self.reservoir is not None:
+            self.profiles = dict()
+            self.__profile(self.reservoir)
+
+        return {col: self.__column_type(profile) for col, profile in self.profiles.items()}
+
+    def __sample(self, chunk):
+        """
+        Reservoir sampling (algorithm R), vectorized over the chunk
+        :param chunk: DataFrame of str values
+        :return: None
+        """
+        chunk = chunk.reset_index(drop=True)
+        seen = self.rows
+
+        # Fill the reservoir with the first sample_size rows
+        if self.reservoir is None:
+            self.reservoir = chunk.iloc[:0].copy()
+
+        fill = min(self.sample_size - len(self.reservoir), len(chunk))
+        if fill > 0:
+            self.reservoir = pd.concat([self.reservoir, chunk.iloc[:fill]], ignore_index=True)
+            chunk = chunk.iloc[fill:]
+            seen += fill
+
+        if chunk.empty:
+            return
+
+        # Row i (0-based over the whole input) replaces a random slot j <= i if j falls inside the reservoir
+        slots = self.__random.integers(0, seen + np.arange(len(chunk)) + 1)
+        keep = slots < self.sample_size
+
+        # Later rows overwrite earlier ones that drew the same slot
+        replacements = pd.Series(np.flatnonzero(keep), index=slots[keep])
+        replacements = replacements[~replacements.index.duplicated(keep='last')]
+        self.reservoir.iloc[replacements.index.values] = chunk.iloc[replacements.values].values
+
+    def __profile(self, chunk):
+        """
+        Updates the per column profiles with a chunk
+        :param chunk: DataFrame of str values
+        :return: None
+        """
+        for col in chunk.columns:
+            profile = self.profiles.setdefault(col, {
+                'values': 0, 'length': 0, 'boolean': True, 'int': True, 'min': 0, 'max': 0, 'decimal': True,
+                'digits': 0, 'scale': 0, 'float': True, 'date': True, 'timestamp': True
+            })
+
+            values = chunk[col].dropna().astype(str)
+            if values.empty:
+                continue
+
+            profile['values'] += len(values)
+            profile['length'] = max(profile['length'], int(values.str.len().max()))
+            values = values.str.strip()
+
+            if profile['boolean']:
+                profile['boolean'] = bool(values.str.lower().isin(BOOLEAN_VALUES).all())
+
+            if profile['decimal']:
+                profile['decimal'] = bool(values.str.fullmatch(DECIMAL_PATTERN).all())
+
+            if profile['decimal']:
+                parts = values.str.lstrip('+-').str.partition('.')
+                profile['digits'] = max(profile['digits'], int(parts[0].str.lstrip('0').str.len().max()))
+                profile['scale'] = max(profile['scale'], int(parts[2].str.len().max()))
+
+            if profile['int']:
+                profile['int'] = profile['decimal'] and bool(values.str.fullmatch(INT_PATTERN).all())
+
+            if profile['int'] and profile['digits'] <= BIGINT_DIGITS:
+                numbers = pd.to_numeric(values)
+                profile['min'] = min(profile['min'], int(numbers.min()))
+                profile['max'] = max(profile['max'], int(numbers.max()))
+
+            if profile['float'] and not profile['decimal']:
+                profile['float'] = bool(values.str.fullmatch(FLOAT_PATTERN).all())
+
+            if profile['timestamp']:
+                profile['timestamp'] = bool(values.str.fullmatch(TIMESTAMP_PATTERN).all()) and \
+                    bool(pd.to_datetime(values, errors='coerce').notnull().all())
+                profile['date'] = profile['date'] and profile['timestamp'] and \
+                    bool(values.str.fullmatch(DATE_PATTERN).all())
+            else:
+                profile['date'] = False
+
+    def __column_type(self, profile):
+        """
+        :param profile: column profile
+        :return: narrowest type that fits every value seen
+        """
+        names = TYPE_NAMES[self.db_type]
+
+        # No values to go on
+        if not profile['values']:
+            return 'varchar (500)'
+
+        if profile['boolean']:
+            return names['boolean']
+
+        if profile['int'] and profile['digits'] <= BIGINT_DIGITS:
+            if SMALLINT_RANGE[0] <= profile['min'] and profile['max'] <= SMALLINT_RANGE[1]:
+                return 'smallint'
+            if INT_RANGE[0] <= profile['min'] and profile['max'] <= INT_RANGE[1]:
+                return names['integer']
+            return 'bigint'
+
+        if profile['decimal']:
+            precision = max(profile['digits'] + profile['scale'], 1)
+            if precision <= NUMERIC_MAX_PRECISION:
+                return 'numeric ({p}, {s})'.format(p=precision, s=profile['scale'])
+            return names['numeric_max']
+
+        if profile['float']:
+            return 'float'
+
+        if profile['date']:
+            return 'date'
+
+        if profile['timestamp']:
+            return names['timestamp']
+
+        return varchar_type(profile['length'], self.db_type)
+
+
+def infer_csv_types(input_file, db_type, sep=',', sample_size=None, chunksize=100000, random_state=None):
+    """
+    Streams a csv file through TypeInference. Only empty cells are treated as nulls, as in COPY and ogr2ogr loads.
+    :param input_file: csv file path
+    :param db_type: PG or MS
+    :param sep: Separator for csv file, defaults to comma (,)
+    :param sample_size: number of rows to sample; if None (default), profiles every row
+    :param chunksize: number of rows read at a time (defaults to 100,000)
+    :param random_state: seed for the reservoir sample
+    :return: dict of raw column name: type; usable as column_type_overrides
+    """
+    inference = TypeInference(db_type, sample_size=sample_size, random_state=random_state)
+
+    for chunk in pd.read_csv(input_file, sep=sep, dtype=str, keep_default_na=False, na_values=[''],
+                             chunksize=chunksize):
+        inference.update(chunk)
+
+    return inference.types()
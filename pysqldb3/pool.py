@@ -0,0 +1,202 @@
+import threading
+import time
+
+
+class ConnectionPool:
+    """
+    Simple thread-safe connection pool used by DbConnect when use_pool=True.
+    Connections are opened with the connect function passed in by the DbConnect object, handed out with acquire and
+    handed back with release instead of being closed after every query.
+    """
+
+    def __str__(self):
+        return 'Connection pool - {i} idle / {u} in use (min {mn}, max {mx})'.format(
+            i=len(self.idle),
+            u=self.in_use,
+            mn=self.min_size,
+            mx=self.max_size
+        )
+
+    def __init__(self, connect_fn, min_size=1, max_size=5, idle_timeout=300, pre_ping=True, timeout=30):
+        """
+        :param connect_fn: function that takes no arguments and returns a new DBAPI connection
+        :param min_size: number of connections kept open, even when idle (defaults to 1)
+        :param max_size: maximum number of connections open at once (defaults to 5)
+        :param idle_timeout: seconds an idle connection (above min_size) is kept before being closed (defaults to 300)
+        :param pre_ping: if True, checks a connection with a lightweight query before handing it out (defaults to True)
+        :param timeout: seconds to wait for a free connection when max_size is reached (defaults to 30)
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError('Pool sizes must satisfy 0 <= min_size <= max_size and max_size >= 1.')
+
+        self.connect_fn = connect_fn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+        self.timeout = timeout
+
+        # Other initialized variables
+        self.idle = list()
+        self.in_use = 0
+        self.connections_opened = 0
+        self.connections_reused = 0
+        self.closed = False
+        self.__lock = threading.Condition()
+
+        for _ in range(self.min_size):
+            self.idle.append((self.__open(), time.time()))
+
+    @property
+    def size(self):
+        """
+        :return: total number of open connections (idle and in use)
+        """
+        return len(self.idle) + self.in_use
+
+    def __open(self):
+        """
+        Opens a new connection through the connect function
+        :return: DBAPI connection
+        """
+        conn = self.connect_fn()
+        self.connections_opened += 1
+        return conn
+
+    @staticmethod
+    def __close(conn):
+        """
+        Closes a connection, ignoring errors from connections that are already dead
+        :param conn: DBAPI connection
+        :return: None
+        """
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def is_alive(conn):
+        """
+        Pings the connection with a lightweight query
+        :param conn: DBAPI connection
+        :return: bool
+        """
+        if getattr(conn, 'closed', 0):
+            return False
+
+        try:
+            cur = conn.cursor()
+            cur.execute('SELECT 1')
+            cur.fetchall()
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def __prune_idle(self):
+        """
+        Closes idle connections past the idle timeout, keeping at least min_size connections open.
+        Must be called with the lock held.
+        :return: None
+        """
+        now = time.time()
+        keep = list()
+
+        # Oldest connections are at the front of the idle list
+        for conn, last_used in self.idle:
+            if now - last_used >= self.idle_timeout and len(self.idle) - len(keep) + self.in_use > self.min_size:
+                self.__close(conn)
+            else:
+                keep.append((conn, last_used))
+
+        self.idle = keep
+
+    def acquire(self):
+        """
+        Borrows a connection from the pool, opening a new one if none are idle and the pool is not full.
+        :return: DBAPI connection
+        """
+        deadline = time.time() + self.timeout
+
+        with self.__lock:
+            if self.closed:
+                raise RuntimeError('Connection pool has been closed.')
+
+            self.__prune_idle()
+
+            while not self.idle and self.size >= self.max_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise RuntimeError('Timed out waiting for a free connection (pool max_size={}).'.format(
+                        self.max_size))
+                self.__lock.wait(remaining)
+
+            if self.idle:
+                # Most recently used connection is the most likely to still be alive
+                conn, _ = self.idle.pop()
+                self.in_use += 1
+                reused = True
+            else:
+                conn = None
+                self.in_use += 1
+                reused = False
+
+        # Connect/ping outside of the lock so other threads are not blocked on network round trips
+        try:
+            if reused and self.pre_ping and not self.is_alive(conn):
+                self.__close(conn)
+                reused = False
+
+            if not reused:
+                conn = self.__open()
+            else:
+                self.connections_reused += 1
+        except Exception:
+            with self.__lock:
+                self.in_use -= 1
+                self.__lock.notify()
+            raise
+
+        return conn
+
+    def release(self, conn):
+        """
+        Returns a borrowed connection to the pool. Closed or broken connections are discarded.
+        :param conn: DBAPI connection from acquire
+        :return: None
+        """
+        if conn is None:
+            return
+
+        healthy = not getattr(conn, 'closed', 0)
+        if healthy:
+            try:
+                # Make sure no transaction is left open for the next borrower
+                conn.rollback()
+            except Exception:
+                healthy = False
+
+        with self.__lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+            if healthy and not self.closed:
+                self.idle.append((conn, time.time()))
+            else:
+                self.__close(conn)
+
+            self.__prune_idle()
+            self.__lock.notify()
+
+    def close(self):
+        """
+        Closes all idle connections; connections still in use are closed when released
+        :return: None
+        """
+        with self.__lock:
+            self.closed = True
+            for conn, _ in self.idle:
+                self.__close(conn)
+            self.idle = list()
+            self.__lock.notify_all()
@@ -1,22 +1,20 @@
 import getpass
+import io
+import itertools
+import threading
+import time
 
-import pyodbc
-from tqdm import tqdm
-from typing import Optional, Union
-import openpyxl
+from typing import Iterable, Optional, Sequence, Union
 import json
-import plotly.express as px
-import configparser
 import os
-from .Config import write_config
-
-write_config(confi_path=os.path.dirname(os.path.abspath(__file__)) + "\\config.cfg")
-config = configparser.ConfigParser()
-config.read(os.path.dirname(os.path.abspath(__file__)) + "\\config.cfg")
+from .Config import get_config
 
 from .query import *
 from .shapefile import *
 from .data_io import *
+from .pool import ConnectionPool
+from .cache import MetadataCache, StatementCache, TABLE_EXISTS, TABLE_COLUMNS, SCHEMAS
+from .inference import infer_csv_types
 from .__init__ import __version__
 
 
@@ -28,8 +26,11 @@ class DbConnect:
     """
 
     def __init__(self, user=None, password=None, ldap=False, type=None, server=None, database=None, port=5432,
-                 allow_temp_tables=False, use_native_driver=True, default=False, quiet=False):
-        # type: (DbConnect, str, str, bool, str, str, str, int, bool, bool, bool, bool) -> None
+                 allow_temp_tables=False, use_native_driver=True, default=False, quiet=False, use_pool=False,
+                 pool_min_size=1, pool_max_size=5, pool_idle_timeout=300, pool_pre_ping=True, cleanup=EAGER_CLEANUP,
+                 cleanup_interval=60, use_metadata_cache=False, metadata_cache_ttl=60, metadata_cache_size=256,
+                 statement_cache_size=100):
+        # type: (DbConnect, str, str, bool, str, str, str, int, bool, bool, bool, bool, bool, int, int, int, bool, str, int, bool, int, int, int) -> None
         """
         :params:
         user (string): default None
@@ -42,6 +43,23 @@ class DbConnect:
         use_native_driver (bool): defaults to False
         default (bool): defaults to False; connects to ris db automatically
         quiet (bool): automatically performs all tasks quietly; defaults to False
+        use_pool (bool): reuses connections from a pool instead of reconnecting for every query; defaults to False
+        pool_min_size (int): connections kept open by the pool; defaults to 1
+        pool_max_size (int): maximum connections the pool will open; defaults to 5
+        pool_idle_timeout (int): seconds before an idle pooled connection is closed; defaults to 300
+        pool_pre_ping (bool): checks pooled connections are alive before reuse; defaults to True
+        cleanup (string): temp table cleanup policy; defaults to eager
+            eager - drops expired tables and cleans the logs before returning
+            background - cleans up on a daemon thread with its own connection
+            periodic - like background, but at most once every cleanup_interval minutes per user/database; the last
+                run is recorded in the default schema's log table
+            off - no cleanup
+        cleanup_interval (int): minutes between periodic cleanups; defaults to 60
+        use_metadata_cache (bool): caches table_exists, get_table_columns and get_schemas lookups; defaults to False
+        metadata_cache_ttl (int): seconds a cached lookup is valid for; defaults to 60
+        metadata_cache_size (int): maximum number of cached lookups; defaults to 256
+        statement_cache_size (int): prepared statements (queries run with params) kept per pooled or persistent
+            connection; defaults to 100
         """
         # Explicitly in __init__ fn call
         self.user = user
@@ -57,6 +75,18 @@ class DbConnect:
         self.use_native_driver = use_native_driver
         self.default_connect = default
         self.quiet = quiet
+        self.use_pool = use_pool
+        self.pool_min_size = pool_min_size
+        self.pool_max_size = pool_max_size
+        self.pool_idle_timeout = pool_idle_timeout
+        self.pool_pre_ping = pool_pre_ping
+        self.cleanup = cleanup
+        self.cleanup_interval = cleanup_interval
+        self.use_metadata_cache = use_metadata_cache
+        self.statement_cache_size = statement_cache_size
+
+        if self.cleanup not in CLEANUP_POLICIES:
+            raise ValueError('cleanup must be one of {}'.format(', '.join(CLEANUP_POLICIES)))
 
         # Other initialized variables
         self.params = dict()
@@ -70,14 +100,19 @@ class DbConnect:
         self.internal_data = None
         self.last_query = None
         self.default_schema = None
+        self.cleanup_time = None
+        self.cleanup_thread = None
         self.connection_count = 0
+        self.pool = None
+        self.metadata_cache = MetadataCache(metadata_cache_ttl, metadata_cache_size) if use_metadata_cache else None
+        self.statement_caches = dict()
         self.__set_type()
 
         # Connect and clean logs
         self.__get_credentials()
         self.default_schema = self.__get_default_schema(self.type)
         self.log_table = TEMP_LOG_TABLE.format(self.user)
-        self.__cleanup_subroutine()
+        self.__start_cleanup()
 
     def __str__(self):
         # type: (DbConnect) -> str
@@ -95,6 +130,21 @@ class DbConnect:
                 v=__version__
                 )
 
+    @property
+    def data(self):
+        """
+        Data from the most recent query
+        """
+        if self.__data_query is not None:
+            self.__data = self.__data_query.data
+            self.__data_query = None
+        return self.__data
+
+    @data.setter
+    def data(self, value):
+        self.__data = value
+        self.__data_query = None
+
     def __get_most_recent_query_data(self, internal=False):
         # type: (DbConnect) -> list
         """
@@ -142,10 +192,10 @@ class DbConnect:
         :return: None
         """
         if self.default_connect:
-            self.type = config.get('DEFAULT DATABASE', 'type')
+            self.type = get_config().get('DEFAULT DATABASE', 'type')
             self.__set_type()
-            self.server = config.get('DEFAULT DATABASE', 'server')
-            self.database = config.get('DEFAULT DATABASE', 'database')
+            self.server = get_config().get('DEFAULT DATABASE', 'server')
+            self.database = get_config().get('DEFAULT DATABASE', 'database')
 
         # Only prompts user if missing necessary information
         if ((self.LDAP and not all((self.database, self.server))) or
@@ -166,10 +216,10 @@ class DbConnect:
                 self.password = getpass.getpass('Password ({})'.format(self.database.lower()))
 
     def __connect_pg(self):
-        # type: (DbConnect) -> None
+        # type: (DbConnect) -> psycopg2.extensions.connection
         """
         Creates connection to pg db
-        :return: None
+        :return: psycopg2 connection
         """
         self.params = {
             'dbname': self.database,
@@ -178,14 +228,16 @@ class DbConnect:
             'host': self.server,
             'port': self.port
         }
-        self.conn = psycopg2.connect(**self.params)
+        return psycopg2.connect(**self.params)
 
     def __connect_ms(self):
-        # type: (DbConnect) -> None
+        # type: (DbConnect) -> pyodbc.Connection
         """
         Creates connection to sql server db
-        :return: None
+        :return: pyodbc connection
         """
+        import pyodbc
+
         if self.use_native_driver:
             # driver = 'SQL Server Native Client 10.0'
             driver = '{SQL Server Native Client 11.0}'
@@ -214,7 +266,7 @@ class DbConnect:
             }
 
         try:
-            self.conn = pyodbc.connect(**self.params)
+            return pyodbc.connect(**self.params)
         except Exception as e:
             print(e)
             # Revert to SQL driver and show warning
@@ -225,7 +277,37 @@ class DbConnect:
                                       datetime2 will not be interpreted correctly\n')
 
                 self.params['DRIVER'] = 'SQL Server'
-                self.conn = pyodbc.connect(**self.params)
+                return pyodbc.connect(**self.params)
+
+    def __open_connection(self):
+        # type: (DbConnect) -> Union[psycopg2.extensions.connection, pyodbc.Connection]
+        """
+        Opens a new connection based on the type of database. Also used by the connection pool to open connections.
+        :return: connection
+        """
+        conn = None
+
+        if self.type == PG:
+            conn = self.__connect_pg()
+
+        if self.type == MS:
+            conn = self.__connect_ms()
+
+        # Add successful connection
+        self.connection_count += 1
+        return conn
+
+    def __get_pool(self):
+        # type: (DbConnect) -> ConnectionPool
+        """
+        Gets the connection pool, creating it on first use
+        :return: ConnectionPool
+        """
+        if not self.pool:
+            self.pool = ConnectionPool(self.__open_connection, min_size=self.pool_min_size,
+                                       max_size=self.pool_max_size, idle_timeout=self.pool_idle_timeout,
+                                       pre_ping=self.pool_pre_ping)
+        return self.pool
 
     def connect(self, quiet=False):
         # type: (DbConnect, bool) -> None
@@ -241,24 +323,31 @@ class DbConnect:
         if not quiet and not self.quiet:
             print(self)
 
-        # Connect based on type of database
-        if self.type == PG:
-            self.__connect_pg()
-
-        if self.type == MS:
-            self.__connect_ms()
-
-        # Add successful connection
-        self.connection_count += 1
+        # Borrow from the pool, or connect based on type of database
+        if self.use_pool:
+            # Hand back any stale connection so the pool can discard it
+            if self.conn and self.pool:
+                self.pool.release(self.conn)
+            self.conn = self.__get_pool().acquire()
+        else:
+            self.conn = self.__open_connection()
 
     def disconnect(self, quiet=False):
         # type: (DbConnect, bool) -> None
         """
-        Closes connection to db
+        Closes connection to db. If using a connection pool, the connection is returned to the pool instead.
         :param quiet: boolean to print out connection closing (defaults to false)
         :return:
         """
+        if self.use_pool:
+            if self.pool:
+                self.pool.release(self.conn)
+            self.conn = None
+            return
+
         try:
+            # Prepared statements do not outlive their connection
+            self.statement_caches.pop(id(self.conn), None)
             self.conn.close()
             if not quiet and not self.quiet:
                 print('Database connection ({typ}) to {db} on {srv} - user: {usr} \nConnection closed {dt}'.format(
@@ -273,102 +362,344 @@ class DbConnect:
             return
 
     def check_conn(self):
+        # type: (DbConnect) -> bool
         """
         Checks and reconnects to connection if need be
+        :return: True if a new connection was made (or borrowed from the pool)
         """
         if not self.conn or (self.type == PG and self.conn and self.conn.closed == 1):
             self.connect(True)
+            return True
 
         elif self.type == MS:
+            import pyodbc
+
             try:
                 self.conn.cursor()
             except pyodbc.ProgrammingError:
                 self.connect(True)
+                return True
+
+        return False
+
+    def _statement_cache(self, conn):
+        # type: (DbConnect, object) -> StatementCache
+        """
+        Gets the prepared statement cache for a connection (used by Query for queries with params)
+        :param conn: DBAPI connection
+        :return: StatementCache
+        """
+        conn_cache = self.statement_caches.get(id(conn))
+
+        if conn_cache is None or conn_cache[0] is not conn:
+            # Drop caches of connections closed elsewhere (ex. by the pool)
+            for key in [k for k, (c, _) in self.statement_caches.items() if getattr(c, 'closed', False)]:
+                del self.statement_caches[key]
+
+            conn_cache = (conn, StatementCache(self.statement_cache_size))
+            self.statement_caches[id(conn)] = conn_cache
+
+        return conn_cache[1]
+
+    def close_pool(self):
+        # type: (DbConnect) -> None
+        """
+        Returns any borrowed connection and closes all pooled connections
+        :return: None
+        """
+        if self.pool:
+            self.disconnect(True)
+            self.pool.close()
+            self.pool = None
+
+    @property
+    def metadata_cache_hits(self):
+        # type: (DbConnect) -> int
+        """
+        :return: number of metadata lookups answered from the cache
+        """
+        return self.metadata_cache.hits if self.metadata_cache else 0
+
+    @property
+    def metadata_cache_misses(self):
+        # type: (DbConnect) -> int
+        """
+        :return: number of metadata lookups that had to query the database
+        """
+        return self.metadata_cache.misses if self.metadata_cache else 0
+
+    def invalidate_metadata(self, table=None, schema=None):
+        # type: (DbConnect, str, str) -> None
+        """
+        Removes cached metadata for a table, or everything if no table is given. Use after changing tables outside
+        of this DbConnect (other sessions, ogr2ogr, etc.)
+        :param table: table name (defaults to all tables)
+        :param schema: schema name (defaults to default schema)
+        :return: None
+        """
+        if not self.metadata_cache:
+            return
+
+        if not table:
+            self.metadata_cache.invalidate()
+        else:
+            self.metadata_cache.invalidate_table(
+                get_unique_table_schema_string(schema or self.default_schema, self.type),
+                get_unique_table_schema_string(table, self.type)
+            )
+
+    def __invalidate_metadata_for_query(self, qry, internal):
+        # type: (DbConnect, Query, bool) -> None
+        """
+        Removes cached metadata for tables/schemas created, dropped, renamed or altered by a query
+        :param qry: Query object that was run
+        :param internal: internal queries do not parse their tables, so they are parsed here
+        :return: None
+        """
+        if not self.metadata_cache:
+            return
+
+        query_string = qry.query_string
+        if internal:
+            new_tables = Query.query_creates_table(query_string, self.default_schema, self.type)
+            dropped_tables = Query.query_drops_table(query_string)
+            renamed_tables = Query.query_renames_table(query_string, self.default_schema)
+        else:
+            new_tables, dropped_tables, renamed_tables = qry.new_tables, qry.dropped_tables, qry.renamed_tables
+
+        for t in new_tables + dropped_tables:
+            _, _, s, tbl = parse_table_string(t, self.default_schema, self.type)
+            self.metadata_cache.invalidate_table(s, tbl)
+
+        for new_table, old_table in (renamed_tables or dict()).items():
+            _, _, s, tbl = parse_table_string(new_table, self.default_schema, self.type)
+            self.metadata_cache.invalidate_table(s, tbl)
+            self.metadata_cache.invalidate_table(s, get_unique_table_schema_string(old_table, self.type))
+
+        if re.search(r'drop\s+schema', query_string, re.IGNORECASE):
+            self.metadata_cache.invalidate()
+        elif re.search(r'create\s+schema', query_string, re.IGNORECASE):
+            self.metadata_cache.invalidate(SCHEMAS)
+
+        # Column changes (add/drop/rename column, sp_rename) are not parsed per table
+        if re.search(r'alter\s+table|sp_rename', query_string, re.IGNORECASE):
+            self.metadata_cache.invalidate(TABLE_COLUMNS)
 
     """
     Private helper functions for log cleanup 
     """
 
-    def __drop_expired_tables(self, schema):
-        # type: (DbConnect, str) -> None
+    def __get_log_schemas(self):
+        # type: (DbConnect) -> list
         """
-        Deletes tables that have expired, as listed in the temp log
-        :param schema: database schema name
+        Gets every schema that has a temp log table for this user, in a single catalog query
+        :return: list of schema names
+        """
+        if self.type == PG:
+            self.query(PG_LOG_SCHEMAS_QUERY.format(log=self.log_table.lower()), timeme=False, internal=True)
+        elif self.type == MS:
+            self.query(MS_LOG_SCHEMAS_QUERY.format(log=self.log_table.lower()), timeme=False, internal=True)
+        else:
+            return []
+
+        return [row[0] for row in self.__get_most_recent_query_data(internal=True) or []]
+
+    def __drop_expired_tables(self, log_schemas):
+        # type: (DbConnect, list) -> None
+        """
+        Deletes tables that have expired, as listed in the temp logs.
+        Expired tables that still exist are found with one catalog join across all log tables and dropped in one batch.
+        :param log_schemas: list of schemas with a temp log table
         :return:
         """
-        self.query("""
-            SELECT table_schema, table_name FROM {s}.{l}
-            WHERE expires < '{dt}'
-            """.format(
-            s=schema,
-            l=self.log_table,
+        if not log_schemas:
+            return
+
+        if self.type == PG:
+            expired_query = PG_EXPIRED_LOG_TABLES_QUERY
+            drop_statement = PG_DROP_EXPIRED_TABLE_STATEMENT
+        else:
+            expired_query = MS_EXPIRED_LOG_TABLES_QUERY
+            drop_statement = MS_DROP_EXPIRED_TABLE_STATEMENT
+
+        self.query('\nUNION ALL\n'.join([expired_query.format(
+            s=get_query_table_schema_name(sch, self.type),
+            log=self.log_table,
             dt=datetime.datetime.now().strftime('%Y-%m-%d')
-        ), timeme=False, internal=True)
+        ) for sch in log_schemas]), strict=False, timeme=False, internal=True)
 
         to_clean = self.__get_most_recent_query_data(internal=True)
-        cleaned = 0
 
-        for sch, table in to_clean:
-            drop_schema_name = get_query_table_schema_name(sch, self.type)
-            drop_table_name = get_query_table_schema_name(table, self.type)
-            self.drop_table(drop_schema_name, drop_table_name, strict=False, internal=True)
-            cleaned += 1
+        if not to_clean:
+            return
+
+        # Each drop is wrapped so one failure (ex. dependent objects) does not stop the rest of the batch
+        drops = ''.join([drop_statement.format(s=get_query_table_schema_name(sch, self.type),
+                                               t=get_query_table_schema_name(table, self.type))
+                         for sch, table in to_clean])
+
+        if self.type == PG:
+            drops = 'DO $$\nBEGIN\n{}\nEND\n$$;'.format(drops)
 
-        if cleaned > 0:
-            print('Attempted to remove {} expired temp tables: {}'.format(cleaned, to_clean))
+        self.query(drops, strict=False, timeme=False, internal=True)
+        print('Attempted to remove {} expired temp tables: {}'.format(len(to_clean), to_clean))
 
-    def __remove_nonexistent_tables_from_logs(self):
-        # type: (DbConnect) -> None
+    def __remove_nonexistent_tables_from_logs(self, log_schemas=None):
+        # type: (DbConnect, list) -> None
         """
-        Removes from the log table any table that no longer exists in the database
+        Removes from the log tables any table that no longer exists in the database, in one batch against the catalog
+        :param log_schemas: list of schemas with a temp log table; looked up if not provided
         :return:
         """
-        to_delete = list()
+        if log_schemas is None:
+            log_schemas = self.__get_log_schemas()
 
-        # For each schema check if log file exists
-        for s in self.get_schemas():
-            if self.table_exists(self.log_table, schema=s, internal=True):
-
-                # For each table in log file check if exists
-                self.query("select table_name from {}.{}".format(s, self.log_table), timeme=False, internal=True)
-
-                if self.__get_most_recent_query_data(internal=True):
-                    for t in self.__get_most_recent_query_data(internal=True):
-                        query_table_name = get_query_table_schema_name(str(t[0]), self.type)
+        if not log_schemas:
+            return
 
-                        # If table does not exist, add to the list of tables to delete
-                        if not self.table_exists(query_table_name, schema=s, internal=True):
-                            # Add the original version back to be deleted
-                            to_delete.append(str(t[0]))
+        if self.type == PG:
+            delete_query = PG_DELETE_NONEXISTENT_FROM_LOG_QUERY
+        else:
+            delete_query = MS_DELETE_NONEXISTENT_FROM_LOG_QUERY
 
-                # Remove stale table names
-                if to_delete:
-                    self.query(
-                        "delete from {s}.{l} where table_name in ({tn})".format(
-                            s=s, l=self.log_table, tn=str(to_delete)[1:-1]
-                        ),
-                        strict=False, timeme=False, internal=True
-                    )
+        self.query(';\n'.join([delete_query.format(s=get_query_table_schema_name(sch, self.type), log=self.log_table)
+                                for sch in log_schemas]), strict=False, timeme=False, internal=True)
 
     def __cleanup_subroutine(self):
         # type: (DbConnect) -> None
         """
         Drops any tables that have expired (based on log table) and removes them from the log by:
-        1. Calling  __drop_expired_tables to remove expired tables
-        2. Calling  __remove_nonexistent_tables_from_logs to remove tables that don't exist anymore from logs
+        1. Calling  __get_log_schemas to find every log table
+        2. Calling  __drop_expired_tables to remove expired tables
+        3. Calling  __remove_nonexistent_tables_from_logs to remove tables that don't exist anymore from logs
         And cleans up logs for tables that may have been dropped.
         :return:
         """
-        if self.type == PG:
-            self.query("SELECT schema_name FROM information_schema.schemata", timeme=False, internal=True)
-        elif self.type == MS:
-            self.query(MS_SCHEMA_FOR_LOG_CLEANUP_QUERY, internal=True)
+        cleanup_start = datetime.datetime.now()
+
+        log_schemas = self.__get_log_schemas()
+        self.__drop_expired_tables(log_schemas)
+        self.__remove_nonexistent_tables_from_logs(log_schemas)
+
+        self.cleanup_time = datetime.datetime.now() - cleanup_start
+
+        if not self.quiet:
+            print('Temp log cleanup ({n} log tables) completed in {t} seconds'.format(
+                n=len(log_schemas), t=round(self.cleanup_time.total_seconds(), 3)))
+
+    def __cleanup_is_due(self):
+        # type: (DbConnect) -> bool
+        """
+        Checks if the last periodic cleanup for this user/database, recorded in the default schema's log table, is
+        older than cleanup_interval minutes. Run while holding the cleanup lock.
+        :return: bool
+        """
+        if not self.table_exists(self.log_table, schema=self.default_schema, internal=True):
+            return True
+
+        recent_query = PG_CLEANUP_RECENT_QUERY if self.type == PG else MS_CLEANUP_RECENT_QUERY
+        # Logged by its catalog name (lowercase, as PG folds it) so the nonexistent table cleanup keeps the row
+        self.query(recent_query.format(s=get_query_table_schema_name(self.default_schema, self.type),
+                                       log=self.log_table, name=self.log_table.lower(), sch=self.default_schema,
+                                       m=int(self.cleanup_interval)),
+                   timeme=False, internal=True)
+
+        return not (self.internal_data and self.internal_data[0][0])
+
+    def __record_cleanup(self):
+        # type: (DbConnect) -> None
+        """
+        Records the time of this cleanup as the log table's own row in the default schema's log table (never expires)
+        so periodic cleanups from any host see it. Run while holding the cleanup lock.
+        :return: None
+        """
+        schema = get_query_table_schema_name(self.default_schema, self.type)
+
+        if not self.table_exists(self.log_table, schema=self.default_schema, internal=True):
+            if self.type == MS:
+                create_query = MS_CREATE_LOG_TABLE_QUERY.format(s=schema, log=self.log_table, serv='', db='')
+            else:
+                create_query = PG_CREATE_LOG_TABLE_QUERY.format(s=schema, log=self.log_table)
+            self.query(create_query, timeme=False, temp=False, internal=True)
+
+        stamp_query = PG_CLEANUP_STAMP_QUERY if self.type == PG else MS_CLEANUP_STAMP_QUERY
+        self.query(stamp_query.format(s=schema, log=self.log_table, name=self.log_table.lower(),
+                                      sch=self.default_schema, u=self.user),
+                   timeme=False, internal=True)
 
-        for sch in self.__get_most_recent_query_data(internal=True):
-            if self.table_exists(self.log_table, schema=sch[0], internal=True):
-                self.__drop_expired_tables(sch[0])
+    def __start_cleanup(self):
+        # type: (DbConnect) -> None
+        """
+        Runs the temp table cleanup according to the cleanup policy
+        :return: None
+        """
+        if self.cleanup == EAGER_CLEANUP:
+            self.__cleanup_subroutine()
+
+        elif self.cleanup in (BACKGROUND_CLEANUP, PERIODIC_CLEANUP):
+            self.cleanup_thread = threading.Thread(target=self.__background_cleanup, daemon=True)
+            self.cleanup_thread.start()
+
+    def __clone(self):
+        # type: (DbConnect) -> DbConnect
+        """
+        Makes a quiet DbConnect to the same database that keeps its own connection open (allow_temp_tables) and does
+        not run the temp log cleanup. Used for work on other threads.
+        :return: DbConnect
+        """
+        return DbConnect(type=self.type, server=self.server, database=self.database, port=self.port,
+                         user=self.user, password=self.password, ldap=self.LDAP,
+                         use_native_driver=self.use_native_driver, allow_temp_tables=True, quiet=True,
+                         cleanup=OFF_CLEANUP)
+
+    def __background_cleanup(self):
+        # type: (DbConnect) -> None
+        """
+        Runs the cleanup subroutine on its own connection, guarded by an advisory lock so only one process cleans up
+        a user's logs at a time. Meant to run on a daemon thread.
+        :return: None
+        """
+        try:
+            # Temp tables allowed so the session (and its advisory lock) is kept for the whole cleanup
+            cleaner = self.__clone()
+
+            if cleaner.type == PG:
+                lock_query, unlock_query = PG_CLEANUP_LOCK_QUERY, PG_CLEANUP_UNLOCK_QUERY
+            else:
+                lock_query, unlock_query = MS_CLEANUP_LOCK_QUERY, MS_CLEANUP_UNLOCK_QUERY
+
+            cleaner.query(lock_query.format(lock=self.log_table), timeme=False, internal=True)
+            locked = bool(cleaner.internal_data and cleaner.internal_data[0][0])
+
+            if not locked:
+                # Another process is already cleaning up this user's logs
+                cleaner.disconnect(True)
+                return
+
+            try:
+                # Checked under the lock so processes on any host agree on when the last periodic cleanup ran
+                if self.cleanup == PERIODIC_CLEANUP and not cleaner.__cleanup_is_due():
+                    return
+
+                cleaner.__cleanup_subroutine()
+                self.cleanup_time = cleaner.cleanup_time
+                cleaner.__record_cleanup()
+            finally:
+                cleaner.query(unlock_query.format(lock=self.log_table), strict=False, timeme=False, internal=True)
+                cleaner.disconnect(True)
 
-        self.__remove_nonexistent_tables_from_logs()
+        except (Exception, SystemExit) as e:
+            print('Background temp log cleanup failed: {}'.format(e))
+
+    def wait_for_cleanup(self, timeout=None):
+        # type: (DbConnect, float) -> None
+        """
+        Blocks until a background/periodic cleanup started by this DbConnect has finished
+        :param timeout: seconds to wait (defaults to None, waits until finished)
+        :return: None
+        """
+        if self.cleanup_thread:
+            self.cleanup_thread.join(timeout)
 
     def __remove_dropped_tables_from_log(self, tables_dropped):
         # type: (DbConnect) -> None
@@ -376,17 +707,25 @@ class DbConnect:
         Removes tables dropped in already-run Queries from log.
         :return:
         """
-        for table_str in tables_dropped:
-            server, database, schema, table = parse_table_string(table_str, self.default_schema, self.type)
+        dropped = [parse_table_string(table_str, self.default_schema, self.type) for table_str in tables_dropped]
 
-            # Check if log table exists
-            if self.table_exists(self.log_table, schema=schema, internal=True):
-                # Delete from log to avoid dropping perm tables with same name
-                self.query(
-                    """DELETE FROM {s}."{tmp}" WHERE table_schema = '{s}' AND table_name = '{t}'""".format(
-                        s=schema, t=table, tmp=self.log_table),
-                    timeme=False, internal=True
-                )
+        # Check which schemas have a log table in one catalog query
+        log_tables = {schema: '{}.{}'.format(get_query_table_schema_name(schema, self.type),
+                                             get_query_table_schema_name(self.log_table, self.type))
+                      for server, database, schema, table in dropped}
+        log_exists = self.tables_exist(list(log_tables.values()), internal=True)
+
+        # Delete from log to avoid dropping perm tables with same name; one query for all schemas
+        to_delete = dict()
+        for server, database, schema, table in dropped:
+            if log_exists[log_tables[schema]]:
+                to_delete.setdefault(schema, list()).append("'{}'".format(table.replace("'", "''")))
+
+        if to_delete:
+            self.query(';\n'.join(
+                """DELETE FROM {s}."{tmp}" WHERE table_schema = '{s}' AND table_name IN ({t})""".format(
+                    s=schema, t=', '.join(tables), tmp=self.log_table)
+                for schema, tables in to_delete.items()), timeme=False, internal=True)
 
     def __run_table_logging(self, new_tables, days=7):
         """
@@ -440,27 +779,21 @@ class DbConnect:
                            timeme=False, temp=False, internal=True)
 
         # Add new table to log
+        log_values = (owner, schema, table, datetime.datetime.now().strftime('%Y-%m-%d %H:%M'), expiration)
+
         if self.type == PG:
             self.query(PG_ADD_TABLE_TO_LOG_QUERY.format(
                 s=schema,
-                log=self.log_table,
-                u=owner,
-                t=table,
-                dt=datetime.datetime.now().strftime('%Y-%m-%d %H:%M'),
-                ex=expiration
-            ), strict=False, timeme=False, internal=True)
+                log=self.log_table
+            ), strict=False, timeme=False, internal=True, params=log_values)
 
         elif self.type == MS:
             self.query(MS_ADD_TABLE_TO_LOG_QUERY.format(
                 s=schema,
-                log=self.log_table,
                 u=owner,
-                t=table,
-                dt=datetime.datetime.now().strftime('%Y-%m-%d %H:%M'),
-                ex=expiration,
                 ser=ser,
                 db=db
-            ), strict=False, timeme=False, internal=True)
+            ), strict=False, timeme=False, internal=True, params=log_values)
 
     """
     User-facing functions
@@ -493,17 +826,79 @@ class DbConnect:
     def cleanup_new_tables(self):
         # type: (DbConnect) -> None
         """
-        Drops all newly created tables from this DbConnect object
+        Drops all newly created tables from this DbConnect object, with one existence check, one DROP TABLE per server
+        and one delete from the logs. If a server's DROP fails (ex. a dependent view or a lock), its tables are dropped
+        one at a time so the others still go; tables that can't be dropped are kept in the log and tables_created.
         :return: None
         """
+        # One existence check for all tables instead of one per drop
+        tables_exist = self.tables_exist(self.tables_created, internal=True)
+
+        # DROP TABLE can't take a server name on MS, so tables on other servers are dropped on their own connection
+        to_drop = dict()
         for tbl in self.tables_created:
+            if not tables_exist[tbl]:
+                continue
+
             server, database, schema, table = parse_table_string(tbl, self.default_schema, self.type)
-            self.drop_table(schema, table)
+            if self.type == PG:
+                server, names = None, (schema, table)
+            elif server and server != self.server:
+                names = (schema, table)
+            else:
+                server, names = None, (database, schema, table)
 
-        print('Dropped %i tables' % len(self.tables_created))
+            to_drop.setdefault((server, database), dict())[tbl] = '.'.join(
+                get_query_table_schema_name(n, self.type) for n in names if n)
 
-        # Clean out list
-        self.tables_created = list()
+        not_dropped = list()
+        for (server, database), names in to_drop.items():
+            if server:
+                other_dbc = self.__other_server_connect(server, database or self.database)
+                not_dropped += other_dbc.__drop_tables(names)
+                other_dbc.disconnect(True)
+            else:
+                not_dropped += self.__drop_tables(names)
+
+        dropped = [tbl for tbl in self.tables_created if tbl not in not_dropped]
+
+        if dropped:
+            self.__remove_dropped_tables_from_log(dropped)
+
+        if self.metadata_cache:
+            for tbl in self.tables_created:
+                _, _, schema, table = parse_table_string(tbl, self.default_schema, self.type)
+                self.metadata_cache.invalidate_table(schema, table)
+
+        print('Dropped %i tables' % len(dropped))
+        if not_dropped:
+            print('Could not drop %i tables: %s' % (len(not_dropped), not_dropped))
+
+        # Clean out list; tables that couldn't be dropped are left to the expired table cleanup
+        self.tables_created = not_dropped
+
+    def __drop_tables(self, names):
+        # type: (DbConnect, dict) -> list
+        """
+        Drops tables in one DROP TABLE; if it fails, drops them one at a time
+        :param names: dict of table string (as in tables_created) to the name to drop it by
+        :return: list of the table strings that could not be dropped
+        """
+        # MS checks existence up front (IF EXISTS needs SQL Server 2016)
+        drop = 'DROP TABLE IF EXISTS {}' if self.type == PG else 'DROP TABLE {}'
+
+        self.query(drop.format(', '.join(names.values())), strict=False, timeme=False, internal=True)
+        if self.internal_queries[-1].query_time is not None:
+            return list()
+
+        # The whole batch was rolled back
+        not_dropped = list()
+        for tbl, name in names.items():
+            self.query(drop.format(name), strict=False, timeme=False, internal=True)
+            if self.internal_queries[-1].query_time is None:
+                not_dropped.append(tbl)
+
+        return not_dropped
 
     def blocking_me(self):
         # type: (DbConnect) -> pd.DataFrame
@@ -514,7 +909,7 @@ class DbConnect:
         if self.type == MS:
             print('Aborting...attempting to run a Postgres-only command on a Sql Server DbConnect instance.')
 
-        return self.dfquery(PG_BLOCKING_QUERY % self.user)
+        return self.dfquery(PG_BLOCKING_QUERY, params=(self.user,))
 
     def kill_blocks(self):
         # type: (DbConnect) -> None
@@ -526,16 +921,17 @@ class DbConnect:
             print('Aborting...attempting to run a Postgres-only command on a Sql Server DbConnect instance.')
             return
 
-        self.query(PG_KILL_BLOCKS_QUERY % self.user, internal=True)
+        self.query(PG_KILL_BLOCKS_QUERY, internal=True, params=(self.user,))
 
         pids_to_kill = [pid[0] for pid in self.__get_most_recent_query_data(internal=True)]
 
         if pids_to_kill:
+            from tqdm import tqdm
 
             print('Killing %i connections' % len(pids_to_kill))
 
             for pid in tqdm(pids_to_kill):
-                self.query("""SELECT pg_terminate_backend(%i);""" % pid)
+                self.query("""SELECT pg_terminate_backend(%s);""", params=(pid,))
 
     def my_tables(self, schema='public'):
         # type: (DbConnect, str) -> Optional[pd.DataFrame, None]
@@ -569,56 +965,174 @@ class DbConnect:
         cleaned_schema = get_unique_table_schema_string(schema, self.type)
         cleaned_table = get_unique_table_schema_string(table, self.type)
 
+        # todo: there is likely a more elegant way to do this
+        # this is a catch for when server and db are passed in but dont have values
+        # this is happening in some of the logging/clean up functions
+        if not cleaned_server:
+            cleaned_server = self.server
+        if not cleaned_database:
+            cleaned_database = get_unique_table_schema_string(self.database, self.type)
+
+        cache_key = (TABLE_EXISTS, cleaned_schema, cleaned_table)
+        if self.type == MS:
+            cache_key += (cleaned_server, cleaned_database)
+
+        if self.metadata_cache:
+            exists = self.metadata_cache.get(cache_key)
+            if exists is not None:
+                return exists
+
         if self.type == PG:
             self.query(PG_TABLE_EXISTS_QUERY.format(s=cleaned_schema, t=cleaned_table), timeme=False, internal=internal)
 
             if self.__get_most_recent_query_data(internal=internal)[0][0]:
-                return True
+                exists = True
             else:
-                return False
+                exists = False
 
         elif self.type == MS:
-            # todo: there is likely a more elegant way to do this
-            # this is a catch for when server and db are passed in but dont have values
-            # this is happening in some of the logging/clean up functions
-            if not cleaned_server:
-                cleaned_server = self.server
-            if not cleaned_database:
-                cleaned_database = self.database
-
             if cleaned_server == self.server and cleaned_database == get_unique_table_schema_string(self.database,
                                                                                                     self.type):
                 self.query(MS_TABLE_EXISTS_QUERY.format(s=cleaned_schema, t=cleaned_table), timeme=False,
                            internal=internal)
                 if self.__get_most_recent_query_data(internal=internal):
-                    return True
+                    exists = True
                 else:
-                    return False
+                    exists = False
             else:
                 # need to connect to other db to check for log
                 # todo: there must be a better way to do this, but havent found it yet
-                other_dbc = DbConnect(type=self.type, server=cleaned_server, database=cleaned_database,
-                                      port=self.port,
-                                      user=self.user, password=self.password, ldap=self.LDAP,
-                                      default=self.default_connect, use_native_driver=self.use_native_driver)
+                other_dbc = self.__other_server_connect(cleaned_server, cleaned_database)
 
-                return other_dbc.table_exists(self.log_table, schema=cleaned_schema)
+                exists = other_dbc.table_exists(self.log_table, schema=cleaned_schema)
         else:
             return False
 
+        if self.metadata_cache:
+            self.metadata_cache.set(cache_key, exists)
+
+        return exists
+
+    def tables_exist(self, tables, internal=False):
+        # type: (DbConnect, list, bool) -> dict
+        """
+        Checks if many tables exist, using one catalog query per database (MS) instead of one per table
+        :param tables: list of table strings (ex. table, schema.table, database.schema.table, server.database.schema.table)
+        :param internal: Boolean flag for internal processes
+        :return: dict of {table string: bool} in the same order as tables
+        """
+        exists = dict()
+        to_check = dict()
+
+        for table_str in tables:
+            server, database, schema, table = parse_table_string(table_str, self.default_schema, self.type)
+
+            if self.type == PG:
+                # PG can only see the connected database, same as table_exists
+                server, database = None, None
+            else:
+                server = server or self.server
+                database = database or get_unique_table_schema_string(self.database, self.type)
+
+            cache_key = (TABLE_EXISTS, schema, table)
+            if self.type == MS:
+                cache_key += (server, database)
+
+            cached = self.metadata_cache.get(cache_key) if self.metadata_cache else None
+            exists[table_str] = bool(cached)
+
+            if cached is None:
+                to_check.setdefault((server, database), dict()).setdefault((schema, table), list()).append(table_str)
+
+        for (server, database), names in to_check.items():
+            found = self.__find_tables(server, database, list(names.keys()), internal)
+
+            for (schema, table), table_strs in names.items():
+                for table_str in table_strs:
+                    exists[table_str] = (schema, table) in found
+
+                if self.metadata_cache:
+                    cache_key = (TABLE_EXISTS, schema, table)
+                    if self.type == MS:
+                        cache_key += (server, database)
+                    self.metadata_cache.set(cache_key, (schema, table) in found)
+
+        return exists
+
+    def __other_server_connect(self, server, database):
+        # type: (DbConnect, str, str) -> DbConnect
+        """
+        Makes a DbConnect to another MS server for catalog lookups and drops. It does not run the temp log cleanup.
+        :param server: server
+        :param database: database
+        :return: DbConnect
+        """
+        return DbConnect(type=self.type, server=server, database=database, port=self.port,
+                         user=self.user, password=self.password, ldap=self.LDAP,
+                         default=self.default_connect, use_native_driver=self.use_native_driver,
+                         cleanup=OFF_CLEANUP)
+
+    def __find_tables(self, server, database, names, internal):
+        # type: (DbConnect, str, str, list, bool) -> set
+        """
+        Finds which of the (schema, table) pairs exist on a server/database
+        :param server: cleaned server (MS only)
+        :param database: cleaned database (MS only)
+        :param names: list of (cleaned schema, cleaned table) tuples
+        :param internal: Boolean flag for internal processes
+        :return: set of (schema, table) tuples that exist
+        """
+        if self.type == MS and server != self.server:
+            # Catalog views can only be queried across databases on the same server
+            other_dbc = self.__other_server_connect(server, database)
+            other_exists = other_dbc.tables_exist(
+                [get_query_table_schema_name(s, MS) + '.' + get_query_table_schema_name(t, MS) for s, t in names],
+                internal=True)
+            return {name for name, e in zip(names, other_exists.values()) if e}
+
+        found = set()
+
+        # VALUES lists are limited to 1000 rows on MS
+        for i in range(0, len(names), 1000):
+            values = ', '.join("('{s}', '{t}')".format(s=s.replace("'", "''"), t=t.replace("'", "''"))
+                               for s, t in names[i:i + 1000])
+
+            if self.type == PG:
+                self.query(PG_TABLES_EXIST_QUERY.format(tables=values), timeme=False, internal=internal)
+            else:
+                if database == get_unique_table_schema_string(self.database, self.type):
+                    db = ''
+                else:
+                    db = get_query_table_schema_name(database, MS) + '.'
+                self.query(MS_TABLES_EXIST_QUERY.format(db=db, tables=values), timeme=False, internal=internal)
+
+            found.update((row[0], row[1]) for row in self.__get_most_recent_query_data(internal=internal) or [])
+
+        return found
+
     def get_schemas(self):
         # type: (DbConnect) -> list
         """
         Gets a list of schemas available in the database
         :return: list of schemas
         """
+        if self.metadata_cache:
+            schemas = self.metadata_cache.get((SCHEMAS,))
+            if schemas is not None:
+                return list(schemas)
+
         if self.type == MS:
             self.query(MS_GET_SCHEMAS_QUERY, timeme=False, internal=True)
 
         elif self.type == PG:
             self.query(PG_GET_SCHEMAS_QUERY, timeme=False, internal=True)
 
-        return [schema_row[0] for schema_row in self.__get_most_recent_query_data(internal=True)]
+        schemas = [schema_row[0] for schema_row in self.__get_most_recent_query_data(internal=True)]
+
+        if self.metadata_cache:
+            self.metadata_cache.set((SCHEMAS,), list(schemas))
+
+        return schemas
 
     def get_table_columns(self, table, schema=None, full=False):
         if not schema:
@@ -628,6 +1142,14 @@ class DbConnect:
         else:
             columns = "column_name, data_type"
 
+        cache_key = (TABLE_COLUMNS, get_unique_table_schema_string(schema, self.type),
+                     get_unique_table_schema_string(table, self.type), full)
+
+        if self.metadata_cache:
+            table_columns = self.metadata_cache.get(cache_key)
+            if table_columns is not None:
+                return list(table_columns)
+
         if self.type == PG:
             self.query("""
             SELECT {cols}
@@ -646,11 +1168,17 @@ class DbConnect:
             ORDER BY ORDINAL_POSITION;
             """.format(cols=columns, s=schema, t=table), timeme=False, internal=True)
 
-        return self.__get_most_recent_query_data(internal=True)
+        table_columns = self.__get_most_recent_query_data(internal=True)
+
+        # Tables that do not exist (yet) return no columns; those are not cached
+        if self.metadata_cache and table_columns:
+            self.metadata_cache.set(cache_key, list(table_columns))
+
+        return table_columns
 
     def query(self, query, strict=True, permission=True, temp=True, timeme=True, no_comment=False, comment='',
-              lock_table=None, return_df=False, days=7, internal=False):
-        # type: (str, bool, bool, bool, bool, bool, str, str, bool, int, bool) -> Optional[None, pd.DataFrame]
+              lock_table=None, return_df=False, days=7, internal=False, params=None):
+        # type: (str, bool, bool, bool, bool, bool, str, str, bool, int, bool, Sequence) -> Optional[None, pd.DataFrame]
         """
         Runs Query object from input SQL string and adds query to queries
         :param query: String sql query to be run
@@ -664,41 +1192,124 @@ class DbConnect:
         :param return_df: boolean that returns Pandas dataframe of data if true (defaults to false)
         :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
         :param internal: Boolean flag for internal processes
+        :param params: sequence of bind parameters for the placeholders in query (%s on PG, ? on MS). With use_pool
+                or allow_temp_tables, statements run with params are prepared once per connection and reused (see
+                statement_cache_size).
         :return:
         """
-        self.check_conn()
+        # With a pool, the outermost query borrows the connection and keeps it for any housekeeping queries it runs
+        borrowed = self.check_conn()
 
-        # Warn for unintended custom comment behavior
-        if self.type == MS and comment:
-            print('Comment functionality does not work with SQL Server databases. '
-                  'Any inputted comments will not be recorded.')
+        try:
+            # Warn for unintended custom comment behavior
+            if self.type == MS and comment:
+                print('Comment functionality does not work with SQL Server databases. '
+                      'Any inputted comments will not be recorded.')
 
-        qry = Query(self, query, strict=strict, permission=permission, temp=temp, timeme=timeme,
-                    no_comment=no_comment, comment=comment, lock_table=lock_table, internal=internal)
+            qry = Query(self, query, strict=strict, permission=permission, temp=temp, timeme=timeme,
+                        no_comment=no_comment, comment=comment, lock_table=lock_table, internal=internal,
+                        params=params, columnar=return_df)
 
-        if not self.allow_temp_tables:
-            self.disconnect(True)
+            if not self.allow_temp_tables and not self.use_pool:
+                self.disconnect(True)
 
-        if internal:
-            self.internal_queries.append(qry)
-            self.internal_data = qry.data
+            self.__invalidate_metadata_for_query(qry, internal)
 
-        else:
+            if internal:
+                self.internal_queries.append(qry)
+                self.internal_data = qry.data
+
+            else:
+                self.queries.append(qry)
+                # Columnar (return_df) results are only converted to rows if self.data is read
+                self.__data_query = qry
+                self.tables_created += [nt for nt in qry.new_tables]
+                self.tables_dropped += [dt for dt in qry.dropped_tables]
+                self.last_query = qry.query_string
+
+                if qry.dropped_tables:
+                    self.__remove_dropped_tables_from_log(qry.dropped_tables)
+
+                if qry.temp and qry.new_tables:
+                    self.__run_table_logging(qry.new_tables, days=days)
+                    self.__remove_nonexistent_tables_from_logs()
+        finally:
+            # Return the connection to the pool (temp tables need the same session, so keep it if allowed)
+            if self.use_pool and borrowed and not self.allow_temp_tables:
+                self.disconnect(True)
+
+        if return_df:
+            return qry.dfquery()
+
+    def run_many(self, queries, max_workers=4, strict=True, permission=True, temp=True, timeme=False,
+                 no_comment=False, comment='', return_df=False, days=7):
+        # type: (DbConnect, list, int, bool, bool, bool, bool, bool, str, bool, int) -> list
+        """
+        Runs independent queries concurrently, each worker thread on its own connection. Queries cannot depend on each
+        other or on temp tables made by this DbConnect, since they run in other sessions.
+        :param queries: list of String sql queries to be run
+        :param max_workers: maximum number of queries run at once (connections opened); defaults to 4
+        :param strict: If true will run sys.exit on failed query attempts
+        :param permission:
+        :param temp: if True any new tables will be logged for deletion at a future date
+        :param timeme: Will print time of each query
+        :param no_comment: Will not comment on newly created tables
+        :param comment: The itself; if the above is False
+        :param return_df: boolean that returns Pandas dataframes of data if true (defaults to false)
+        :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
+        :return: list of Query objects (or Pandas DataFrames if return_df) in the same order as queries
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        local = threading.local()
+        workers = list()
+        workers_lock = threading.Lock()
+
+        def run(query):
+            if not hasattr(local, 'dbo'):
+                local.dbo = self.__clone()
+                with workers_lock:
+                    workers.append(local.dbo)
+
+            local.dbo.query(query, strict=strict, permission=permission, temp=temp, timeme=timeme,
+                            no_comment=no_comment, comment=comment, days=days)
+            return local.dbo.queries[-1]
+
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(queries)))) as executor:
+                # map returns results in input order
+                results = list(executor.map(run, queries))
+        finally:
+            for worker in workers:
+                worker.disconnect(True)
+        total_time = time.perf_counter() - start
+
+        # Bookkeeping is merged on this thread, in input order
+        for qry in results:
             self.queries.append(qry)
-            self.data = qry.data
             self.tables_created += [nt for nt in qry.new_tables]
             self.tables_dropped += [dt for dt in qry.dropped_tables]
-            self.last_query = qry.query_string
+            self.__invalidate_metadata_for_query(qry, False)
 
-            if qry.dropped_tables:
-                self.__remove_dropped_tables_from_log(qry.dropped_tables)
+        if results:
+            self.data = results[-1].data
+            self.last_query = results[-1].query_string
 
-            if qry.temp and qry.new_tables:
-                self.__run_table_logging(qry.new_tables, days=days)
-                self.__remove_nonexistent_tables_from_logs()
+        summed_time = sum([qry.query_time.total_seconds() for qry in results if qry.query_time])
+
+        if not self.quiet:
+            print('Ran {n} queries on {w} connections in {t} seconds (summed query time {s} seconds)'.format(
+                n=len(results),
+                w=len(workers),
+                t=round(total_time, 3),
+                s=round(summed_time, 3)
+            ))
 
         if return_df:
-            return qry.dfquery()
+            return [qry.dfquery() for qry in results]
+
+        return results
 
     def drop_table(self, schema, table, cascade=False, strict=True, server=None, database=None, internal=False):
         # type: (DbConnect, str, str, bool, bool, str, str, bool) -> None
@@ -758,7 +1369,7 @@ class DbConnect:
                                                                               n=new_column))
 
     def dfquery(self, query, strict=False, permission=True, temp=True, timeme=False, no_comment=False, comment='',
-                lock_table=None, days=7, internal=False):
+                lock_table=None, days=7, internal=False, params=None):
         """
         Runs Query object from input SQL string and adds query to queries. Outputs as a dataframe.
         For dfquery, timeme and strict are default set to FALSE.
@@ -772,10 +1383,12 @@ class DbConnect:
         :param lock_table:
         :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
         :param internal: boolean flag for internal processes
+        :param params: sequence of bind parameters for the placeholders in query (%s on PG, ? on MS)
         :return:
         """
         return self.query(query, timeme=timeme, permission=permission, temp=temp, strict=strict, no_comment=no_comment,
-                          comment=comment, lock_table=lock_table, return_df=True, days=days, internal=internal)
+                          comment=comment, lock_table=lock_table, return_df=True, days=days, internal=internal,
+                          params=params)
 
     def print_last_query(self):
         """
@@ -838,10 +1451,175 @@ class DbConnect:
         self.query(qry.replace('\n', ' '), timeme=False, temp=temp, days=days)
         return input_schema
 
+    def _copy_from_stdin(self, copy_qry, sources):
+        # type: (DbConnect, str, Iterable) -> int
+        """
+        Runs a PG COPY ... FROM STDIN once per file-like source, in one transaction
+        :param copy_qry: COPY statement
+        :param sources: iterable of file-like objects read by psycopg2 in blocks
+        :return: number of rows copied
+        """
+        borrowed = self.check_conn()
+        cur = self.conn.cursor()
+        rows = 0
+
+        try:
+            for source in sources:
+                cur.copy_expert(copy_qry, source)
+                rows += cur.rowcount
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+            if (not self.allow_temp_tables and not self.use_pool) or \
+                    (self.use_pool and borrowed and not self.allow_temp_tables):
+                self.disconnect(True)
+
+        return rows
+
+    def __copy_dataframe_to_table(self, chunks, schema, table, table_schema):
+        # type: (DbConnect, Iterable, str, str, list) -> int
+        """
+        Streams DataFrame chunks into an existing PG table with COPY ... FROM STDIN, writing one chunk at a time to an
+        in-memory csv buffer. All chunks are loaded in one transaction.
+        :param chunks: iterable of Pandas DataFrames to be added to database
+        :param schema: Database schema of destination table
+        :param table: Destination table name
+        :param table_schema: schema of dataframe (returned from dataframe_to_table_schema); columns in df order
+        :return: number of rows copied
+        """
+        # Nulls (None, NaN, NaT) are written as \N so they are not confused with empty strings
+        copy_qry = "COPY {s}.{t} ({cols}) FROM STDIN WITH (FORMAT csv, NULL '\\N')".format(
+            s=schema, t=table, cols=', '.join(['"' + str(i[0]) + '"' for i in table_schema]))
+
+        def buffers():
+            for chunk in chunks:
+                buffer = io.StringIO()
+                chunk.to_csv(buffer, index=False, header=False, na_rep='\\N')
+                buffer.seek(0)
+                yield buffer
+
+        return self._copy_from_stdin(copy_qry, buffers())
+
+    def __executemany_dataframe_to_table(self, chunks, schema, table, table_schema):
+        # type: (DbConnect, Iterable, str, str, list) -> int
+        """
+        Inserts DataFrame chunks into an existing SQL Server table with pyodbc fast_executemany, sending each chunk as
+        one parameter array. Parameter types are set from the pandas dtypes. All chunks are loaded in one transaction.
+        :param chunks: iterable of Pandas DataFrames to be added to database
+        :param schema: Database schema of destination table
+        :param table: Destination table name
+        :param table_schema: schema of dataframe (returned from dataframe_to_table_schema); columns in df order
+        :return: number of rows inserted
+        """
+        import pyodbc
+
+        insert_qry = "INSERT INTO {s}.{t} ({cols}) VALUES ({params})".format(
+            s=schema, t=table, cols=', '.join(['"' + str(i[0]) + '"' for i in table_schema]),
+            params=', '.join(['?'] * len(table_schema)))
+
+        def input_sizes(df):
+            # ODBC parameter types from pandas dtypes; strings are sized to the longest value (0 is nvarchar(max))
+            sizes = list()
+            for col in df.columns:
+                series = df[col]
+
+                if pd.api.types.is_datetime64_any_dtype(series):
+                    sizes.append((pyodbc.SQL_TYPE_TIMESTAMP, 23, 3))
+                elif pd.api.types.is_bool_dtype(series):
+                    sizes.append((pyodbc.SQL_BIT, 0, 0))
+                elif pd.api.types.is_integer_dtype(series):
+                    sizes.append((pyodbc.SQL_BIGINT, 0, 0))
+                elif pd.api.types.is_numeric_dtype(series):
+                    sizes.append((pyodbc.SQL_DOUBLE, 0, 0))
+                else:
+                    length = series.dropna().astype(str).str.len().max()
+                    length = 1 if pd.isnull(length) or length < 1 else int(length)
+                    sizes.append((pyodbc.SQL_WVARCHAR, length if length <= 4000 else 0, 0))
+            return sizes
+
+        borrowed = self.check_conn()
+        cur = self.conn.cursor()
+        cur.fast_executemany = True
+        rows = 0
+
+        try:
+            for chunk in chunks:
+                if chunk.empty:
+                    continue
+
+                cur.setinputsizes(input_sizes(chunk))
+                cur.executemany(insert_qry, dataframe_rows(chunk))
+                rows += len(chunk)
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+            if (not self.allow_temp_tables and not self.use_pool) or \
+                    (self.use_pool and borrowed and not self.allow_temp_tables):
+                self.disconnect(True)
+
+        return rows
+
+    def __alter_column_type(self, schema, table, column, column_type):
+        # type: (DbConnect, str, str, str, str) -> None
+        """
+        Changes a column's type on the open connection, inside a load's transaction
+        :param schema: Database schema of table
+        :param table: Table name
+        :param column: Column name
+        :param column_type: New column type
+        :return: None
+        """
+        if self.type == PG:
+            qry = 'ALTER TABLE {s}.{t} ALTER COLUMN "{c}" TYPE {typ} USING "{c}"::{typ}'
+        else:
+            qry = 'ALTER TABLE {s}.{t} ALTER COLUMN [{c}] {typ}'
+
+        cur = self.conn.cursor()
+        try:
+            cur.execute(qry.format(s=schema, t=table, c=column, typ=column_type))
+        finally:
+            cur.close()
+
+        print('Column {c} changed to {typ} to fit later rows'.format(c=column, typ=column_type))
+
+    def __load_dataframes(self, chunks, schema, table, table_schema):
+        # type: (DbConnect, Iterable, str, str, list) -> int
+        """
+        Loads DataFrame chunks into an existing table (PG: COPY, SQL Server: fast_executemany) in one transaction and
+        prints rows/sec
+        :param chunks: iterable of Pandas DataFrames to be added to database
+        :param schema: Database schema of destination table
+        :param table: Destination table name
+        :param table_schema: schema of dataframe (returned from dataframe_to_table_schema); columns in df order
+        :return: number of rows loaded
+        """
+        start = time.time()
+
+        if self.type == PG:
+            rows = self.__copy_dataframe_to_table(chunks, schema, table, table_schema)
+        else:
+            rows = self.__executemany_dataframe_to_table(chunks, schema, table, table_schema)
+
+        duration = time.time() - start
+        print('\n{c} rows added to {s}.{t} in {d:.2f} s ({r:,.0f} rows/sec)\n'.format(
+            c=rows, s=schema, t=table, d=duration, r=rows / duration if duration else rows))
+        return rows
+
     def dataframe_to_table(self, df, table, table_schema=None, schema=None, overwrite=False, temp=True,
-                           allow_max_varchar=False, column_type_overrides=None, days=7):
+                           allow_max_varchar=False, column_type_overrides=None, days=7, chunk_size=100000):
         """
-        Adds data from Pandas DataFrame to existing table
+        Adds data from Pandas DataFrame to existing table. PG tables are loaded with COPY and SQL Server tables with
+        batched fast_executemany inserts.
         :param df: Pandas DataFrame to be added to database
         :param table: Table name to be used in database
         :param table_schema: schema of dataframe (returned from dataframe_to_table_schema)
@@ -854,6 +1632,7 @@ class DbConnect:
                 detection. **Will not override a custom table_schema, if inputted**
         :param days: if temp=True and table schema needs to be created, the number of days that the temp table will be
                      kept. Defaults to 7.
+        :param chunk_size: number of rows sent per COPY call (PG) or executemany batch (SQL Server); defaults to 100,000
         :return: None
         """
 
@@ -866,52 +1645,35 @@ class DbConnect:
                                                           column_type_overrides=column_type_overrides,
                                                           days=days)
 
-        # Insert data
-        print('Reading data into Database\n')
-
-        for _, row in tqdm(df.iterrows()):
-            # Clean up empty cells and prime for input into db
-            row = row.replace({pd.np.nan: None})
-            row_values = ",".join([clean_cell(i) for i in row.values])
-            row_values = row_values.replace('None', 'NULL')
-
-            self.query(u"""
-                INSERT INTO {s}.{t} ({cols})
-                VALUES ({d})
-            """.format(s=schema, t=table,
-                       cols=str(['"' + str(i[0]) + '"' for i in table_schema])[1:-1].replace("'", ''),
-                       d=row_values), strict=False, timeme=False)
-
-        df = self.dfquery("SELECT COUNT(*) as cnt FROM {s}.{t}".format(s=schema, t=table), timeme=False)
-        print('\n{c} rows added to {s}.{t}\n'.format(c=df.cnt.values[0], s=schema, t=table))
+        self.__load_dataframes((df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size)),
+                               schema, table, table_schema)
 
     def csv_to_table(self, input_file=None, overwrite=False, schema=None, table=None, temp=True, sep=',',
-                     long_varchar_check=False, column_type_overrides=None, days=7):
+                     long_varchar_check=False, column_type_overrides=None, days=7, infer_types=False,
+                     sample_size=None, parallel=None):
         """
-        Imports csv file to database. This uses pandas datatypes to generate the table schema.
+        Imports csv file to database. This uses pandas datatypes to generate the table schema, or with infer_types,
+        the narrowest types that fit the data in the file.
         :param input_file: File path to csv file; if None, prompts user input
         :param overwrite: If table exists in database, will overwrite; defaults to False
         :param schema: Schema of table; if None, defaults to db's default schema
         :param table: Name for final database table; defaults to filename in path
         :param temp: Boolean for temporary table; defaults to True
         :param sep: Separator for csv file, defaults to comma (,)
-        :param long_varchar_check: Boolean to allow unlimited/max varchar columns; defaults to False
+        :param long_varchar_check: Boolean to size varchar columns with values longer than 500 to their longest value
+        (up to unlimited/max varchar); scans the whole file once. Defaults to False
         :param column_type_overrides: Dict of type key=column name, value=column type. Will manually set the
         raw column name as that type in the query, regardless of the pandas/postgres/sql server automatic
         detection. **Will not override a custom table_schema, if inputted**
         :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
+        :param infer_types: if True, streams the file to infer smallint/integer/bigint, numeric, boolean, date,
+        timestamp and sized varchar columns (see inference.TypeInference); defaults to False
+        :param sample_size: with infer_types, infers from a random sample of this many rows instead of every row
+        :param parallel: PG only; number of connections that load byte ranges of a large file at once (see
+        _copy_csv_to_table). Defaults to None (one COPY stream).
         :return:
         """
 
-        def contains_long_columns(df2):
-            for c in list(df2.columns):
-                if df2[c].dtype in ('O','object', 'str'):
-                    if df2[c].apply(lambda x: len(x) if x else 0).max() > 500:
-                        print('Varchar column with length greater than 500 found; allowing max varchar length.')
-                        return True
-
-            return False
-
         if not schema:
             schema = self.default_schema
 
@@ -925,35 +1687,62 @@ class DbConnect:
             print('Must set overwrite=True; table already exists.')
             return
 
-        # Use pandas to get existing data and schema
-        # Check for varchar columns > 500 in length
-        allow_max = False
+        # Inferred types are applied as overrides; any column_type_overrides passed in still take precedence
+        read_kwargs = dict()
+        if infer_types:
+            inferred = infer_csv_types(input_file, self.type, sep=sep, sample_size=sample_size)
+            inferred.update(column_type_overrides or dict())
+            column_type_overrides = inferred
+
+            # Read values as text (nulls only for empty cells, as in the inference) so they load as-is
+            read_kwargs = dict(dtype=str, keep_default_na=False, na_values=[''])
+
+        # Use pandas to get existing data and schema; large files are read in chunks in a single pass
+        # With long_varchar_check, the longest value of each text column is tracked along the way (vectorized)
+        check_lengths = long_varchar_check and not infer_types
+        lengths = dict()
+
         if os.path.getsize(input_file) > 1000000:
-            data = pd.read_csv(input_file, iterator=True, chunksize=10 ** 15)
-            df = data.get_chunk(1000)
+            df = None
+
+            with pd.read_csv(input_file, sep=sep, chunksize=100000, **read_kwargs) as reader:
+                for chunk in reader:
+                    # Schema comes from the first chunk
+                    if df is None:
+                        df = chunk
 
-            # Check for long column iteratively
-            while df is not None and long_varchar_check:
-                if contains_long_columns(df):
-                    allow_max = True
-                    break
+                    if not check_lengths:
+                        break
 
-                df = data.get_chunk(1000)
+                    max_string_lengths(chunk, lengths)
         else:
-            df = pd.read_csv(input_file, sep=sep)
-            allow_max = long_varchar_check and contains_long_columns(df)
+            df = pd.read_csv(input_file, sep=sep, **read_kwargs)
+
+            if check_lengths:
+                max_string_lengths(df, lengths)
+
+        # Size varchar columns > 500 in length to their longest value; column_type_overrides still take precedence
+        long_columns = {col: varchar_type(length, self.type) for col, length in lengths.items() if length > 500}
+        if long_columns:
+            print('Varchar column(s) with length greater than 500 found ({}); sizing to the longest value.'.format(
+                ', '.join([str(col) for col in long_columns])))
+            long_columns.update(column_type_overrides or dict())
+            column_type_overrides = long_columns
 
         if 'ogc_fid' in df.columns:
             df = df.drop('ogc_fid', 1)
 
         # Calls dataframe_to_table_schema fn
         table_schema = self.dataframe_to_table_schema(df, table, overwrite=overwrite, schema=schema, temp=temp,
-                                                      allow_max_varchar=allow_max,
                                                       column_type_overrides=column_type_overrides,
                                                       days=days)
 
-        # For larger files use GDAL to import
+        # For larger files, COPY straight into the table on PG; otherwise (or if that fails) use GDAL to import
         if df.shape[0] > 999:
+            if self.type == PG and self._copy_csv_to_table(input_file, schema, table, table_schema, sep=sep,
+                                                           parallel=parallel):
+                return
+
             try:
                 success = self._bulk_csv_to_table(input_file=input_file, schema=schema, table=table,
                                                   table_schema=table_schema, days=days)
@@ -976,6 +1765,88 @@ class DbConnect:
             self.dataframe_to_table(df, table, table_schema=table_schema, overwrite=overwrite, schema=schema,
                                     temp=temp, days=days)
 
+    def __parallel_copy_from_file(self, copy_qry, input_file, workers):
+        # type: (DbConnect, str, str, int) -> int
+        """
+        Runs a PG COPY ... FROM STDIN (without HEADER) of a csv file over several connections at once. Each connection
+        streams its own byte range of the file, split on record boundaries after the header row.
+        :param copy_qry: COPY statement
+        :param input_file: csv file path
+        :param workers: number of connections
+        :return: number of rows copied
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        ranges = csv_byte_ranges(input_file, workers)
+
+        def load(byte_range):
+            dbo = self.__clone()
+            worker_start = time.time()
+
+            try:
+                with FileRange(input_file, byte_range[0], byte_range[1]) as f:
+                    worker_rows = dbo._copy_from_stdin(copy_qry, [f])
+            finally:
+                dbo.disconnect(True)
+
+            return worker_rows, byte_range[1] - byte_range[0], time.time() - worker_start
+
+        with ThreadPoolExecutor(max_workers=max(1, len(ranges))) as executor:
+            results = list(executor.map(load, ranges))
+
+        for i, (worker_rows, worker_bytes, duration) in enumerate(results):
+            print('Worker {i}: {c} rows ({mb:,.1f} MB) in {d:.2f} s ({r:,.0f} rows/sec)'.format(
+                i=i, c=worker_rows, mb=worker_bytes / 1024 ** 2, d=duration,
+                r=worker_rows / duration if duration else worker_rows))
+
+        return sum([result[0] for result in results])
+
+    def _copy_csv_to_table(self, input_file, schema, table, table_schema, sep=',', parallel=None):
+        # type: (DbConnect, str, str, str, list, str, int) -> bool
+        """
+        Streams a csv file straight into an existing PG table with COPY ... FROM STDIN (FORMAT csv, HEADER). The file
+        is read in blocks, not loaded into memory. Routed to by csv_to_table when record count is >= 1,000.
+        :param input_file: Source CSV filepath
+        :param schema: Schema of destination table
+        :param table: Destination table name
+        :param table_schema: schema of dataframe (returned from dataframe_to_table_schema); columns in file order
+        :param sep: Separator for csv file, defaults to comma (,)
+        :param parallel: number of connections to load byte ranges of the file at once; defaults to None (one stream).
+        If any range fails, the table is truncated (it is expected to be new and empty).
+        :return: True if loaded; False if the file does not match the table or a value could not be cast
+        """
+        # Every file column must map to a table column (ex. a dropped ogc_fid column cannot be skipped by COPY)
+        if len(sep) != 1 or len(pd.read_csv(input_file, sep=sep, nrows=0).columns) != len(table_schema):
+            return False
+
+        copy_qry = "COPY {s}.{t} ({cols}) FROM STDIN WITH (FORMAT csv{h}, DELIMITER {d})".format(
+            s=schema, t=table, cols=', '.join(['"' + str(i[0]) + '"' for i in table_schema]),
+            h='' if parallel and parallel > 1 else ', HEADER', d="'" + sep.replace("'", "''") + "'")
+
+        print('Bulk loading data...')
+        start = time.time()
+
+        try:
+            if parallel and parallel > 1:
+                rows = self.__parallel_copy_from_file(copy_qry, input_file, parallel)
+            else:
+                with open(input_file, 'r', encoding='utf-8', newline='') as f:
+                    rows = self._copy_from_stdin(copy_qry, [f])
+        except Exception as e:
+            print(e)
+
+            # Ranges that did load were committed on their own connections
+            if parallel and parallel > 1:
+                self.query('TRUNCATE TABLE {s}.{t}'.format(s=schema, t=table), timeme=False, internal=True)
+
+            print('COPY failed; falling back to staging table load.')
+            return False
+
+        duration = time.time() - start
+        print('\n{c} rows added to {s}.{t} in {d:.2f} s ({r:,.0f} rows/sec)\n'.format(
+            c=rows, s=schema, t=table, d=duration, r=rows / duration if duration else rows))
+        return True
+
     def _bulk_csv_to_table(self, input_file=None, schema=None, table=None, table_schema=None, print_cmd=False, days=7):
         """
         Shell for bulk_file_to_table. Routed to by csv_to_table when record count is >= 1,000.
@@ -1056,6 +1927,8 @@ class DbConnect:
                                                    tbl=table
                                                    )
 
+        # Make sure GDAL_DATA is set for ogr2ogr
+        get_gdal_data_loc()
         cmd_env = os.environ.copy()
 
         if excel_header:
@@ -1072,6 +1945,9 @@ class DbConnect:
             print(f"Ogr2ogr Output:\n{e.output}")
             return False
 
+        # ogr2ogr created the staging table outside of the DbConnect
+        self.invalidate_metadata('stg_' + table, schema=schema)
+
         try:
             if table_schema:
                 # Need to get staging field names, GDAL sanitizes differently
@@ -1169,9 +2045,10 @@ class DbConnect:
         return True
 
     def xls_to_table(self, input_file=None, sheet_name=0, overwrite=False, schema=None, table=None, temp=True,
-                     column_type_overrides=None, days=7):
+                     column_type_overrides=None, days=7, chunk_size=100000):
         """
-        Imports xls/x file to database. This uses pandas datatypes to generate the table schema.
+        Imports xls/x file to database. This uses pandas datatypes to generate the table schema. xlsx sheets are
+        streamed in read-only mode and loaded chunk_size rows at a time (COPY on PG, fast_executemany on SQL Server).
         :param input_file: File path to csv file; if None, prompts user input
         :param sheet_name : str, int or None, defaults to the first sheet
         :param overwrite: If table exists in database, will overwrite; defaults to False
@@ -1182,6 +2059,8 @@ class DbConnect:
         raw column name as that type in the query, regardless of the pandas/postgres/sql server automatic
         detection.
         :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
+        :param chunk_size: number of rows read and loaded at a time; xlsx table types are inferred from the first
+        chunk and widened if later chunks don't fit them. Defaults to 100,000
         :return:
         """
         # Add default schema
@@ -1208,135 +2087,103 @@ class DbConnect:
             return
 
         extension = os.path.basename(input_file).split('.')[-1]
-        success = False
-
-        # Determine if multiple sheets; if so, cannot be used with ogr2ogr/must be changed
-        if extension == 'xlsx':
-            wb = openpyxl.load_workbook(input_file)
-            multi_sheet = len(wb.sheetnames) > 1
-        elif extension == 'xls':
-            ef = pd.ExcelFile(input_file)
-            multi_sheet = len(ef.sheet_names) > 1
-        else:
-            print('This function is for .xlsx and .xls files')
+
+        if extension == 'xls':
+            # xlrd reads the whole workbook, so .xls sheets are loaded as a DataFrame
+            df = pd.read_excel(input_file, sheet_name=sheet_name)
+            self.dataframe_to_table(df, table, overwrite=overwrite, schema=schema, temp=temp,
+                                    column_type_overrides=column_type_overrides, days=days, chunk_size=chunk_size)
             return
 
-        # Remember original input_file
-        old_input_file = str(input_file)
-        old_extension = str(extension)
-        remove_file = False
+        if extension != 'xlsx':
+            print('This function is for .xlsx and .xls files')
+            return
 
-        # Read in memory and attempt to convert to single-sheet xlsx
-        if (extension == 'xls' or multi_sheet) and not column_type_overrides:
-            try:
-                if extension == 'xlsx':
-                    # Grab sheet
-                    if sheet_name:
-                        if type(sheet_name) == int and str(sheet_name) not in wb.sheetnames:
-                            sheet_data = list(wb[wb.sheetnames[sheet_name]].values)
-                        else:
-                            sheet_data = list(wb[str(sheet_name)].values)
-                    elif not sheet_name:
-                        sheet_data = list(wb.worksheets[0].values)
-
-                    # Match previous styles
-                    cols = []
-                    for c in sheet_data[0]:
-                        if type(c) == str:
-                            cols.append(c.strip().replace(' ', '_').replace('.', '_'))
-                        else:
-                            cols.append(c)
-
-                    df = pd.DataFrame(sheet_data[1:], columns=cols)
-                elif extension == 'xls':
-                    df = pd.read_excel(input_file, sheet_name=sheet_name)
-
-                # Replace with .xlsx of just the desired sheet
-                input_file = "C:\\Users\\{}\\Documents".format(getpass.getuser()) + "\\" + \
-                             os.path.basename(input_file).split('.')[0] + "_{}.xlsx".format(sheet_name)
-                df.to_excel(input_file, index=False, header=True)
-
-                remove_file = True
-                extension = 'xlsx'
-                multi_sheet = False
-            except Exception as e:
-                print("""
-                    Attempt to convert to single-sheet xlsx file failed. 
-                    """)
-                print(e)
+        import openpyxl
 
-                # Restore to original values if conversion fails
-                input_file = old_input_file
-                extension = old_extension
-                remove_file = False
-
-                if extension == 'xlsx':
-                    multi_sheet = len(wb.sheetnames) > 1
-                elif extension == 'xls':
-                    multi_sheet = len(ef.sheet_names) > 1
-
-        # Try bulk input
-        if not multi_sheet and extension == 'xlsx' and not column_type_overrides:
-            # Bulk input
-            success = self._bulk_xlsx_to_table(input_file=input_file, schema=schema, table="stg_{}".format(table))
-
-            # Overwrite if applicable and successful
-            if success and overwrite:
-                self.drop_table(schema=schema, table=table)
-
-            # Move from stg to live
-            if success:
-                self.query("""
-                select * 
-                into {schema}.{table}
-                from {schema}.{stg_table}
-                """.format(schema=schema, table=table, stg_table="stg_{}".format(table)), days=days)
-
-                # Drop stg table
-                self.drop_table(schema=schema, table="stg_{}".format(table))
-
-        # Warn why will not work for xls if bulk wasn't called
-        if multi_sheet or extension != 'xlsx':
-            print("""
-            Only large, single-sheet xlsx (and csv) files can be loaded quickly via ogr/gdal. 
-            Consider manually converting the file to csv or xlsx.
-            """)
+        # Stream the sheet in read-only mode, chunk_size rows at a time
+        wb = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
 
-        if not success:
+        try:
             # Uses the first sheet if no inputted sheet name
-            if extension == 'xlsx':
-                # Grab sheet
-                if sheet_name:
-                    if type(sheet_name) == int and str(sheet_name) not in wb.sheetnames:
-                        sheet_data = list(wb[wb.sheetnames[sheet_name]].values)
-                    else:
-                        sheet_data = list(wb[str(sheet_name)].values)
-                elif not sheet_name:
-                    sheet_data = list(wb.worksheets[0].values)
+            if sheet_name:
+                if type(sheet_name) == int and str(sheet_name) not in wb.sheetnames:
+                    ws = wb[wb.sheetnames[sheet_name]]
+                else:
+                    ws = wb[str(sheet_name)]
+            else:
+                ws = wb.worksheets[0]
 
-                # Match previous styles
-                cols = []
-                for c in sheet_data[0]:
-                    if type(c) == str:
-                        cols.append(c.strip().replace(' ', '_').replace('.', '_'))
-                    else:
-                        cols.append(c)
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
 
-                df = pd.DataFrame(sheet_data[1:], columns=cols)
+            if header is None:
+                print('Sheet is empty; no table created.')
+                return
 
-            else:
-                df = pd.read_excel(input_file, sheet_name=sheet_name)
+            # Match previous styles
+            cols = []
+            for c in header:
+                if type(c) == str:
+                    cols.append(c.strip().replace(' ', '_').replace('.', '_'))
+                else:
+                    cols.append(c)
+
+            def sheet_chunks():
+                # Only the first chunk's types are inferred; later chunks keep the cell values for conform_to_schema
+                dtype = None
+                chunk = list()
+
+                for row in rows:
+                    # Read-only rows can be shorter or longer than the header; blank rows are skipped
+                    row = tuple(row[:len(cols)]) + (None,) * (len(cols) - len(row))
+                    if all(v is None for v in row):
+                        continue
+
+                    chunk.append(row)
+
+                    if len(chunk) == chunk_size:
+                        yield pd.DataFrame(chunk, columns=cols, dtype=dtype)
+                        dtype = object
+                        chunk = list()
+
+                if chunk:
+                    yield pd.DataFrame(chunk, columns=cols, dtype=dtype)
+
+            # Table schema is from the first chunk
+            chunks = sheet_chunks()
+            first_chunk = next(chunks, None)
+            if first_chunk is None:
+                first_chunk = pd.DataFrame(columns=cols)
+
+            # Integer columns are integer/int (as ogr2ogr made them) unless the values need bigint
+            type_overrides = dict(column_type_overrides or dict())
+            for col in first_chunk.columns:
+                series = first_chunk[col]
+                if col not in type_overrides and series.dtype == np.dtype('int64') and \
+                        (series.abs() < INTEGER_LIMITS['integer']).all():
+                    type_overrides[col] = 'integer' if self.type == PG else 'int'
+
+            table_schema = self.dataframe_to_table_schema(first_chunk, table, overwrite=overwrite, schema=schema,
+                                                          temp=temp, column_type_overrides=type_overrides,
+                                                          days=days)
+            fixed = [clean_column(c) for c in (column_type_overrides or dict())]
 
-            # Call dataframe_to_table fn
-            self.dataframe_to_table(df, table, overwrite=overwrite, schema=schema, temp=temp,
-                                    column_type_overrides=column_type_overrides, days=days)
+            def conformed_chunks():
+                # Later chunks are cast to the table types; columns they don't fit are widened in the load transaction
+                for chunk in itertools.chain([first_chunk], chunks):
+                    chunk, widened = conform_to_schema(chunk, table_schema, self.type, fixed=fixed)
+                    for column, column_type in widened:
+                        self.__alter_column_type(schema, table, column, column_type)
+                    yield chunk
 
-        # Try to remove new file if applicable.
-        if remove_file:
-            os.remove(input_file)
+            self.__load_dataframes(conformed_chunks(), schema, table, table_schema)
+            self.invalidate_metadata(table, schema)
+        finally:
+            wb.close()
 
     def query_to_csv(self, query, strict=True, output_file=None, open_file=False, sep=',', quote_strings=True,
-                     quiet=False):
+                     quiet=False, use_copy=False, wkt=None, compression=None, compression_thread=False):
         """
         Exports query results to a csv file.
         :param query: SQL query as string type
@@ -1346,20 +2193,264 @@ class DbConnect:
         :param sep: Delimiter for csv; defaults to comma (,)
         :param quote_strings: Defaults to True (csv.QUOTE_ALL); if False, will csv.QUOTE_MINIMAL
         :param quiet: if true, does not output query metrics or output location
+        :param use_copy: PG only; if True, single statement queries are streamed to the file with COPY ... TO STDOUT
+        instead of going through pandas (other queries use pandas). Defaults to False, since COPY writes values the way
+        PG formats them: booleans as t/f, an unquoted header, NULLs as unquoted empty fields and every geometry column
+        as ST_AsText (POINT(1 2) rather than POINT (1 2)).
+        :param wkt: None (default), True or False. On PG without use_copy, a geom column is converted to WKT on the
+        client unless wkt is False; server-side WKT (ST_AsText of every geometry column) needs use_copy=True, where
+        it is on unless wkt is False. On MS, geometry columns are only converted on the server (.STAsText()) if wkt is
+        True, since finding them takes an extra describe of the query. If False, geometry is written as returned
+        (WKB hex on PG).
+        :param compression: None (default, plain csv), 'gzip', 'bz2' or 'zstd' (requires zstandard); the file is
+        written through one compressing handle as rows arrive
+        :param compression_thread: if True, compresses on a background thread so compression overlaps fetching
         :return:
         """
         # If no output specified, defaults to a generic data csv name with the date
         if not output_file:
-            output_file = os.path.join(os.getcwd(),
-                                       'data_{}.csv'.format(datetime.datetime.now().strftime('%Y%m%d%H%M')))
+            output_file = os.path.join(os.getcwd(), 'data_{}.csv{}'.format(
+                datetime.datetime.now().strftime('%Y%m%d%H%M'), COMPRESSION_EXTENSIONS.get(compression, '')))
+
+        if use_copy and self.type == PG:
+            # COPY can't convert on the client, so geometry columns are converted on the server
+            if self._copy_query_to_csv(query, output_file, sep=sep, quote_strings=quote_strings, quiet=quiet,
+                                       compression=compression, compression_thread=compression_thread,
+                                       wkt=wkt is not False):
+                if open_file:
+                    os.startfile(output_file)
+                return
+
+        # MS geometry isn't WKB, so it is converted on the server, only when asked for (finding the geometry columns
+        # is an extra describe); PG geom is converted on the client as it always was
+        wkt_query = self._geometry_query(query)[0] if wkt and self.type == MS else None
+        if wkt_query:
+            query = wkt_query
 
+        if not quiet:
+            print('Writing to %s' % output_file)
+
+        # Results are streamed to the file in batches as they are fetched
         self.check_conn()
-        qry = Query(self, query, strict=strict, timeme=(not quiet))
+        Query(self, query, strict=strict, timeme=(not quiet),
+              to_csv={'output': output_file, 'quote_strings': quote_strings, 'sep': sep, 'compression': compression,
+                      'compression_thread': compression_thread, 'convert_geom': wkt is not False and not wkt_query})
+
+        if open_file and os.path.isfile(output_file):
+            os.startfile(output_file)
+
+        if self.use_pool and not self.allow_temp_tables:
+            self.disconnect(True)
+
+    def _describe_query(self, query, declared=False):
+        # type: (DbConnect, str, bool) -> list
+        """
+        Gets the columns a query returns without running it: a limit 0 wrapper on PG, sp_describe_first_result_set on
+        MS. Types are read from the cursor metadata (PG type oids are named with format_type); no temp table is made.
+        Raises the database error if the query can't be described (it is rolled back first).
+        :param query: SQL query as string type
+        :param declared: PG only; if True, columns taken straight from a table get their declared type with its
+        modifier from pg_attribute (ex. geometry(MultiPolygon,2263), character varying(20))
+        :return: list of (column name, type name) tuples, ex. ('ts', 'timestamp without time zone') on PG or
+        ('ts', 'datetime2(7)') on MS
+        """
+        query = clean_query_special_characters(query).strip().rstrip(';').strip()
+
+        borrowed = self.check_conn()
+        cur = self.conn.cursor()
+
+        try:
+            return self.__describe_cursor(cur, query, declared)
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+            if (not self.allow_temp_tables and not self.use_pool) or \
+                    (self.use_pool and borrowed and not self.allow_temp_tables):
+                self.disconnect(True)
+
+    def __describe_cursor(self, cur, query, declared=False):
+        # type: (DbConnect, object, str, bool) -> list
+        """
+        Describes a cleaned query on an open cursor; see _describe_query. Errors are left to the caller.
+        :param cur: cursor on self.conn
+        :param query: SQL query as string type (cleaned, without a trailing ;)
+        :param declared: PG only; if True, columns taken straight from a table get their declared type
+        :return: list of (column name, type name) tuples
+        """
+        if self.type == PG:
+            # Newlines keep a trailing -- comment from swallowing the wrapper
+            cur.execute('select * from (\n{q}\n) q limit 0'.format(q=query))
+            description = cur.description or list()
+            columns = [(desc[0], desc[1]) for desc in description]
+
+            cur.execute(PG_TYPE_NAMES_QUERY, (list({type_code for _, type_code in columns}),))
+            type_names = dict(cur.fetchall())
+
+            # Source table and column number of each result column (None/0 for expressions)
+            sources = [(getattr(desc, 'table_oid', None), getattr(desc, 'table_column', None))
+                       for desc in description]
+            declared_types = dict()
+
+            if declared and any(oid for oid, _ in sources):
+                table_columns = [(oid, col) for oid, col in sources if oid]
+                cur.execute(PG_COLUMN_TYPES_QUERY, ([oid for oid, _ in table_columns],
+                                                    [col for _, col in table_columns]))
+                declared_types = {(row[0], row[1]): row[2] for row in cur.fetchall()}
+
+            return [(name, declared_types.get(source) or type_names.get(type_code, ''))
+                    for (name, type_code), source in zip(columns, sources)]
+        else:
+            cur.execute(MS_DESCRIBE_RESULT_QUERY, query)
+            fields = [desc[0] for desc in cur.description]
+
+            return [(row[fields.index('name')], str(row[fields.index('system_type_name')]).lower())
+                    for row in cur.fetchall() if not row[fields.index('is_hidden')]]
+
+    def _geometry_query(self, query, geometry_format='wkt'):
+        # type: (DbConnect, str, str) -> tuple
+        """
+        Rewrites the projection of a query so its geometry/geography columns are converted on the server:
+        select q.a, st_astext(q.geom) as geom from (query) q on PG, q.[geom].STAsText() on MS (st_asbinary and
+        .STAsBinary() for wkb). The geometry columns are found with _describe_query; nothing is run.
+        :param query: SQL query as string type
+        :param geometry_format: 'wkt' (default) or 'wkb'
+        :return: (rewritten query, [(geometry column, declared type)]), ex. [('geom', 'geometry(MultiPolygon,2263)')];
+        (None, []) if the query has no geometry columns or cannot be wrapped (ex. several statements, or an order by
+        without top on MS)
+        """
+        query = clean_query_special_characters(query).strip().rstrip(';').strip()
+
+        if not query:
+            return None, list()
+
+        try:
+            columns = self._describe_query(query, declared=True)
+        except Exception:
+            return None, list()
+
+        geometry_query, geometry_columns = self.__geometry_projection(query, columns, geometry_format)
+
+        # MS derived tables have more restrictions (ex. order by); check the rewritten query compiles
+        if geometry_query and self.type == MS:
+            try:
+                self._describe_query(geometry_query)
+            except Exception:
+                return None, list()
+
+        return geometry_query, geometry_columns
+
+    def __geometry_projection(self, query, columns, geometry_format='wkt'):
+        # type: (DbConnect, str, list, str) -> tuple
+        """
+        Builds the wrapper query for _geometry_query from an already described query
+        :param query: SQL query as string type (cleaned, without a trailing ;)
+        :param columns: list of (column name, type name) tuples from _describe_query
+        :param geometry_format: 'wkt' (default) or 'wkb'
+        :return: (rewritten query, [(geometry column, declared type)]); (None, []) if there are no geometry columns or
+        the columns don't have unique names
+        """
+        columns = [(name, type_name if type_name.split('(')[0] in ('geometry', 'geography') else None)
+                   for name, type_name in columns]
+
+        # Every column needs a unique name to be selected from the wrapper
+        names = [name for name, _ in columns]
+        if not any(geometry for _, geometry in columns) or not all(names) or len(set(names)) != len(names):
+            return None, list()
+
+        if self.type == PG:
+            quoted = ['"' + name.replace('"', '""') + '"' for name, _ in columns]
+            geometry_column = {'wkt': 'st_astext(q.{c}) as {c}', 'wkb': 'st_asbinary(q.{c}) as {c}'}[geometry_format]
+        else:
+            quoted = ['[' + str(name).replace(']', ']]') + ']' for name, _ in columns]
+            geometry_column = {'wkt': 'q.{c}.STAsText() as {c}', 'wkb': 'q.{c}.STAsBinary() as {c}'}[geometry_format]
+
+        # Newlines keep a trailing -- comment from swallowing the wrapper
+        geometry_query = 'select {cols} from (\n{q}\n) q'.format(
+            cols=', '.join([geometry_column.format(c=col) if geometry else 'q.' + col
+                            for col, (_, geometry) in zip(quoted, columns)]),
+            q=query
+        )
+
+        return geometry_query, [(name, geometry) for name, geometry in columns if geometry]
+
+    def _copy_query_to_csv(self, query, output_file, sep=',', quote_strings=True, quiet=False, compression=None,
+                           compression_thread=False, wkt=False):
+        # type: (DbConnect, str, str, str, bool, bool, Optional[str], bool, bool) -> bool
+        """
+        Streams PG query results straight to a csv file with COPY (query) TO STDOUT WITH (FORMAT csv, HEADER). Rows are
+        written by psycopg2 as they arrive; nothing is loaded into pandas. Routed to by query_to_csv and table_to_csv.
+        :param query: SQL query as string type; must be a single statement that returns rows
+        :param output_file: File path for resulting csv file
+        :param sep: Delimiter for csv; defaults to comma (,)
+        :param quote_strings: Defaults to True (FORCE_QUOTE *, all non-null values quoted); if False, minimal quoting
+        :param quiet: if true, does not output location, row count and time
+        :param compression: None (plain csv), 'gzip', 'bz2' or 'zstd' (requires zstandard)
+        :param compression_thread: if True, compresses on a background thread so compression overlaps the COPY stream
+        :param wkt: if True, geometry columns are converted with ST_AsText; found from the same describe that checks
+        the query, on the same connection as the COPY
+        :return: True if written; False if the query cannot be run by COPY (ex. several statements or an error), in
+        which case nothing is written
+        """
+        query = clean_query_special_characters(query).strip().rstrip(';').strip()
+
+        if len(sep) != 1 or not query:
+            return False
+
+        borrowed = self.check_conn()
+        cur = self.conn.cursor()
+        start = time.time()
+
+        try:
+            # Check the query can be a COPY source (one statement that returns rows) before the file is opened
+            try:
+                columns = self.__describe_cursor(cur, query)
+            except psycopg2.Error:
+                self.conn.rollback()
+                return False
+
+            if not columns:
+                return False
+
+            if wkt:
+                query = self.__geometry_projection(query, columns)[0] or query
+
+            copy_qry = "COPY (\n{q}\n) TO STDOUT WITH (FORMAT csv, HEADER, DELIMITER {d}{f})".format(
+                q=query, d="'" + sep.replace("'", "''") + "'", f=', FORCE_QUOTE *' if quote_strings else '')
+
+            if not quiet:
+                print('Writing to %s' % output_file)
+
+            with open_text_output(output_file, compression, compression_thread) as f:
+                try:
+                    cur.copy_expert(copy_qry, f)
+                except psycopg2.Error:
+                    self.conn.rollback()
+                    failed = True
+                else:
+                    failed = False
+
+            if failed:
+                os.remove(output_file)
+                return False
+
+            rows = cur.rowcount
+            self.conn.commit()
+        finally:
+            cur.close()
+
+            if (not self.allow_temp_tables and not self.use_pool) or \
+                    (self.use_pool and borrowed and not self.allow_temp_tables):
+                self.disconnect(True)
 
         if not quiet:
-            print('Writing to %s' % output_file)
+            duration = time.time() - start
+            print('{c} rows written in {d:.2f} s ({r:,.0f} rows/sec)'.format(
+                c=rows, d=duration, r=rows / duration if duration else rows))
 
-        qry.query_to_csv(output=output_file, open_file=open_file, quote_strings=quote_strings, sep=sep)
+        return True
 
     def query_to_map(self, query, value_column, geom_column=None, id_column=None):
         """
@@ -1389,6 +2480,8 @@ class DbConnect:
             print('This is only available for Postgres right now.')
             return
 
+        import plotly.express as px
+
         if (geom_column and not id_column) or (not geom_column and id_column):
             raise RuntimeError('Please input both geom and id columns or use the built-in precinct, nta, or borough.')
 
@@ -1458,7 +2551,7 @@ class DbConnect:
         fig.show()
         return
 
-    def query_to_shp(self, query, path=None, shp_name=None, cmd=None, gdal_data_loc=GDAL_DATA_LOC,
+    def query_to_shp(self, query, path=None, shp_name=None, cmd=None, gdal_data_loc=None,
                      print_cmd=False, srid=2263):
         """
         Exports query results to a shp file.
@@ -1471,78 +2564,22 @@ class DbConnect:
         :param srid: SRID to manually set output to; defaults to 2263
         :return:
         """
-        # Temporarily sets temp flag to True
-        original_temp_flag = self.allow_temp_tables
-        self.allow_temp_tables = True
-
-        # Makes a temp table name
-        tmp_table_name = "tmp_query_to_shp_{}_{}".format(self.user,
-                                                         str(datetime.datetime.now())[:16].replace('-', '_').replace(
-                                                             ' ', '_').replace(':', ''))
-
-        # Create temp table to get column types
+        # Extract column names, including datetime/timestamp types, from a describe of the query (not run)
         try:
-            # Drop the temp table
-            if self.type == PG:
-                self.query("drop table {}".format(tmp_table_name), internal=True, strict=False)
-            elif self.type == MS:
-                self.query("drop table #{}".format(tmp_table_name), internal=True, strict=False)
+            columns = self._describe_query(query)
         except Exception as e:
-            print(e)
-            pass
+            print("- Query failed: " + str(e) + '\n\t')
+            sys.exit()
 
-        if self.type == PG:
-            self.query(u"""    
-            create temp table {} as     
-            select * 
-            from ({}) q 
-            limit 10
-            """.format(tmp_table_name, query), internal=True)
-        elif self.type == MS:
-            self.query(u"""        
-            select top 10 * 
-            into #{}
-            from ({}) q 
-            """.format(tmp_table_name, query), internal=True)
+        dt_types = [name for name, type_name in columns if 'datetime' in type_name or 'timestamp' in type_name]
 
-        # Extract column names, including datetime/timestamp types, from results
         if self.type == PG:
-            col_df = self.dfquery("""
-            SELECT *
-            FROM
-            INFORMATION_SCHEMA.COLUMNS
-            WHERE TABLE_NAME = '{}'
-            """.format(tmp_table_name), internal=True)
-
-            cols = ['\\"' + c + '\\"' for c in list(col_df['column_name'])]
-            dt_col_names = ['\\"' + c + '\\"' for c in list(
-                col_df[col_df['data_type'].str.contains('datetime') | col_df['data_type'].str.contains('timestamp')][
-                    'column_name'])]
+            cols = ['\\"' + c + '\\"' for c, _ in columns]
+            dt_col_names = ['\\"' + c + '\\"' for c in dt_types]
 
         elif self.type == MS:
-            col_df = self.dfquery("""
-            SELECT
-                [column] = c.name,
-                [type] = t.name, 
-                c.max_length, 
-                c.precision, 
-                c.scale, 
-                c.is_nullable
-            FROM
-                tempdb.sys.columns AS c
-            LEFT JOIN
-                tempdb.sys.types AS t
-            ON
-                c.system_type_id = t.system_type_id
-                AND
-                t.system_type_id = t.user_type_id
-            WHERE
-                [object_id] = OBJECT_ID(N'tempdb.dbo.#{}');
-            """.format(tmp_table_name), internal=True)
-
-            cols = ['[' + c + ']' for c in list(col_df['column'])]
-            dt_col_names = ['[' + c + ']' for c in list(
-                col_df[col_df['type'].str.contains('datetime') | col_df['type'].str.contains('timestamp')]['column'])]
+            cols = ['[' + c + ']' for c, _ in columns]
+            dt_col_names = ['[' + c + ']' for c in dt_types]
 
         # Make string of columns to be returned by select statement
         return_cols = ' , '.join([c for c in cols if c not in dt_col_names])
@@ -1581,18 +2618,10 @@ class DbConnect:
         Query.query_to_shp(self, new_query, path=path, shp_name=shp_name, cmd=cmd, gdal_data_loc=gdal_data_loc,
                            print_cmd=print_cmd, srid=srid)
 
-        # Drop the temp table
-        if self.type == PG:
-            self.query("drop table {}".format(tmp_table_name), internal=True)
-        elif self.type == MS:
-            self.query("drop table #{}".format(tmp_table_name), internal=True)
-
-        # Reset the temp flag
         self.last_query = new_query
-        self.allow_temp_tables = original_temp_flag
 
     def table_to_shp(self, table, schema=None, strict=True, path=None, shp_name=None, cmd=None,
-                     gdal_data_loc=GDAL_DATA_LOC, print_cmd=False, srid=2263):
+                     gdal_data_loc=None, print_cmd=False, srid=2263):
         """
         Exports table to a shp file. Generates query to query_to_shp.
         :param table: Database table name as string type
@@ -1616,7 +2645,7 @@ class DbConnect:
                                  print_cmd=print_cmd, srid=srid)
 
     def table_to_csv(self, table, schema=None, strict=True, output_file=None, open_file=False, sep=',',
-                     quote_strings=True):
+                     quote_strings=True, use_copy=False, wkt=None, compression=None, compression_thread=False):
         """
         Writes table to csv
         :param table: table name
@@ -1626,11 +2655,17 @@ class DbConnect:
         :param open_file: Boolean flag to auto open output file; defaults to False
         :param sep: Separator for csv (defaults to ',')
         :param quote_strings: Boolean flag for adding quote strings to output (defaults to true, QUOTE_ALL)
+        :param use_copy: PG only; if True, streams the table to the file with COPY ... TO STDOUT. Defaults to False;
+        COPY output is formatted by PG (see query_to_csv)
+        :param wkt: None (default), True or False; see query_to_csv. Server-side WKT on PG needs use_copy=True; on MS
+        it is only done if wkt is True. If False, geometry is written as returned (WKB hex on PG)
+        :param compression: None (default, plain csv), 'gzip', 'bz2' or 'zstd' (requires zstandard)
+        :param compression_thread: if True, compresses on a background thread so compression overlaps fetching
         :return: None
         """
         # If no output_file, outputs to current directory with table as filename
         if not output_file:
-            output_file = os.path.join(os.getcwd(), table + '.csv')
+            output_file = os.path.join(os.getcwd(), table + '.csv' + COMPRESSION_EXTENSIONS.get(compression, ''))
 
         if schema:
             schema_table = '{}.{}'.format(schema, table)
@@ -1642,19 +2677,180 @@ class DbConnect:
         from {}
         """.format(schema_table)
 
+        if use_copy and self.type == PG:
+            if self._copy_query_to_csv(query, output_file, sep=sep, quote_strings=quote_strings,
+                                       compression=compression, compression_thread=compression_thread,
+                                       wkt=wkt is not False):
+                if open_file:
+                    os.startfile(output_file)
+                return
+
+        # MS geometry columns are only described (an extra round trip) when asked for
+        wkt_query = self._geometry_query(query)[0] if wkt and self.type == MS else None
+        if wkt_query:
+            query = wkt_query
+
         self.check_conn()
         qry = Query(self, query, strict=strict, iterate=True, no_comment=True, temp=False)
 
         print('Writing to %s' % output_file)
 
-        qry.iterable_query_to_csv(output=output_file, open_file=open_file, quote_strings=quote_strings, sep=sep)
+        qry.iterable_query_to_csv(output=output_file, open_file=open_file, quote_strings=quote_strings, sep=sep,
+                                  compression=compression, compression_thread=compression_thread,
+                                  convert_geom=wkt is not False and not wkt_query)
 
         if not self.allow_temp_tables:
             self.disconnect(True)
 
+    def query_to_parquet(self, query, strict=True, output_file=None, row_group_size=PARQUET_ROW_GROUP_SIZE,
+                         compression='snappy', quiet=False):
+        """
+        Exports query results to a Parquet file, streaming from a server-side cursor one row group at a time.
+        Requires pyarrow.
+        :param query: SQL query as string type
+        :param strict: If true will run sys.exit on failed query attempts
+        :param output_file: File path for resulting Parquet file
+        :param row_group_size: rows fetched and written per row group (defaults to 100,000)
+        :param compression: Parquet compression codec (snappy, gzip, brotli, zstd, lz4 or none; defaults to snappy)
+        :param quiet: if true, does not output query metrics or output location
+        :return: None
+        """
+        # If no output specified, defaults to a generic data parquet name with the date
+        if not output_file:
+            output_file = os.path.join(os.getcwd(),
+                                       'data_{}.parquet'.format(datetime.datetime.now().strftime('%Y%m%d%H%M')))
+
+        self.check_conn()
+        qry = Query(self, query, strict=strict, timeme=(not quiet), iterate=True, no_comment=True, temp=False)
+
+        try:
+            # Failed (non-strict) query
+            if qry.current_cur is None:
+                return
+
+            if not quiet:
+                print('Writing to %s' % output_file)
+
+            rows = qry.iterable_query_to_parquet(output=output_file, row_group_size=row_group_size,
+                                                 compression=compression)
+
+            if not quiet:
+                print('Wrote {r} rows'.format(r=rows))
+        finally:
+            if not self.allow_temp_tables:
+                self.disconnect(True)
+
+    def table_to_parquet(self, table, schema=None, strict=True, output_file=None,
+                         row_group_size=PARQUET_ROW_GROUP_SIZE, compression='snappy'):
+        """
+        Writes table to a Parquet file. Generates query to query_to_parquet.
+        :param table: table name
+        :param schema: schema for table (defaults to default schema)
+        :param strict: If True, will run sys.exit on failed query attempts; defaults to True
+        :param output_file: String for Parquet output file location (defaults to current directory)
+        :param row_group_size: rows fetched and written per row group (defaults to 100,000)
+        :param compression: Parquet compression codec (snappy, gzip, brotli, zstd, lz4 or none; defaults to snappy)
+        :return: None
+        """
+        # If no output_file, outputs to current directory with table as filename
+        if not output_file:
+            output_file = os.path.join(os.getcwd(), table + '.parquet')
+
+        if schema:
+            schema_table = '{}.{}'.format(schema, table)
+        else:
+            schema_table = '{}'.format(table)
+
+        self.query_to_parquet("select * from {}".format(schema_table), strict=strict, output_file=output_file,
+                              row_group_size=row_group_size, compression=compression)
+
+    def query_to_spatial(self, query, output_file=None, strict=True, driver=None, layer=None, srid=2263,
+                         batch_size=SPATIAL_BATCH_SIZE, encoding=None, layer_options=None, quiet=False):
+        """
+        Exports query results to a spatial file in process (no ogr2ogr): features are streamed from a server-side
+        cursor and written in batches with pyogrio. GeoPackage (.gpkg), FlatGeobuf (.fgb) and Shapefile (.shp) are
+        picked by extension; any other OGR driver can be set with driver. Requires pyogrio (GDAL >= 3.8) and pyarrow.
+        Geometry columns are converted to WKB on the server; the first one is written as the layer geometry. The layer
+        geometry type is the column's declared type (ex. geometry(MultiPolygon,2263)); if the column isn't limited to
+        one type, the layer is Unknown (Shapefile geometries are written as multi types).
+        :param query: SQL query as string type
+        :param output_file: File path for the output (defaults to data_YYYYMMDDHHMM.gpkg in the current directory)
+        :param strict: If true will run sys.exit on failed query attempts
+        :param driver: OGR driver name, if not from the extension (ex. 'GPKG')
+        :param layer: layer name (defaults to the file name)
+        :param srid: SRID of the output (defaults to 2263)
+        :param batch_size: features fetched and written per batch (defaults to 50,000)
+        :param encoding: Shapefile (.dbf) encoding (defaults to GDAL's)
+        :param layer_options: dict of OGR layer creation options (FlatGeobuf defaults to SPATIAL_INDEX=NO)
+        :param quiet: if true, does not output query metrics or output location
+        :return: None
+        """
+        # If no output specified, defaults to a generic data GeoPackage name with the date
+        if not output_file:
+            output_file = os.path.join(os.getcwd(),
+                                       'data_{}.gpkg'.format(datetime.datetime.now().strftime('%Y%m%d%H%M')))
+
+        wkb_query, geometry_columns = self._geometry_query(query, geometry_format='wkb')
+        geometry_column, column_type = geometry_columns[0] if geometry_columns else (None, None)
+
+        self.check_conn()
+        qry = Query(self, wkb_query or query, strict=strict, timeme=(not quiet), iterate=True, no_comment=True,
+                    temp=False)
+
+        try:
+            # Failed (non-strict) query
+            if qry.current_cur is None:
+                return
+
+            if not quiet:
+                print('Writing to %s' % output_file)
+
+            start = time.time()
+            rows = qry.iterable_query_to_spatial(output=output_file, driver=driver, layer=layer,
+                                                 geometry_column=geometry_column,
+                                                 geometry_type=declared_geometry_type(column_type or ''), srid=srid,
+                                                 batch_size=batch_size, encoding=encoding, layer_options=layer_options)
+            duration = time.time() - start
+
+            if not quiet:
+                print('{c} features written in {d:.2f} s ({r:,.0f} features/sec)'.format(
+                    c=rows, d=duration, r=rows / duration if duration else rows))
+        finally:
+            if not self.allow_temp_tables:
+                self.disconnect(True)
+
+    def table_to_spatial(self, table, schema=None, strict=True, output_file=None, driver=None, layer=None,
+                         srid=2263, batch_size=SPATIAL_BATCH_SIZE, encoding=None, layer_options=None):
+        """
+        Writes table to a spatial file in process. Generates query to query_to_spatial.
+        :param table: table name
+        :param schema: schema for table (defaults to default schema)
+        :param strict: If True, will run sys.exit on failed query attempts; defaults to True
+        :param output_file: File path for the output (defaults to table.gpkg in the current directory)
+        :param driver: OGR driver name, if not from the extension (ex. 'GPKG')
+        :param layer: layer name (defaults to the file name)
+        :param srid: SRID of the output (defaults to 2263)
+        :param batch_size: features fetched and written per batch (defaults to 50,000)
+        :param encoding: Shapefile (.dbf) encoding (defaults to GDAL's)
+        :param layer_options: dict of OGR layer creation options (FlatGeobuf defaults to SPATIAL_INDEX=NO)
+        :return: None
+        """
+        # If no output_file, outputs to current directory with table as filename
+        if not output_file:
+            output_file = os.path.join(os.getcwd(), table + '.gpkg')
+
+        if schema:
+            schema_table = '{}.{}'.format(schema, table)
+        else:
+            schema_table = '{}'.format(table)
+
+        self.query_to_spatial("select * from {}".format(schema_table), output_file=output_file, strict=strict,
+                              driver=driver, layer=layer, srid=srid, batch_size=batch_size, encoding=encoding,
+                              layer_options=layer_options)
+
     def shp_to_table(self, path=None, table=None, schema=None, shp_name=None, cmd=None,
-                     srid=2263, port=None, gdal_data_loc=GDAL_DATA_LOC, precision=False, private=False, temp=True,
-                     shp_encoding=None, print_cmd=False, days=7):
+                     srid=2263, port=None, gdal_data_loc=None, precision=False, private=False, temp=True,
+                     shp_encoding=None, print_cmd=False, days=7, native=False):
         """
         Imports shape file to database. This uses GDAL to generate the table.
         :param path: File path of the shapefile
@@ -1672,6 +2868,8 @@ class DbConnect:
         Options inlude LATIN1, UTF-8.
         :param print_cmd: Defaults to False; if True prints the cmd
         :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
+        :param native: PG only; if True, features are read with pyogrio and loaded with binary COPY instead of ogr2ogr
+        (cmd, port, gdal_data_loc, precision and print_cmd are not used). Requires pyogrio and pyarrow.
         :return:
         """
         if not schema:
@@ -1697,14 +2895,17 @@ class DbConnect:
         shp = Shapefile(dbo=self, path=path, table=table, schema=schema, shp_name=shp_name,
                         cmd=cmd, srid=srid, gdal_data_loc=gdal_data_loc, port=port)
 
-        shp.read_shp(precision, private, shp_encoding, print_cmd)
+        if native and self.type == PG:
+            shp.read_native(private, encoding=shp_encoding)
+        else:
+            shp.read_shp(precision, private, shp_encoding, print_cmd)
 
         if temp:
             self.__run_table_logging([schema + "." + table], days=days)
 
-    def feature_class_to_table(self, path, table, schema=None, shp_name=None, gdal_data_loc=GDAL_DATA_LOC,
+    def feature_class_to_table(self, path, table, schema=None, shp_name=None, gdal_data_loc=None,
                                srid=2263, private=False, temp=True, fc_encoding=None, print_cmd=False,
-                               days=7, skip_failures=''):
+                               days=7, skip_failures='', native=False):
         """
         Imports shape file feature class to database. This uses GDAL to generate the table.
         :param path: Filepath to the geodatabase
@@ -1719,6 +2920,8 @@ class DbConnect:
         Options inlude LATIN1, UTF-8.
         :param print_cmd: Optional flag to print the GDAL command that is being used; defaults to False
         :param days: if temp=True, the number of days that the temp table will be kept. Defaults to 7.
+        :param native: PG only; if True, features are read with pyogrio and loaded with binary COPY instead of ogr2ogr
+        (gdal_data_loc, print_cmd and skip_failures are not used). Requires pyogrio and pyarrow.
         :return:
         """
         if not schema:
@@ -1737,7 +2940,10 @@ class DbConnect:
         shp = Shapefile(dbo=self, path=path, table=table, schema=schema, query=None,
                         shp_name=shp_name, cmd=None, srid=srid, gdal_data_loc=gdal_data_loc,skip_failures=skip_failures)
 
-        shp.read_feature_class(private, fc_encoding=fc_encoding, print_cmd=print_cmd)
+        if native and self.type == PG:
+            shp.read_native(private, encoding=fc_encoding, layer=shp_name)
+        else:
+            shp.read_feature_class(private, fc_encoding=fc_encoding, print_cmd=print_cmd)
 
         if temp:
             self.__run_table_logging([schema + "." + table], days=days)
@@ -1,4 +1,6 @@
 import csv
+import decimal
+import json
 import sys
 
 import psycopg2
@@ -6,6 +8,23 @@ import psycopg2
 from .shapefile import *
 from .util import parse_table_string
 
+# Rows fetched per batch by the columnar (dfquery) fetch
+COLUMNAR_FETCH_SIZE = 100000
+
+# PG type OIDs (cursor.description type_code) that get typed NumPy columns
+PG_INT_TYPES = (20, 21, 23)
+PG_FLOAT_TYPES = (700, 701)
+PG_BOOL_TYPES = (16,)
+
+# Rows fetched and written per batch by the csv writers
+CSV_BATCH_SIZE = 100000
+
+# Default rows per row group for Parquet exports
+PARQUET_ROW_GROUP_SIZE = 100000
+
+# Default features per batch for in-process spatial exports
+SPATIAL_BATCH_SIZE = 50000
+
 
 class Query:
     """
@@ -22,7 +41,11 @@ class Query:
         qt = self.__query_time_format()
         records = 0
 
-        if self.data:
+        if self.df is not None:
+            records = len(self.df)
+        elif self.rows_written is not None:
+            records = self.rows_written
+        elif self.data:
             records = len(self.data)
 
         return '- Query run {dt}\n Query time: {qt} \n * Returned {r} rows *'.format(
@@ -31,7 +54,8 @@ class Query:
             qt=qt)
 
     def __init__(self, dbo, query_string, strict=True, permission=True, temp=True, comment='', no_comment=False,
-                 timeme=True, iterate=False, lock_table=None, internal=False):
+                 timeme=True, iterate=False, lock_table=None, internal=False, params=None, columnar=False,
+                 to_csv=None):
         """
         :param dbo: DbConnect object
         :param query_string: String/unicode sql query to be run
@@ -43,6 +67,15 @@ class Query:
         :param timeme: Flag for if table is temporary or permanent (defaults toTrue)
         :param iterate:
         :param lock_table:
+        :param params: sequence of bind parameters for the driver's placeholders (%s on PG, ? on MS); when the
+                connection is kept between queries (use_pool or allow_temp_tables), queries with params are prepared
+                once per connection and reused from the DbConnect's statement cache
+        :param columnar: if True, results are fetched in batches straight into typed columns of a DataFrame (self.df)
+                instead of a list of row tuples; self.data is only built from the DataFrame if it is read
+        :param to_csv: dict of csv arguments (output, quote_strings, sep, compression, compression_thread,
+                convert_geom); if given, results are fetched in batches and written to the csv in place of being kept
+                in self.data (before the query is committed and logged). On PG a single select is fetched from a
+                server-side cursor, so only one batch is held in memory at a time.
         """
         # Explicitly in __init__
         self.dbo = dbo
@@ -55,6 +88,9 @@ class Query:
         self.timeme = timeme
         self.iterate = iterate
         self.lock_table = lock_table
+        self.params = params
+        self.columnar = columnar
+        self.to_csv = to_csv
 
         # Other initialized variables
         self.query_start = datetime.datetime.now()
@@ -64,10 +100,12 @@ class Query:
         self.data_description = None
         self.data_columns = None
         self.data = None
+        self.df = None
         self.new_tables = list()
         self.renamed_tables = list()
         self.dropped_tables = list()
         self.current_cur = None
+        self.rows_written = None
 
         # Run (execute) query, comments, and logging.
         self.__run_query(internal)
@@ -109,6 +147,59 @@ class Query:
                 print("- Failed to obtain exclusive lock on table {}. Try again.".format(self.lock_table))
                 raise a
 
+    def __execute_prepared(self, cur):
+        """
+        Executes the query with params, through a prepared statement cached for the connection so repeated
+        statements are not parsed and planned again
+        :param cur: cursor
+        :return: cursor holding the results
+        """
+        cache = self.dbo._statement_cache(self.dbo.conn)
+
+        if self.dbo.type == PG:
+            name = cache.get(self.query_string)
+            prepared_query, param_count = numbered_placeholders(self.query_string)
+
+            if name is None:
+                name = cache.next_name()
+                cur.execute('PREPARE {n} AS {q}'.format(n=name, q=prepared_query))
+
+                for evicted in cache.add(self.query_string, name):
+                    cur.execute('DEALLOCATE {}'.format(evicted))
+
+            if param_count:
+                cur.execute('EXECUTE {n} ({p})'.format(n=name, p=', '.join(['%s'] * param_count)), self.params)
+            else:
+                cur.execute('EXECUTE {}'.format(name))
+            return cur
+
+        prepared_cur = cache.get(self.query_string)
+        if prepared_cur is None:
+            prepared_cur = cur
+            for evicted in cache.add(self.query_string, prepared_cur):
+                evicted.close()
+
+        prepared_cur.execute(self.query_string, self.params)
+        return prepared_cur
+
+    def __deallocate(self, statement):
+        """
+        Removes a prepared statement from the connection after its query failed
+        :param statement: PG statement name or MS cursor (from the statement cache)
+        :return: None
+        """
+        try:
+            if self.dbo.type == PG:
+                cur = self.dbo.conn.cursor()
+                cur.execute('DEALLOCATE {}'.format(statement))
+                cur.close()
+                self.dbo.conn.commit()
+            else:
+                statement.close()
+        except Exception:
+            # Already gone (ex. PREPARE itself failed)
+            self.dbo.conn.rollback()
+
     def __query_data(self, cur):
         """
         Parses the results of the query and stores data and columns in Query class attribute
@@ -118,7 +209,119 @@ class Query:
         self.has_data = True
         self.data_description = cur.description
         self.data_columns = [desc[0] for desc in self.data_description]
-        self.data = cur.fetchall()
+
+        if self.columnar:
+            self.df = self.__fetch_columns(cur)
+        else:
+            self.data = cur.fetchall()
+
+    @property
+    def data(self):
+        """
+        Query results as a list of rows. Columnar results are converted from the DataFrame the first time this is read.
+        """
+        if self.__data is None and self.df is not None:
+            self.__data = self.__rows_from_columns(self.df)
+        return self.__data
+
+    @data.setter
+    def data(self, value):
+        self.__data = value
+        self.df = None
+
+    @staticmethod
+    def __rows_from_columns(df):
+        """
+        Converts a columnar result back to row tuples of python values, with None for nulls. Int columns that had
+        nulls stay floats.
+        :param df: DataFrame from __fetch_columns
+        :return: list of row tuples
+        """
+        columns = list()
+
+        for col in range(df.shape[1]):
+            series = df.iloc[:, col]
+
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = np.array(series.dt.to_pydatetime(), dtype=object)
+            else:
+                values = series.astype(object).values.copy()
+
+            values[series.isnull().values] = None
+            columns.append(values)
+
+        return list(zip(*columns))
+
+    def __column_kind(self, type_code):
+        """
+        :param type_code: cursor.description type code (PG type OID, or python type for pyodbc)
+        :return: 'int', 'float', 'bool' or 'object'
+        """
+        if self.dbo.type == PG:
+            if type_code in PG_INT_TYPES:
+                return 'int'
+            if type_code in PG_FLOAT_TYPES:
+                return 'float'
+            if type_code in PG_BOOL_TYPES:
+                return 'bool'
+        else:
+            if type_code is bool:
+                return 'bool'
+            if type_code is int:
+                return 'int'
+            if type_code is float:
+                return 'float'
+
+        return 'object'
+
+    @staticmethod
+    def __column_array(values, kind):
+        """
+        Converts one batch of values of a column to a NumPy array
+        :param values: tuple of column values
+        :param kind: column kind from __column_kind
+        :return: NumPy array (ints with nulls become floats with NaN, as when pandas builds a DataFrame from rows)
+        """
+        if kind == 'int' and None not in values:
+            return np.array(values, dtype=np.int64)
+
+        if kind in ('int', 'float'):
+            return np.array(values, dtype=np.float64)
+
+        if kind == 'bool' and None not in values:
+            return np.array(values, dtype=bool)
+
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    def __fetch_columns(self, cur):
+        """
+        Fetches results COLUMNAR_FETCH_SIZE rows at a time and converts each batch to one NumPy array per column, so the
+        full result is never held as python row tuples
+        :param cur: cursor with results
+        :return: DataFrame with dtypes from cursor.description (object columns are inferred, as with row data)
+        """
+        kinds = [self.__column_kind(desc[1]) for desc in self.data_description]
+        columns = [list() for _ in kinds]
+
+        while True:
+            rows = cur.fetchmany(COLUMNAR_FETCH_SIZE)
+            if not rows:
+                break
+
+            # pyodbc Rows are unpacked directly; no tuple copy of each row
+            for i, values in enumerate(zip(*rows)):
+                columns[i].append(self.__column_array(values, kinds[i]))
+
+            del rows
+
+        arrays = {i: np.concatenate(batches) if batches else np.empty(0, dtype=object)
+                  for i, batches in enumerate(columns)}
+
+        df = pd.DataFrame(arrays, copy=False).infer_objects()
+        df.columns = self.data_columns
+        return df
 
     def __update_log_for_renamed_table(self, new_schema_table, old_table):
         _serv, _dab, schema, new_table = parse_table_string(new_schema_table, self.dbo.default_schema, self.dbo.type)
@@ -137,9 +340,15 @@ class Query:
 
         self.query_start = datetime.datetime.now()
 
-        # 1. Get connection cursor
+        # 1. Get connection cursor; a csv export of a single select is streamed from a server-side cursor on PG so
+        # the result set is not all held by the client
+        streamed = bool(self.to_csv) and self.dbo.type == PG and not self.lock_table and \
+            is_single_select(self.query_string)
+
         if self.iterate and self.dbo.type == PG:
             cur = self.dbo.conn.cursor(name='ss')
+        elif streamed:
+            cur = self.dbo.conn.cursor(name='ss_csv')
         else:
             cur = self.dbo.conn.cursor()
 
@@ -150,11 +359,22 @@ class Query:
         self.__perform_lock_routine(cur)
 
         # 4. Query Execution
+        # Statements are only prepared on connections that outlive the query; otherwise nothing would reuse them
+        prepared = self.params is not None and not self.iterate and not streamed and \
+            (self.dbo.use_pool or self.dbo.allow_temp_tables)
         try:
             # 4.1 Attempt to execute query string
-            cur.execute(self.query_string)
+            if prepared:
+                cur = self.__execute_prepared(cur)
+            elif self.params is not None:
+                cur.execute(self.query_string, self.params)
+            else:
+                cur.execute(self.query_string)
 
         except Exception as e:
+            # The prepared statement may not be usable after a failure
+            statement = self.dbo._statement_cache(self.dbo.conn).remove(self.query_string) if prepared else None
+
             # 4.2.1 If failure, return failure reason and time
             if self.dbo.type == MS:
                 if 'encode' in str(e).lower() or 'ascii' in str(e).lower():
@@ -176,8 +396,10 @@ class Query:
 
             del cur
 
-            # 4.2.2 Then rollback
+            # 4.2.2 Then rollback and drop the prepared statement from the connection
             self.dbo.conn.rollback()
+            if statement is not None:
+                self.__deallocate(statement)
 
             # 4.2.3 Exit
             if self.strict:
@@ -196,8 +418,11 @@ class Query:
                 cur.itersize = 20000
             self.current_cur = cur
         else:
-            # 6.2 Query data if any has been returned
-            if cur.description:
+            # 6.2 Query data (or stream it to csv) if any has been returned; a server-side cursor only has a
+            # description after the first fetch
+            if (streamed or cur.description) and self.to_csv:
+                self.rows_written = self.__write_csv(self.__cursor_batches(cur), cur=cur, **self.to_csv)
+            elif cur.description:
                 self.__query_data(cur)
 
             # 6.3 Commit and run new/dropped/renamed tables routine
@@ -251,6 +476,9 @@ class Query:
         Note: cannot use pd.read_sql() because the structure will necessitate running query twice
         :return: Pandas DataFrame of the results of the query
         """
+        if self.df is not None:
+            return self.df
+
         if self.dbo.type == MS:
             self.data = [tuple(i) for i in self.data]
             df = pd.DataFrame(self.data, columns=self.data_columns)
@@ -417,9 +645,10 @@ class Query:
             query = """
                 SELECT indexname
                 FROM pg_indexes
-                WHERE tablename = '{t}'
-                AND schemaname='{s}';
-            """.format(t=tbl, s=sch)
+                WHERE tablename = %s
+                AND schemaname = %s;
+            """
+            params = (tbl, sch)
         elif self.dbo.type == 'MS':
             query = """      
                 SELECT a.name AS indexname
@@ -428,8 +657,9 @@ class Query:
                     ON a.object_id = b.object_id AND a.index_id = b.index_id
                 WHERE
                     a.is_hypothetical = 0 
-                    AND a.object_id = OBJECT_ID('{s}.{t}')
-            """.format(t=tbl, s=sch, d=database)
+                    AND a.object_id = OBJECT_ID(?)
+            """.format(d=database)
+            params = ('{s}.{t}'.format(s=sch, t=tbl),)
         # make sure looking in the right server, dont need to worry about db, since this is a sys table
 
         if not get_unique_table_schema_string(server, self.dbo.type) == self.dbo.server:
@@ -438,7 +668,7 @@ class Query:
             ))
             indices = []
         else:
-            self.dbo.query(query, strict=True, timeme=False, internal=True)
+            self.dbo.query(query, strict=True, timeme=False, internal=True, params=params)
             indices = self.dbo.internal_data or []
 
         for idx in indices:
@@ -469,177 +699,404 @@ class Query:
                 )
                 self.dbo.query(q, strict=False, timeme=False, internal=True)
 
-    def iterable_query_to_csv(self, output, open_file, quote_strings, sep):
+    def iterable_query_to_csv(self, output, open_file, quote_strings, sep, compression=None,
+                              compression_thread=False, convert_geom=True):
         """
         Writes results of the iterable query to a csv file; iterating over cursor results.
-        This is different from chunked_write_csv in that the cursor only obtains 20k records at a time, meaning
-        it works if the data itself is too big to even load at once.
+        On PG the cursor is server-side, so only one batch of CSV_BATCH_SIZE records is fetched at a time,
+        meaning it works if the data itself is too big to even load at once.
         :param output:
         :param open_file:
         :param quote_strings:
         :param sep:
+        :param compression: None (plain csv), 'gzip', 'bz2' or 'zstd' (requires zstandard)
+        :param compression_thread: if True, compresses on a background thread so compression overlaps fetching
+        :param convert_geom: if True, a geom column of WKB is converted to WKT (False if done on the server)
         :return:
         """
-        self.has_data = True
-        cur = self.current_cur
+        self.__write_csv(self.__cursor_batches(self.current_cur), output, quote_strings=quote_strings, sep=sep,
+                         dropna=True, cur=self.current_cur, compression=compression,
+                         compression_thread=compression_thread, convert_geom=convert_geom)
 
-        batch = []
-        i = 0
-        first_iteration = True
-
-        # Iterate over server-side cursor
-        for row in cur:
-            if i == 0:
-                self.data_description = cur.description
-                self.data_columns = [desc[0] for desc in self.data_description]
-
-            # Get data
-            batch.append(row)
-            i = i + 1
-
-            # After each iteration, dump data to csv
-            if i % 20000 == 0:
-
-                # Make and clean df, as per usual
-                self.data = batch
-                df = self.dfquery()
-                df.columns = self.data_columns
-                df = convert_geom_col(df)
-                df = df.dropna(how='all')
-
-                # Include header with first iteration
-                if first_iteration:
-                    # Write out 1st chunk
-                    if quote_strings:
-                        df.to_csv(output, index=False, quoting=csv.QUOTE_ALL, sep=sep)
-                    else:
-                        df.to_csv(output, index=False, sep=sep)
+        # Close connections
+        self.__safe_commit()
+        self.dbo.disconnect(True)
 
-                    first_iteration = False
-                else:
-                    # Otherwise, append to existing csv
-                    if quote_strings:
-                        df.to_csv(output, index=False, quoting=csv.QUOTE_ALL, sep=sep, mode='a', header=False)
-                    else:
-                        df.to_csv(output, index=False, sep=sep, mode='a', header=False)
+        if open_file:
+            os.startfile(output)
+
+    @staticmethod
+    def __cursor_batches(cur, size=None):
+        """
+        :param cur: cursor with results
+        :param size: rows per batch (defaults to CSV_BATCH_SIZE)
+        :return: generator of lists of rows, in cursor order
+        """
+        size = size or CSV_BATCH_SIZE
+
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                return
+            yield rows
+
+    def __write_csv(self, batches, output, quote_strings=True, sep=',', dropna=False, cur=None, compression=None,
+                    compression_thread=False, convert_geom=True):
+        """
+        Writes batches of rows to a csv file in order, through one open file: the header is written with the first
+        batch and only one batch is converted to a DataFrame at a time, so memory use depends on the batch size,
+        not on the number of rows. Integer columns (from the cursor description) are written as integers in every
+        batch, whether or not the batch has NULLs.
+        :param batches: iterable of lists of rows
+        :param output: String for csv output file location
+        :param quote_strings: Boolean flag for adding quote strings to output (defaults to True, QUOTE_ALL)
+        :param sep: Separator for csv (defaults to ',')
+        :param dropna: if True, rows that are entirely null are not written
+        :param cur: cursor the batches are fetched from; its description sets the columns (PG server-side cursors only
+        have a description after the first fetch)
+        :param compression: None (plain csv), 'gzip', 'bz2' or 'zstd' (requires zstandard)
+        :param compression_thread: if True, compresses on a background thread so compression overlaps fetching
+        :param convert_geom: if True, a geom column of WKB is converted to WKT (clean_df_before_output)
+        :return: number of rows written
+        """
+        self.has_data = True
+        quoting = csv.QUOTE_ALL if quote_strings else csv.QUOTE_MINIMAL
+        rows_written = 0
+        header = True
+        int_columns = list()
+
+        with open_text_output(output, compression, compression_thread) as f:
+            for batch in batches:
+                if header:
+                    if cur is not None:
+                        self.data_description = cur.description
+                        self.data_columns = [desc[0] for desc in self.data_description]
+                    int_columns = self.__int_columns()
+
+                # pyodbc Rows are not tuples
+                if self.dbo.type == MS:
+                    batch = [tuple(row) for row in batch]
+
+                df = pd.DataFrame(batch, columns=self.data_columns)
+
+                # Integer columns are nullable Int64 in every batch; a NULL would otherwise make one batch write 1.0
+                for i in int_columns:
+                    df[self.data_columns[i]] = pd.array([row[i] for row in batch], dtype='Int64')
+
+                if convert_geom:
+                    df = clean_df_before_output(df)
+                if dropna:
+                    df = df.dropna(how='all')
+
+                df.to_csv(f, index=False, quoting=quoting, sep=sep, header=header)
+                rows_written += len(df)
+                header = False
 
                 # Safeguard for memory issues
                 del df
                 del batch
-                self.data = None
 
-                i = 0
-                batch = []
+            # No rows; header only
+            if header:
+                if cur is not None and cur.description:
+                    self.data_description = cur.description
+                    self.data_columns = [desc[0] for desc in self.data_description]
 
-        # For remaining rows...
-        self.data = batch
-        df = self.dfquery()
-        df.columns = self.data_columns
-        df = clean_df_before_output(df)
-        df = df.dropna(how='all')
+                pd.DataFrame(columns=self.data_columns).to_csv(f, index=False, quoting=quoting, sep=sep)
 
-        if first_iteration:
-            # Write out 1st chunk
-            if quote_strings:
-                df.to_csv(output, index=False, quoting=csv.QUOTE_ALL, sep=sep)
-            else:
-                df.to_csv(output, index=False, sep=sep)
+        return rows_written
+
+    def __int_columns(self):
+        """
+        :return: positions of integer columns in the cursor description; columns with duplicate names are skipped
+        """
+        if not self.data_description:
+            return list()
+
+        names = [desc[0] for desc in self.data_description]
+        return [i for i, desc in enumerate(self.data_description)
+                if self.__column_kind(desc[1]) == 'int' and names.count(desc[0]) == 1]
+
+    def __geometry_type_codes(self):
+        """
+        :return: type codes of PostGIS geometry/geography columns (their OIDs differ by database); empty for MS
+        """
+        if self.dbo.type != PG:
+            return set()
+
+        # Plain cursor on the same connection/transaction as the (server-side) query cursor
+        cur = self.dbo.conn.cursor()
+        cur.execute(PG_GEOMETRY_TYPES_QUERY)
+        codes = {row[0] for row in cur.fetchall()}
+        cur.close()
+        return codes
+
+    def __arrow_field(self, desc, geometry_types):
+        """
+        Maps a cursor.description entry to an Arrow type
+        :param desc: cursor.description entry (name, type_code, display_size, internal_size, precision, scale, ...)
+        :param geometry_types: type codes of geometry columns
+        :return: (Arrow type, function converting a list of column values for pa.array, or None)
+        """
+        import pyarrow as pa
+
+        type_code, precision, scale = desc[1], desc[4], desc[5]
+
+        def to_float(values):
+            return [None if v is None else float(v) for v in values]
+
+        def to_str(values):
+            return [v if v is None or isinstance(v, str) else str(v) for v in values]
+
+        def to_wkb(values):
+            # EWKB hex from PostGIS to plain WKB (no SRID)
+            import shapely
+            geoms = shapely.from_wkb(np.array(values, dtype=object))
+            return list(shapely.to_wkb(geoms, include_srid=False))
+
+        if type_code in geometry_types:
+            return pa.binary(), to_wkb
+
+        if self.dbo.type == PG:
+            types = {
+                16: pa.bool_(), 17: pa.binary(), 20: pa.int64(), 21: pa.int16(), 23: pa.int32(),
+                700: pa.float32(), 701: pa.float64(), 1082: pa.date32(), 1083: pa.time64('us'),
+                1114: pa.timestamp('us'), 1184: pa.timestamp('us', tz='UTC')
+            }
+            is_decimal = type_code == 1700
         else:
-            # Otherwise, append to existing csv
-            if quote_strings:
-                df.to_csv(output, index=False, quoting=csv.QUOTE_ALL, sep=sep, mode='a', header=False)
-            else:
-                df.to_csv(output, index=False, sep=sep, mode='a', header=False)
+            types = {
+                bool: pa.bool_(), int: pa.int64(), float: pa.float64(), bytes: pa.binary(), bytearray: pa.binary(),
+                datetime.date: pa.date32(), datetime.time: pa.time64('us'), datetime.datetime: pa.timestamp('us')
+            }
+            is_decimal = type_code is decimal.Decimal
 
-        del df
-        del batch
-        self.data = None
+        if type_code in types:
+            return types[type_code], None
+
+        # numeric/decimal keeps its precision and scale if it has them; otherwise (unconstrained) it is a float
+        if is_decimal:
+            if precision and 0 < precision <= 38 and scale is not None and 0 <= scale <= precision:
+                return pa.decimal128(precision, scale), None
+            return pa.float64(), to_float
+
+        # Text and everything else (uuid, intervals, arrays, ...) is written as strings
+        return pa.string(), to_str
+
+    def iterable_query_to_parquet(self, output, row_group_size=PARQUET_ROW_GROUP_SIZE, compression='snappy'):
+        """
+        Writes results of the iterable query to a Parquet file. Rows are fetched from the cursor row_group_size at a
+        time and each batch is written as one row group, so memory use does not depend on the size of the result.
+        The file schema comes from the cursor description; PostGIS geometry columns are written as WKB with
+        GeoParquet metadata.
+        :param output: String for Parquet output file location
+        :param row_group_size: rows fetched and written per row group (defaults to 100,000)
+        :param compression: Parquet compression codec (snappy, gzip, brotli, zstd, lz4 or none; defaults to snappy)
+        :return: number of rows written
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.has_data = True
+        cur = self.current_cur
+        geometry_types = self.__geometry_type_codes()
+
+        writer = None
+        schema = None
+        converters = None
+        rows_written = 0
+
+        try:
+            while True:
+                rows = cur.fetchmany(row_group_size)
+
+                # Server-side cursors only have a description after the first fetch
+                if writer is None:
+                    self.data_description = cur.description
+                    self.data_columns = [desc[0] for desc in self.data_description]
+                    fields = [self.__arrow_field(desc, geometry_types) for desc in self.data_description]
+                    converters = [convert for _, convert in fields]
+
+                    geometry_columns = [desc[0] for desc in self.data_description if desc[1] in geometry_types]
+                    metadata = None
+                    if geometry_columns:
+                        metadata = {'geo': json.dumps({
+                            'version': '1.0.0',
+                            'primary_column': geometry_columns[0],
+                            'columns': {col: {'encoding': 'WKB', 'geometry_types': [], 'crs': None}
+                                        for col in geometry_columns}
+                        })}
+
+                    schema = pa.schema([pa.field(name, typ) for name, (typ, _) in zip(self.data_columns, fields)],
+                                       metadata=metadata)
+                    writer = pq.ParquetWriter(output, schema, compression=compression)
+
+                if not rows:
+                    break
+
+                arrays = list()
+                for values, field, convert in zip(zip(*rows), schema, converters):
+                    values = list(values)
+                    arrays.append(pa.array(convert(values) if convert else values, type=field.type))
+
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema), row_group_size=row_group_size)
+                rows_written += len(rows)
+
+                # Safeguard for memory issues
+                del rows
+                del arrays
+        finally:
+            if writer is not None:
+                writer.close()
 
-        # Close connections
         self.__safe_commit()
-        self.dbo.conn.close()
+        return rows_written
 
-        if open_file:
-            os.startfile(output)
+    def iterable_query_to_spatial(self, output, driver=None, layer=None, geometry_column=None, geometry_type=None,
+                                  srid=2263, batch_size=SPATIAL_BATCH_SIZE, encoding=None, layer_options=None):
+        """
+        Writes results of the iterable query to a spatial file (Shapefile, GeoPackage, FlatGeobuf or any OGR driver)
+        in process with pyogrio. Features are fetched from the cursor batch_size at a time and streamed to GDAL as
+        Arrow record batches, so memory use does not depend on the size of the result. Requires pyogrio (GDAL >= 3.8)
+        and pyarrow.
+        :param output: String for output file location; the driver is taken from the extension (.shp, .gpkg, .fgb)
+        :param driver: OGR driver name, if not from the extension (ex. 'GPKG')
+        :param layer: layer name (defaults to the file name)
+        :param geometry_column: column of WKB written as the geometry; defaults to the first PostGIS geometry column
+        :param geometry_type: layer geometry type for the whole result (ex. 'MultiPolygon', 'Point Z'), as declared for
+        the column. If None, the layer is Unknown (any geometry); Shapefiles hold one shape type, so their geometries
+        are written as multi types (Point as MultiPoint, etc.)
+        :param srid: SRID of the output (defaults to 2263)
+        :param batch_size: features fetched and written per batch (defaults to 50,000)
+        :param encoding: Shapefile (.dbf) encoding (defaults to GDAL's)
+        :param layer_options: dict of OGR layer creation options; FlatGeobuf defaults to SPATIAL_INDEX=NO so features
+        are streamed in query order (an index is built from all features at the end and does not allow null geometry)
+        :return: number of features written
+        """
+        import pyarrow as pa
+        from pyogrio.raw import write_arrow
+
+        driver = driver or SPATIAL_DRIVERS.get(os.path.splitext(output)[1].lower())
+        if not driver:
+            raise ValueError('Unknown spatial output {}; set driver (ex. GPKG)'.format(output))
 
-    def __chunked_write_csv(self, output, open_file=False, quote_strings=True, sep=','):
+        if layer_options is None and driver == 'FlatGeobuf':
+            layer_options = {'SPATIAL_INDEX': 'NO'}
+
+        self.has_data = True
+        cur = self.current_cur
+        geometry_types = self.__geometry_type_codes()
+
+        # Server-side cursors only have a description after the first fetch
+        rows = cur.fetchmany(batch_size)
+        self.data_description = cur.description
+        self.data_columns = [desc[0] for desc in self.data_description]
+        fields = [self.__arrow_field(desc, geometry_types) for desc in self.data_description]
+
+        if not geometry_column:
+            geometry_column = next((desc[0] for desc in self.data_description if desc[1] in geometry_types), None)
+        elif geometry_column in self.data_columns:
+            # WKB from st_asbinary (memoryview) or .STAsBinary()
+            fields[self.data_columns.index(geometry_column)] = (
+                pa.binary(), lambda values: [None if v is None else bytes(v) for v in values])
+        else:
+            raise ValueError('Geometry column {} is not in the query results'.format(geometry_column))
+
+        # GDAL writes decimals as reals
+        fields = [(pa.float64(), lambda values: [None if v is None else float(v) for v in values])
+                  if pa.types.is_decimal(typ) else (typ, convert) for typ, convert in fields]
+
+        if geometry_column and not geometry_type and driver == 'ESRI Shapefile':
+            index = self.data_columns.index(geometry_column)
+            fields[index] = (fields[index][0], self.__multi_wkb(fields[index][1]))
+        schema = pa.schema([pa.field(name, typ) for name, (typ, _) in zip(self.data_columns, fields)])
+
+        def to_batch(rows):
+            arrays = list()
+            for values, field, (_, convert) in zip(zip(*rows), schema, fields):
+                values = list(values)
+                arrays.append(pa.array(convert(values) if convert else values, type=field.type))
+            return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+        first_batch = to_batch(rows) if rows else None
+        del rows
+
+        self.rows_written = 0
+
+        def batches(batch):
+            while batch is not None:
+                yield batch
+                self.rows_written += batch.num_rows
+
+                # Safeguard for memory issues
+                del batch
+                rows = cur.fetchmany(batch_size)
+                batch = to_batch(rows) if rows else None
+
+        if geometry_column:
+            geometry_options = {'geometry_name': geometry_column, 'geometry_type': geometry_type or 'Unknown',
+                                'crs': 'EPSG:{}'.format(srid)}
+        else:
+            geometry_options = {'geometry_name': None, 'geometry_type': None, 'crs': None}
+
+        write_arrow(pa.RecordBatchReader.from_batches(schema, batches(first_batch)), output, layer=layer, driver=driver,
+                    encoding=encoding, layer_options=layer_options, **geometry_options)
+
+        self.__safe_commit()
+        return self.rows_written
+
+    @staticmethod
+    def __multi_wkb(convert):
         """
-        Writes results of the query to a csv file.
-        Performs the same operations as query_to_csv, but brakes data into chunks
-        to deal with memory errors for large files.
-        :param output: String for csv output file location (defaults to current directory)
-        :param open_file: Boolean flag to auto open output file
-        :param quote_strings: Boolean flag for adding quote strings to output (defaults to True, QUOTE_ALL)
-        :param sep: Separator for csv (defaults to ',')
-        :return:
+        Wraps a geometry column conversion so single geometries come out as their multi type (Point as MultiPoint,
+        LineString as MultiLineString, Polygon as MultiPolygon)
+        :param convert: function converting a list of column values to WKB, or None
+        :return: function converting a list of column values to multi type WKB
         """
+        import shapely
 
-        def chunks(size=100000):
-            # Break data into chunks
-            """
-            Breaks large datasets into smaller subsets
-            :param size: Integer for the size of the chunks (defaults to 100,000)
-            :return: Generator for data in 100,000 record chunks (list of lists)
-            """
-            n = len(self.data) / size
-            for i in range(0, n):
-                yield self.data[i::n], i
+        def to_multi(values):
+            geoms = shapely.from_wkb(np.array(convert(values) if convert else values, dtype=object))
+            type_ids = shapely.get_type_id(geoms)
 
-        print('Large file...Writing %i rows of data...' % len(self.data))
+            for single, make_multi in ((0, shapely.multipoints), (1, shapely.multilinestrings),
+                                       (3, shapely.multipolygons)):
+                index = np.nonzero(type_ids == single)[0]
+                if len(index):
+                    geoms[index] = make_multi(geoms[index], indices=np.arange(len(index)))
 
-        # write to csv
-        _ = chunks()
-        for (chunk, pos) in _:
-            # convert to data frame
-            if self.dbo.type == MS:
-                self.data = [tuple(i) for i in self.data]
-                df = pd.DataFrame(self.data, columns=self.data_columns)
-            else:
-                df = pd.DataFrame(chunk, columns=self.data_columns)
-            # Only write header for 1st chunk
-            if pos == 0:
-                # Write out 1st chunk
-                if quote_strings:
-                    df.to_csv(output, index=False, quoting=csv.QUOTE_ALL, sep=sep)
-                else:
-                    df.to_csv(output, index=False, sep=sep)
-            else:
-                if quote_strings:
-                    df.to_csv(output, index=False, quoting=csv.QUOTE_ALL, sep=sep, mode='a', header=False)
-                else:
-                    df.to_csv(output, index=False, sep=sep, mode='a', header=False)
+            return list(shapely.to_wkb(geoms))
 
-        if open_file:
-            os.startfile(output)
+        return to_multi
 
-    def query_to_csv(self, output=None, open_file=False, quote_strings=True, sep=','):
+    def query_to_csv(self, output=None, open_file=False, quote_strings=True, sep=',', compression=None,
+                     compression_thread=False):
         """
         Writes results of the query to a csv file
         :param output: String for csv output file location (defaults to current directory)
         :param open_file: Boolean flag to auto open output file
         :param quote_strings: Boolean flag for adding quote strings to output (defaults to true, QUOTE_ALL)
         :param sep: Separator for csv (defaults to ',')
+        :param compression: None (plain csv), 'gzip', 'bz2' or 'zstd' (requires zstandard)
+        :param compression_thread: if True, compresses on a background thread
         :return:
         """
         if not output:
-            output = os.path.join(os.getcwd(), 'data_{}.csv'.format(datetime.datetime.now().strftime('%Y%m%d%H%M')))
+            output = os.path.join(os.getcwd(), 'data_{}.csv{}'.format(
+                datetime.datetime.now().strftime('%Y%m%d%H%M'), COMPRESSION_EXTENSIONS.get(compression, '')))
 
-        if len(self.data) > 100000:
-            self.__chunked_write_csv(output=output, open_file=open_file, quote_strings=quote_strings, sep=sep)
-        else:
-            df = self.dfquery()
-            df = clean_df_before_output(df)
+        data = self.data or list()
 
-            if quote_strings:
-                df.to_csv(output, index=False, quoting=csv.QUOTE_ALL, sep=sep, encoding='utf8')
-            else:
-                df.to_csv(output, index=False, sep=sep, encoding='utf8')
+        # Results are already fetched; written in order, a batch at a time
+        self.__write_csv((data[i:i + CSV_BATCH_SIZE] for i in range(0, len(data), CSV_BATCH_SIZE)), output,
+                         quote_strings=quote_strings, sep=sep, compression=compression,
+                         compression_thread=compression_thread)
 
-            if open_file:
-                os.startfile(output)
+        if open_file:
+            os.startfile(output)
 
     @staticmethod
-    def query_to_shp(dbo, query, path=None, shp_name=None, cmd=None, gdal_data_loc=GDAL_DATA_LOC, print_cmd=False,
+    def query_to_shp(dbo, query, path=None, shp_name=None, cmd=None, gdal_data_loc=None, print_cmd=False,
                      srid=2263):
         """
         Writes results of the query to a shp file by calling Shapefile ogr command's in write_shp fn
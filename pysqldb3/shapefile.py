@@ -1,17 +1,21 @@
 import shlex
 import subprocess
+import time
 
 from .cmds import *
 from .sql import *
 from .util import *
 
+# Features read and copied per batch by the native (binary COPY) loader
+READ_BATCH_SIZE = 50000
+
 
 class Shapefile:
     def __str__(self):
         pass
 
     def __init__(self, dbo=None, path=None, table=None, schema=None, query=None, shp_name=None, cmd=None,
-                 srid='2263', port=5432, gdal_data_loc=GDAL_DATA_LOC, skip_failures=''):
+                 srid='2263', port=5432, gdal_data_loc=None, skip_failures=''):
         self.dbo = dbo
         self.path = path
         self.table = table
@@ -28,6 +32,10 @@ class Shapefile:
         if not self.schema:
             self.schema = dbo.default_schema
 
+        # Use GDAL data location from the config
+        if not self.gdal_data_loc:
+            self.gdal_data_loc = get_gdal_data_loc()
+
     @staticmethod
     def name_extension(name):
         """
@@ -253,6 +261,9 @@ class Shapefile:
             print('Ogr2ogr command failed. The shapefile was not read in.')
             raise subprocess.CalledProcessError(cmd=print_cmd_string([self.dbo.password], cmd), returncode=1)
 
+        # ogr2ogr created the table outside of the DbConnect
+        self.dbo.invalidate_metadata(self.table, schema=self.schema)
+
         if self.dbo.type == 'PG':
             self.dbo.query(SHP_COMMENT_QUERY.format(
                 s=self.schema,
@@ -340,6 +351,9 @@ class Shapefile:
             print('Ogr2ogr command failed. The feature class was not read in.')
             raise subprocess.CalledProcessError(cmd=print_cmd_string([self.dbo.password], cmd), returncode=1)
 
+        # ogr2ogr created the table outside of the DbConnect
+        self.dbo.invalidate_metadata(self.table, schema=self.schema)
+
         if self.dbo.type == 'PG':
             self.dbo.query(FEATURE_COMMENT_QUERY.format(
                 s=self.schema,
@@ -355,6 +369,135 @@ class Shapefile:
 
         self.rename_geom()
 
+    def read_native(self, private=False, encoding=None, layer=None, batch_size=READ_BATCH_SIZE):
+        """
+        Reads a shapefile (or, with layer, a feature class of the geodatabase at path) in as a PG table without
+        ogr2ogr. Features are read batch_size at a time with pyogrio and streamed to the table with binary
+        COPY ... FROM STDIN, geometry as EWKB. The table is created with its geom column (promoted to multi, as
+        ogr2ogr -nlt PROMOTE_TO_MULTI) and the spatial index is built after the load. Requires pyogrio and pyarrow.
+
+        :param private: Flag for permissions in database (Defaults to False - will only grant select to public)
+        :param encoding: encoding of data within the Shapefile (ex. LATIN1); defaults to the .cpg file or GDAL's
+        :param layer: feature class name; if None, reads the shapefile at path/shp_name
+        :param batch_size: features read and copied per batch (defaults to 50,000)
+        :return: number of features loaded
+        """
+        import psycopg2.extensions
+        import pyarrow as pa
+        import shapely
+        from pyogrio.raw import open_arrow
+
+        if layer:
+            source = self.path
+            self.table = (self.table or layer).lower()
+        else:
+            if not all([self.path, self.shp_name]):
+                filename = file_loc('file', 'Missing file info - Opening search dialog...')
+                self.shp_name = os.path.basename(filename)
+                self.path = os.path.dirname(filename)
+
+            source = os.path.join(self.path, self.shp_name)
+            self.table = (self.table or self.shp_name.replace('.shp', '')).lower()
+
+        if self.table_exists():
+            # Clean up spatial index
+            self.del_indexes()
+
+            print('Deleting existing table {s}.{t}'.format(s=self.schema, t=self.table))
+            self.dbo.drop_table(schema=self.schema, table=self.table, cascade=bool(layer))
+
+        start = time.time()
+
+        with open_arrow(source, layer=layer, encoding=encoding, batch_size=batch_size, use_pyarrow=True) as (
+                meta, reader):
+            geom_name = meta['geometry_name'] or 'wkb_geometry'
+            fields = [f for f in reader.schema if f.name != geom_name]
+
+            # Column names laundered as ogr2ogr does
+            columns = [re.sub(r'[^a-z0-9_]', '_', f.name.lower()) for f in fields]
+
+            # Single part layer types are promoted to multi
+            geometry_type, _, dims = meta['geometry_type'].partition(' ')
+            geometry_type = {'Point': 'MultiPoint', 'LineString': 'MultiLineString',
+                             'Polygon': 'MultiPolygon'}.get(geometry_type, geometry_type)
+            if geometry_type not in ('MultiPoint', 'MultiLineString', 'MultiPolygon', 'GeometryCollection'):
+                geometry_type = 'Geometry'
+            if dims in ('Z', 'M', 'ZM'):
+                geometry_type += dims
+
+            self.dbo.query(u"""
+                create table {s}."{t}" (ogc_fid serial primary key, {cols}geom geometry({g}, {srid}))
+            """.format(s=self.schema, t=self.table, g=geometry_type, srid=self.srid,
+                       cols=''.join(['"{c}" {typ}, '.format(c=c, typ=pg_binary_column(f.type)[0])
+                                     for c, f in zip(columns, fields)])), timeme=False, internal=True)
+
+            copy_qry = u'COPY {s}."{t}" ({cols}) FROM STDIN WITH (FORMAT binary)'.format(
+                s=self.schema, t=self.table, cols=', '.join(['"{}"'.format(c) for c in columns + ['geom']]))
+
+            def buffers():
+                # Text is sent in the client encoding of the connection the COPY runs on
+                codec = psycopg2.extensions.encodings[self.dbo.conn.encoding]
+                encoders = [pg_binary_column(f.type, codec)[1] for f in fields] + [pg_binary_column(pa.binary())[1]]
+
+                for batch in reader:
+                    wkb = batch.column(geom_name)
+                    if isinstance(wkb.type, pa.ExtensionType):
+                        wkb = wkb.storage
+
+                    geoms = shapely.from_wkb(wkb.to_numpy(zero_copy_only=False))
+                    type_ids = shapely.get_type_id(geoms)
+                    for type_id, multi in ((0, shapely.multipoints), (1, shapely.multilinestrings),
+                                           (3, shapely.multipolygons)):
+                        if (type_ids == type_id).any():
+                            geoms[type_ids == type_id] = multi(geoms[type_ids == type_id][:, None])
+                    geoms = shapely.to_wkb(shapely.set_srid(geoms, int(self.srid)), include_srid=True)
+
+                    values = [batch.column(f.name).to_pylist() for f in fields] + [list(geoms)]
+                    yield io.BytesIO(pg_binary_copy([encode(v) for encode, v in zip(encoders, values)],
+                                                    batch.num_rows))
+
+            try:
+                rows = self.dbo._copy_from_stdin(copy_qry, buffers())
+            except Exception:
+                self.dbo.drop_table(schema=self.schema, table=self.table)
+                raise
+
+        # Spatial index after the load
+        self.dbo.query(u"""
+            create index {t}_geom_idx on {s}."{t}" using gist (geom);
+            analyze {s}."{t}";
+        """.format(s=self.schema, t=self.table), timeme=False, internal=True)
+
+        duration = time.time() - start
+        print('\n{c} rows added to {s}.{t} in {d:.2f} s ({r:,.0f} rows/sec)\n'.format(
+            c=rows, s=self.schema, t=self.table, d=duration, r=rows / duration if duration else rows))
+
+        self.dbo.invalidate_metadata(self.table, schema=self.schema)
+
+        if layer:
+            self.dbo.query(FEATURE_COMMENT_QUERY.format(
+                s=self.schema,
+                t=self.table,
+                u=self.dbo.user,
+                d=datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+            ), timeme=False, internal=True)
+        else:
+            self.dbo.query(SHP_COMMENT_QUERY.format(
+                s=self.schema,
+                t=self.table,
+                u=self.dbo.user,
+                p=self.path,
+                shp=self.shp_name,
+                d=datetime.datetime.now().strftime('%Y-%m-%d %H:%M')
+            ), timeme=False, internal=True)
+
+        if not private:
+            self.dbo.query('grant select on {s}."{t}" to public;'.format(
+                s=self.schema,
+                t=self.table), timeme=False, internal=True)
+
+        return rows
+
     def rename_geom(self):
         """
         Renames wkb_geometry to geom, along with index
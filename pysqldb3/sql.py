@@ -27,11 +27,11 @@ MS_ADD_TABLE_TO_LOG_QUERY = r"""
 MERGE {ser}{db}{s}.__temp_log_table_{u}__ AS [Target] 
 USING (
     SELECT 
-        '{u} 'as table_owner,
-        '{s}' as table_schema,
-        '{t}' as table_name,
-        '{dt}' as created_on , 
-        '{ex}' as expires
+        ? as table_owner,
+        ? as table_schema,
+        ? as table_name,
+        ? as created_on , 
+        ? as expires
 ) AS [Source] ON [Target].table_schema = [Source].table_schema 
     and [Target].table_name = [Source].table_name 
 WHEN MATCHED THEN UPDATE 
@@ -62,11 +62,139 @@ INSERT INTO {s}.{log} (
     created_on , 
     expires
 )
-VALUES ('{u}', '{s}', '{t}', '{dt}', '{ex}')
+VALUES (%s, %s, %s, %s, %s)
 ON CONFLICT (table_schema, table_name) DO 
 UPDATE SET expires = EXCLUDED.expires, created_on=EXCLUDED.created_on
 """
 
+PG_LOG_SCHEMAS_QUERY = r"""
+SELECT n.nspname
+FROM pg_catalog.pg_class c
+JOIN pg_catalog.pg_namespace n
+ON n.oid = c.relnamespace
+WHERE c.relname = '{log}'
+AND c.relkind IN ('r', 'p')
+"""
+
+MS_LOG_SCHEMAS_QUERY = r"""
+SELECT s.name
+FROM sys.tables t
+JOIN sys.schemas s
+ON t.schema_id = s.schema_id
+WHERE LOWER(t.name) = '{log}'
+"""
+
+PG_EXPIRED_LOG_TABLES_QUERY = r"""
+SELECT l.table_schema, l.table_name
+FROM {s}.{log} l
+JOIN pg_catalog.pg_namespace n
+ON n.nspname = l.table_schema
+JOIN pg_catalog.pg_class c
+ON c.relnamespace = n.oid AND c.relname = l.table_name AND c.relkind IN ('r', 'p')
+WHERE l.expires < '{dt}'
+"""
+
+MS_EXPIRED_LOG_TABLES_QUERY = r"""
+SELECT l.table_schema, l.table_name
+FROM {s}.{log} l
+JOIN sys.schemas s
+ON LOWER(s.name) = LOWER(l.table_schema)
+JOIN sys.tables t
+ON t.schema_id = s.schema_id AND LOWER(t.name) = LOWER(l.table_name)
+WHERE l.expires < '{dt}'
+"""
+
+PG_DROP_EXPIRED_TABLE_STATEMENT = r"""
+    BEGIN
+        DROP TABLE IF EXISTS {s}.{t};
+    EXCEPTION WHEN others THEN
+        RAISE NOTICE 'Could not drop %', '{s}.{t}';
+    END;
+"""
+
+MS_DROP_EXPIRED_TABLE_STATEMENT = r"""
+BEGIN TRY
+    DROP TABLE {s}.{t};
+END TRY
+BEGIN CATCH
+    PRINT 'Could not drop {s}.{t}';
+END CATCH;
+"""
+
+PG_DELETE_NONEXISTENT_FROM_LOG_QUERY = r"""
+DELETE FROM {s}.{log} l
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM pg_catalog.pg_class c
+    JOIN pg_catalog.pg_namespace n
+    ON n.oid = c.relnamespace
+    WHERE n.nspname = l.table_schema
+    AND c.relname = l.table_name
+    AND c.relkind IN ('r', 'p')
+)
+"""
+
+MS_DELETE_NONEXISTENT_FROM_LOG_QUERY = r"""
+DELETE l
+FROM {s}.{log} l
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM sys.tables t
+    JOIN sys.schemas s
+    ON t.schema_id = s.schema_id
+    WHERE LOWER(s.name) = LOWER(l.table_schema)
+    AND LOWER(t.name) = LOWER(l.table_name)
+)
+"""
+
+PG_CLEANUP_LOCK_QUERY = r"""
+SELECT pg_try_advisory_lock(hashtext('{lock}'))
+"""
+
+PG_CLEANUP_UNLOCK_QUERY = r"""
+SELECT pg_advisory_unlock(hashtext('{lock}'))
+"""
+
+MS_CLEANUP_LOCK_QUERY = r"""
+SET NOCOUNT ON;
+DECLARE @result int;
+EXEC @result = sp_getapplock @Resource = '{lock}', @LockMode = 'Exclusive', @LockOwner = 'Session', @LockTimeout = 0;
+SELECT CASE WHEN @result >= 0 THEN 1 ELSE 0 END;
+"""
+
+MS_CLEANUP_UNLOCK_QUERY = r"""
+EXEC sp_releaseapplock @Resource = '{lock}', @LockOwner = 'Session';
+"""
+
+PG_CLEANUP_RECENT_QUERY = r"""
+SELECT count(*)
+FROM {s}.{log}
+WHERE table_schema = '{sch}'
+AND table_name = '{name}'
+AND created_on > now() - interval '{m} minutes'
+"""
+
+MS_CLEANUP_RECENT_QUERY = r"""
+SELECT count(*)
+FROM {s}.{log}
+WHERE table_schema = '{sch}'
+AND table_name = '{name}'
+AND created_on > DATEADD(minute, -{m}, GETDATE())
+"""
+
+PG_CLEANUP_STAMP_QUERY = r"""
+INSERT INTO {s}.{log} (table_owner, table_schema, table_name, created_on, expires)
+VALUES ('{u}', '{sch}', '{name}', now(), NULL)
+ON CONFLICT (table_schema, table_name) DO UPDATE SET created_on = EXCLUDED.created_on
+"""
+
+MS_CLEANUP_STAMP_QUERY = r"""
+UPDATE {s}.{log} SET created_on = GETDATE() WHERE table_schema = '{sch}' AND table_name = '{name}';
+IF @@ROWCOUNT = 0
+    INSERT INTO {s}.{log} (table_owner, table_schema, table_name, created_on, expires)
+    VALUES ('{u}', '{sch}', '{name}', GETDATE(), NULL);
+"""
+
 PG_BLOCKING_QUERY = r"""
 SELECT blocked_locks.pid     AS blocked_pid,
      blocked_activity.usename  AS blocked_user,
@@ -90,7 +218,7 @@ JOIN pg_catalog.pg_locks         blocking_locks
     AND blocking_locks.pid != blocked_locks.pid
 JOIN pg_catalog.pg_stat_activity blocking_activity ON blocking_activity.pid = blocking_locks.pid
 WHERE NOT blocked_locks.GRANTED
-AND blocked_activity.usename = '%s'
+AND blocked_activity.usename = %s
 ORDER BY blocking_activity.usename;
 """
 
@@ -112,7 +240,7 @@ JOIN pg_catalog.pg_locks         blocking_locks
     AND blocking_locks.pid != blocked_locks.pid
 JOIN pg_catalog.pg_stat_activity blocking_activity ON blocking_activity.pid = blocking_locks.pid
 WHERE NOT blocked_locks.GRANTED
-and blocking_activity.usename = '%s'
+and blocking_activity.usename = %s
 """
 
 PG_MY_TABLES_QUERY = r"""
@@ -144,6 +272,22 @@ ON t.schema_id = s.schema_id
 WHERE LOWER(s.name) = '{s}' AND LOWER(t.name) = '{t}'
 """
 
+PG_TABLES_EXIST_QUERY = r"""
+SELECT t.schemaname, t.tablename
+FROM pg_catalog.pg_tables t
+JOIN (VALUES {tables}) v(table_schema, table_name)
+ON t.schemaname = v.table_schema AND t.tablename = v.table_name
+"""
+
+MS_TABLES_EXIST_QUERY = r"""
+SELECT LOWER(s.name), LOWER(t.name)
+FROM {db}sys.tables t
+JOIN {db}sys.schemas s
+ON t.schema_id = s.schema_id
+JOIN (VALUES {tables}) v(table_schema, table_name)
+ON LOWER(s.name) = v.table_schema AND LOWER(t.name) = v.table_name
+"""
+
 MS_GET_SCHEMAS_QUERY = r"""
 select s.name 
 from sys.schemas s
@@ -155,6 +299,24 @@ PG_GET_SCHEMAS_QUERY = r"""
 SELECT schema_name FROM information_schema.schemata
 """
 
+PG_GEOMETRY_TYPES_QUERY = r"""
+select oid from pg_type where typname in ('geometry', 'geography')
+"""
+
+PG_TYPE_NAMES_QUERY = r"""
+select oid, format_type(oid, null) from pg_type where oid = any(%s)
+"""
+
+PG_COLUMN_TYPES_QUERY = r"""
+select attrelid, attnum, format_type(atttypid, atttypmod)
+from pg_attribute
+where (attrelid, attnum) in (select unnest(%s::oid[]), unnest(%s::int2[]))
+"""
+
+MS_DESCRIBE_RESULT_QUERY = r"""
+exec sp_describe_first_result_set @tsql = ?
+"""
+
 """
 Shapefile
 """
@@ -0,0 +1,55 @@
+"""
+Benchmark for convert_geom_col (vectorized shapely 2 from_wkb/to_wkt) against converting one geometry at a time.
+
+Geometries are random points and small polygons as WKB hex, as PostGIS returns them, so no database is needed.
+
+    python -m pysqldb3.tests.benchmark_convert_geom --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely import wkb
+
+from ..util import convert_geom_col
+
+
+def make_geoms(rows):
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(900000, 1100000, rows), rng.uniform(100000, 300000, rows)
+
+    # Half points, half 4 sided polygons around them
+    geoms = shapely.points(x, y)
+    geoms[1::2] = shapely.buffer(geoms[1::2], 50, quad_segs=1)
+    return shapely.to_wkb(geoms, hex=True)
+
+
+def per_row(df):
+    df['geom'] = df['geom'].apply(lambda x: wkb.loads(x, hex=True).wkt if x else None)
+    return df
+
+
+def run(name, func, geoms):
+    df = pd.DataFrame({'geom': geoms})
+
+    start = time.perf_counter()
+    df = func(df)
+    duration = time.perf_counter() - start
+
+    print('{n:<10} {r:>12,} geoms  {d:8.1f} s  {rs:>10,.0f} geoms/sec'.format(
+        n=name, r=len(df), d=duration, rs=len(df) / duration))
+    return df
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    geoms = make_geoms(args.rows)
+
+    old = run('per row', per_row, geoms)
+    new = run('vectorized', convert_geom_col, geoms)
+    assert old['geom'].equals(new['geom'])
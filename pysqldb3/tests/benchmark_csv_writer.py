@@ -0,0 +1,117 @@
+"""
+Benchmark for the streaming csv writer (Query to_csv) against fetching everything and writing one DataFrame.
+
+Runs against a synthetic cursor that generates rows as they are fetched, so no database is needed and the source
+itself holds no rows. With --memory, peak memory is measured with tracemalloc (python allocations, including
+pandas/numpy buffers); tracing makes both runs many times slower, so times are only comparable without it.
+
+    python -m pysqldb3.tests.benchmark_csv_writer --rows 10000000
+    python -m pysqldb3.tests.benchmark_csv_writer --rows 1000000 --memory
+    python -m pysqldb3.tests.benchmark_csv_writer --rows 1000000 --skip-fetchall --compression gzip --thread
+"""
+import argparse
+import csv
+import datetime
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from ..query import Query
+from ..util import PG
+
+DESCRIPTION = [('id', 23), ('name', 1043), ('value', 701), ('created', 1114)]
+START = datetime.datetime(2020, 1, 1)
+
+
+class SyntheticCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.position = 0
+        self.description = None
+
+    def execute(self, query, params=None):
+        self.description = DESCRIPTION
+
+    def __next_rows(self, size):
+        end = min(self.position + size, self.rows)
+        rows = [(i, 'name {}'.format(i), i / 7, START + datetime.timedelta(seconds=i))
+                for i in range(self.position, end)]
+        self.position = end
+        return rows
+
+    def fetchmany(self, size):
+        return self.__next_rows(size)
+
+    def fetchall(self):
+        return self.__next_rows(self.rows - self.position)
+
+
+class SyntheticConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, name=None):
+        return SyntheticCursor(self.rows)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class SyntheticDbConnect:
+    type = PG
+    default_schema = 'public'
+
+    def __init__(self, rows):
+        self.conn = SyntheticConnection(rows)
+
+
+def fetchall_to_csv(rows, output):
+    qry = Query(SyntheticDbConnect(rows), 'select', timeme=False, internal=True)
+    pd.DataFrame(qry.data, columns=qry.data_columns).to_csv(output, index=False, quoting=csv.QUOTE_ALL)
+
+
+def streaming_to_csv(rows, output, compression=None, compression_thread=False):
+    Query(SyntheticDbConnect(rows), 'select', timeme=False, internal=True,
+          to_csv={'output': output, 'compression': compression, 'compression_thread': compression_thread})
+
+
+def run(name, func, rows, output, memory=False, **kwargs):
+    if memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    func(rows, output, **kwargs)
+    duration = time.perf_counter() - start
+
+    peak = ''
+    if memory:
+        peak = '  peak {:8.1f} MB'.format(tracemalloc.get_traced_memory()[1] / 2 ** 20)
+        tracemalloc.stop()
+
+    print('{n:<10} {r:>12,} rows  {d:8.1f} s  {rs:>10,.0f} rows/sec  file {f:8.1f} MB{p}'.format(
+        n=name, r=rows, d=duration, rs=rows / duration, f=os.path.getsize(output) / 2 ** 20, p=peak))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--memory', action='store_true', help='measure peak memory with tracemalloc (slow)')
+    parser.add_argument('--skip-fetchall', action='store_true', help='only run the streaming writer')
+    parser.add_argument('--compression', choices=['gzip', 'bz2', 'zstd'], help='compress the streaming output')
+    parser.add_argument('--thread', action='store_true', help='compress on a background thread')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        output = os.path.join(folder, 'benchmark.csv')
+
+        if not args.skip_fetchall:
+            run('fetchall', fetchall_to_csv, args.rows, output, args.memory)
+
+        run('streaming', streaming_to_csv, args.rows, output, args.memory, compression=args.compression,
+            compression_thread=args.thread)
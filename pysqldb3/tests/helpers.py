@@ -1,12 +1,10 @@
 import random
 import os
+import struct
 import pandas as pd
-import requests
 import zipfile
-from xlrd import open_workbook
-from xlutils.copy import copy
-from ..Config import write_config
-write_config(confi_path=os.path.dirname(os.path.abspath(__file__)).replace('\\tests','') + "\\config.cfg")
+from ..cache import StatementCache
+from ..util import PG, PG_COPY_BINARY_HEADER
 
 DIR = os.path.join(os.path.dirname(os.path.abspath(__file__))) + '\\test_data'
 
@@ -155,6 +153,7 @@ def set_up_feature_class():
     """
     zip_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data/nyclion_21d.zip')
     if not os.path.isfile(zip_path):
+        import requests
 
         download_url = r'https://www1.nyc.gov/assets/planning/download/zip/data-maps/open-data/nyclion_21d.zip'
         r = requests.get(download_url)
@@ -271,6 +270,9 @@ def clean_up_file(file_path):
 
 
 def set_up_xls():
+    from xlrd import open_workbook
+    from xlutils.copy import copy
+
     xls_file1 = os.path.join(DIR, 'test_xls.xls')
     if os.path.isfile(xls_file1):
         clean_up_file(xls_file1)
@@ -304,4 +306,149 @@ def set_up_xls():
         col += 1
         row = 0
     w.save(xls_file2)
-    print ('%s created\n' % os.path.basename(xls_file2))
\ No newline at end of file
+    print ('%s created\n' % os.path.basename(xls_file2))
+
+
+class FakeCursor:
+    """
+    Cursor over a FakeConnection's rows. Like psycopg2, named (server-side) cursors only have a description after
+    the first fetch.
+    """
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self.description = None
+        self.rows = list()
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((query, params))
+
+        if self.conn.broken:
+            raise Exception('server closed the connection unexpectedly')
+        if params is not None and params == self.conn.fail_params:
+            raise ValueError('invalid input syntax for type integer')
+
+        self.rows = list(next((rows for key, rows in self.conn.responses.items() if key in query), self.conn.rows))
+
+        if not self.name:
+            self.description = None if query.startswith(('PREPARE', 'DEALLOCATE')) else self.conn.description
+
+    def fetchall(self):
+        rows, self.rows = self.rows, list()
+        self.conn.fetches.append(('fetchall', len(rows)))
+        return rows
+
+    def fetchmany(self, size):
+        self.description = self.conn.description
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        self.conn.fetches.append(('fetchmany', len(rows)))
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    DB-API connection that returns the same rows for every query, except queries containing a key of responses.
+    Records the name of every cursor opened (None for client-side cursors), every execute (query, params) and fetch
+    (method, rows returned).
+    :param rows: rows returned by a query
+    :param description: cursor description, (name, type_code, ...) per column
+    :param responses: dict of query substring to the rows returned instead, ex. {'pg_type': [(90001,)]}
+    :param fail_params: params that make execute raise
+    """
+    encoding = 'UTF8'
+
+    def __init__(self, rows=((1,),), description=(('n', 23),), responses=None, fail_params=None):
+        self.rows = rows
+        self.description = description
+        self.responses = responses or dict()
+        self.fail_params = fail_params
+        self.cursors = list()
+        self.executed = list()
+        self.fetches = list()
+        self.rollbacks = 0
+        self.closed = 0
+        self.broken = False
+
+    def cursor(self, name=None):
+        self.cursors.append(name)
+        return FakeCursor(self, name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeDbConnect:
+    """
+    Stands in for DbConnect around a FakeConnection (keyword arguments are passed to it). Internal queries and COPY
+    loads are recorded instead of run.
+    """
+    def __init__(self, db_type=PG, default_schema='public', allow_temp_tables=True, statement_cache_size=100,
+                 **kwargs):
+        self.type = db_type
+        self.default_schema = default_schema
+        self.user = 'tester'
+        self.use_pool = False
+        self.allow_temp_tables = allow_temp_tables
+        self.conn = FakeConnection(**kwargs)
+        self.cache = StatementCache(statement_cache_size)
+        self.queries = list()
+        self.copies = list()
+
+    def _statement_cache(self, conn):
+        return self.cache
+
+    def query(self, query, **kwargs):
+        self.queries.append(' '.join(query.split()))
+
+    def table_exists(self, table, schema=None):
+        return False
+
+    def invalidate_metadata(self, table, schema=None):
+        pass
+
+    def disconnect(self, quiet=False):
+        pass
+
+    def _copy_from_stdin(self, copy_qry, sources):
+        rows = 0
+        for source in sources:
+            data = source.read()
+            rows += len(read_binary_copy(data))
+            self.copies.append((copy_qry, data))
+        return rows
+
+
+def read_binary_copy(data):
+    """
+    Parses a PG binary COPY stream into rows of raw field bytes (None for nulls)
+    """
+    assert data.startswith(PG_COPY_BINARY_HEADER)
+    position = len(PG_COPY_BINARY_HEADER)
+    rows = list()
+
+    while True:
+        count, = struct.unpack_from('>h', data, position)
+        position += 2
+        if count == -1:
+            assert position == len(data)
+            return rows
+
+        row = list()
+        for _ in range(count):
+            length, = struct.unpack_from('>i', data, position)
+            position += 4
+            if length == -1:
+                row.append(None)
+            else:
+                row.append(data[position:position + length])
+                position += length
+        rows.append(row)
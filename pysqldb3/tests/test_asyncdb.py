@@ -0,0 +1,138 @@
+import asyncio
+import os
+
+import configparser
+import pandas as pd
+import pytest
+
+from .. import pysqldb3 as pysqldb
+
+asyncpg = pytest.importorskip('asyncpg')
+
+from ..asyncdb import AsyncDbConnect
+
+config = configparser.ConfigParser()
+config.read(os.path.dirname(os.path.abspath(__file__)) + "\\db_config.cfg")
+
+db = pysqldb.DbConnect(type=config.get('PG_DB', 'TYPE'),
+                       server=config.get('PG_DB', 'SERVER'),
+                       database=config.get('PG_DB', 'DB_NAME'),
+                       user=config.get('PG_DB', 'DB_USER'),
+                       password=config.get('PG_DB', 'DB_PASSWORD'))
+
+
+def async_db():
+    return AsyncDbConnect(server=config.get('PG_DB', 'SERVER'),
+                          database=config.get('PG_DB', 'DB_NAME'),
+                          user=config.get('PG_DB', 'DB_USER'),
+                          password=config.get('PG_DB', 'DB_PASSWORD'),
+                          pool_max_size=5)
+
+
+test_table = 'test_async_table_{}'.format(db.user)
+
+
+class TestAsyncDbConnect:
+    def test_async_missing_details(self):
+        with pytest.raises(ValueError):
+            AsyncDbConnect(user='user')
+
+    def test_async_concurrent_queries(self):
+        async def run():
+            async with async_db() as adb:
+                return await asyncio.gather(*[adb.query('select {} as n'.format(i), timeme=False)
+                                              for i in range(200)]), adb
+
+        queries, adb = asyncio.run(run())
+
+        # Results come back in input order, and all queries are in the history
+        assert [q.data[0][0] for q in queries] == list(range(200))
+        assert queries[0].data_columns == ['n']
+        assert len(adb.queries) == 200
+
+    def test_async_dfquery(self):
+        async def run():
+            async with async_db() as adb:
+                return await adb.dfquery('select 1 as a, null::varchar as b where false')
+
+        df = asyncio.run(run())
+        assert list(df.columns) == ['a', 'b']
+        assert len(df) == 0
+
+    def test_async_dfquery_params_no_rows(self):
+        async def run():
+            async with async_db() as adb:
+                return await adb.dfquery('select $1::int as a, $2::varchar as b where false', params=(1, 'x'))
+
+        # Column names are kept when a parameterized query returns nothing
+        df = asyncio.run(run())
+        assert list(df.columns) == ['a', 'b']
+        assert len(df) == 0
+
+    def test_async_logging(self):
+        db.drop_table(schema='working', table=test_table)
+
+        async def run():
+            async with async_db() as adb:
+                await adb.query('create table working.{} as select 1 as a'.format(test_table), timeme=False)
+                return adb
+
+        adb = asyncio.run(run())
+
+        assert adb.tables_created == ['working.{}'.format(test_table)]
+        assert db.table_exists(test_table, schema='working')
+        assert len(db.dfquery("select * from working.{} where table_name = '{}'".format(
+            db.log_table, test_table))) == 1
+        assert 'Created by' in db.dfquery("select obj_description('working.{}'::regclass) as c".format(
+            test_table)).c.values[0]
+
+        async def drop():
+            async with async_db() as adb:
+                await adb.drop_table(schema='working', table=test_table)
+
+        asyncio.run(drop())
+        assert not db.table_exists(test_table, schema='working')
+        assert len(db.dfquery("select * from working.{} where table_name = '{}'".format(
+            db.log_table, test_table))) == 0
+
+    def test_async_strict(self):
+        async def run():
+            async with async_db() as adb:
+                qry = await adb.query('select * from not_a_real_table_anywhere', strict=False, timeme=False)
+                assert qry.data is None
+
+                with pytest.raises(asyncpg.exceptions.UndefinedTableError):
+                    await adb.query('select * from not_a_real_table_anywhere', timeme=False)
+
+        asyncio.run(run())
+
+    def test_async_dataframe_to_table(self):
+        df = pd.DataFrame({'id': [1, 2, 3], 'name': ['a', '', None], 'value': [1.5, None, 3.0],
+                           'dt': pd.to_datetime(['2020-01-01', None, '2020-01-03'])})
+
+        async def run():
+            async with async_db() as adb:
+                await adb.dataframe_to_table(df, test_table, schema='working', overwrite=True)
+                return await adb.dfquery('select * from working.{} order by id'.format(test_table))
+
+        out = asyncio.run(run())
+
+        assert list(out['id']) == [1, 2, 3]
+        assert out['name'][1] == ''
+        assert out['name'][2] is None
+        assert pd.isnull(out['value'][1])
+        assert pd.isnull(out['dt'][1])
+
+        db.drop_table(schema='working', table=test_table)
+
+    def test_async_query_to_csv(self):
+        output = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_async_query_to_csv.csv')
+
+        async def run():
+            async with async_db() as adb:
+                await adb.query_to_csv('select generate_series(1, 10) as n', output_file=output, quiet=True)
+
+        asyncio.run(run())
+
+        assert list(pd.read_csv(output)['n']) == list(range(1, 11))
+        os.remove(output)
@@ -0,0 +1,115 @@
+import time
+
+from .helpers import FakeDbConnect
+from ..cache import MetadataCache, StatementCache, TABLE_EXISTS, TABLE_COLUMNS, SCHEMAS
+from ..query import Query
+
+
+class TestMetadataCache:
+    def test_cache_hit_miss(self):
+        cache = MetadataCache()
+        assert cache.get((TABLE_EXISTS, 'working', 'a')) is None
+
+        cache.set((TABLE_EXISTS, 'working', 'a'), False)
+        assert cache.get((TABLE_EXISTS, 'working', 'a')) is False
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_cache_ttl(self):
+        cache = MetadataCache(ttl=0.01)
+        cache.set((SCHEMAS,), ['public'])
+        time.sleep(0.02)
+
+        assert cache.get((SCHEMAS,)) is None
+        assert len(cache.entries) == 0
+
+    def test_cache_lru_eviction(self):
+        cache = MetadataCache(max_size=2)
+        cache.set((TABLE_EXISTS, 'working', 'a'), True)
+        cache.set((TABLE_EXISTS, 'working', 'b'), True)
+
+        # Using a makes b the least recently used entry
+        cache.get((TABLE_EXISTS, 'working', 'a'))
+        cache.set((TABLE_EXISTS, 'working', 'c'), True)
+
+        assert cache.get((TABLE_EXISTS, 'working', 'b')) is None
+        assert cache.get((TABLE_EXISTS, 'working', 'a')) is True
+        assert cache.get((TABLE_EXISTS, 'working', 'c')) is True
+
+    def test_cache_invalidate_table(self):
+        cache = MetadataCache()
+        cache.set((TABLE_EXISTS, 'working', 'a'), True)
+        cache.set((TABLE_EXISTS, 'working', 'a', 'server', 'db'), True)
+        cache.set((TABLE_COLUMNS, 'working', 'a', False), [('x', 'integer')])
+        cache.set((TABLE_EXISTS, 'working', 'b'), True)
+        cache.set((SCHEMAS,), ['working'])
+
+        cache.invalidate_table('working', 'a')
+        assert list(cache.entries.keys()) == [(TABLE_EXISTS, 'working', 'b'), (SCHEMAS,)]
+
+    def test_cache_invalidate_kind(self):
+        cache = MetadataCache()
+        cache.set((TABLE_COLUMNS, 'working', 'a', False), [('x', 'integer')])
+        cache.set((SCHEMAS,), ['working'])
+
+        cache.invalidate(TABLE_COLUMNS)
+        assert list(cache.entries.keys()) == [(SCHEMAS,)]
+
+        cache.invalidate()
+        assert len(cache.entries) == 0
+
+
+class TestStatementCache:
+    def test_statement_cache_lru(self):
+        cache = StatementCache(max_size=2)
+        assert cache.add('a', cache.next_name()) == []
+        assert cache.add('b', cache.next_name()) == []
+
+        # Using a makes b the least recently used statement
+        assert cache.get('a') == 'pysqldb_stmt_1'
+        assert cache.add('c', cache.next_name()) == ['pysqldb_stmt_2']
+        assert cache.get('b') is None
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_statement_names_not_reused(self):
+        cache = StatementCache()
+        cache.add('a', cache.next_name())
+        cache.remove('a')
+        assert cache.next_name() == 'pysqldb_stmt_2'
+
+    def test_query_params_prepared_once_pg(self):
+        dbo = FakeDbConnect()
+        for i in range(3):
+            qry = Query(dbo, 'select %s as n', timeme=False, internal=True, params=(i,))
+            assert qry.data == [(1,)]
+
+        assert dbo.conn.executed == [
+            ('PREPARE pysqldb_stmt_1 AS select $1 as n', None),
+            ('EXECUTE pysqldb_stmt_1 (%s)', (0,)),
+            ('EXECUTE pysqldb_stmt_1 (%s)', (1,)),
+            ('EXECUTE pysqldb_stmt_1 (%s)', (2,))
+        ]
+
+    def test_query_params_evicted_pg(self):
+        dbo = FakeDbConnect(statement_cache_size=1)
+        Query(dbo, 'select %s as a', timeme=False, internal=True, params=(1,))
+        Query(dbo, 'select %s as b', timeme=False, internal=True, params=(1,))
+
+        assert ('DEALLOCATE pysqldb_stmt_1', None) in dbo.conn.executed
+
+    def test_query_params_failure_deallocates_pg(self):
+        dbo = FakeDbConnect(fail_params=('fail',))
+        Query(dbo, 'select %s::int as n', timeme=False, internal=True, params=('fail',), strict=False)
+
+        assert dbo.conn.executed[-1] == ('DEALLOCATE pysqldb_stmt_1', None)
+        assert dbo.cache.get('select %s::int as n') is None
+
+    def test_query_params_not_prepared_without_persistent_conn(self):
+        # The connection is closed after each query, so a prepared statement would never be reused
+        dbo = FakeDbConnect(allow_temp_tables=False)
+        qry = Query(dbo, 'select %s as n', timeme=False, internal=True, params=(1,))
+
+        assert qry.data == [(1,)]
+        assert dbo.conn.executed == [('select %s as n', (1,))]
+        assert len(dbo.cache.statements) == 0
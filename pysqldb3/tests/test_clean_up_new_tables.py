@@ -139,6 +139,55 @@ class TestCleanUpNewTablesPg:
 
         assert not db.table_exists(test_clean_up_new_table + '_2', schema=pg_schema)
 
+    def test_clean_up_new_tables_single_drop(self):
+        tables = [test_clean_up_new_table + '_{}'.format(i) for i in range(3)]
+        for table in tables:
+            db.drop_table(schema=pg_schema, table=table)
+            db.query("CREATE TABLE {}.{} (id int)".format(pg_schema, table))
+
+        queries_before = len(db.internal_queries)
+        db.cleanup_new_tables()
+
+        # One DROP for all tables and one delete from the log
+        queries = [q.query_string for q in db.internal_queries[queries_before:]]
+        assert len([q for q in queries if q.startswith('DROP TABLE')]) == 1
+        assert len([q for q in queries if q.startswith('DELETE FROM')]) == 1
+
+        for table in tables:
+            assert not db.table_exists(table, schema=pg_schema)
+            assert len(db.dfquery("select * from {}.{} where table_name = '{}'".format(
+                pg_schema, db.log_table, table))) == 0
+
+    def test_clean_up_new_tables_failed_drop(self):
+        tables = [test_clean_up_new_table + '_{}'.format(i) for i in range(3)]
+        view = test_clean_up_new_table + '_view'
+        for table in tables:
+            db.drop_table(schema=pg_schema, table=table, cascade=True)
+            db.query("CREATE TABLE {}.{} (id int)".format(pg_schema, table))
+
+        # A view made outside this DbConnect's tables keeps the first table from being dropped
+        other_db = pysqldb.DbConnect(type=db.type, server=db.server, database=db.database, user=db.user,
+                                     password=db.password)
+        other_db.query("CREATE VIEW {s}.{v} AS SELECT * FROM {s}.{t}".format(s=pg_schema, v=view, t=tables[0]),
+                       temp=False)
+
+        db.cleanup_new_tables()
+
+        # The rest are still dropped and removed from the log
+        assert db.table_exists(tables[0], schema=pg_schema)
+        assert len(db.dfquery("select * from {}.{} where table_name = '{}'".format(
+            pg_schema, db.log_table, tables[0]))) == 1
+        assert db.tables_created == ['{}.{}'.format(pg_schema, tables[0])]
+
+        for table in tables[1:]:
+            assert not db.table_exists(table, schema=pg_schema)
+            assert len(db.dfquery("select * from {}.{} where table_name = '{}'".format(
+                pg_schema, db.log_table, table))) == 0
+
+        other_db.query("DROP VIEW {}.{}".format(pg_schema, view), temp=False)
+        db.cleanup_new_tables()
+        assert not db.table_exists(tables[0], schema=pg_schema)
+
 
 class TestCleanUpNewTablesMs:
     def test_clean_up_new_tables_basic(self):
@@ -0,0 +1,57 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from .helpers import FakeDbConnect
+from .. import query
+from ..query import Query
+
+ROWS = [
+    (1, 1.5, True, 'a', datetime.datetime(2020, 1, 1), None),
+    (2, None, False, None, datetime.datetime(2020, 1, 2), 7),
+    (3, 2.5, True, 'c', None, 8),
+]
+
+# name, type_code (PG OIDs: int4, float8, bool, varchar, timestamp, int8)
+DESCRIPTION = [('i', 23), ('f', 701), ('b', 16), ('s', 1043), ('ts', 1114), ('n', 20)]
+
+
+class TestColumnarFetch:
+    def test_columnar_fetch_dtypes(self, monkeypatch):
+        monkeypatch.setattr(query, 'COLUMNAR_FETCH_SIZE', 2)
+        dbo = FakeDbConnect(rows=ROWS, description=DESCRIPTION)
+        qry = Query(dbo, 'select 1', timeme=False, internal=True, columnar=True)
+        df = qry.dfquery()
+
+        # Batched fetch, no fetchall of the whole result
+        assert dbo.conn.fetches == [('fetchmany', 2), ('fetchmany', 1), ('fetchmany', 0)]
+        assert list(df.columns) == ['i', 'f', 'b', 's', 'ts', 'n']
+
+        assert df['i'].dtype == np.int64
+        assert df['f'].dtype == np.float64
+        assert df['b'].dtype == bool
+        assert df['s'].dtype == object
+        assert df['ts'].dtype == 'datetime64[ns]'
+
+        # Ints with nulls become floats, as with a DataFrame built from rows
+        assert df['n'].dtype == np.float64
+        assert np.isnan(df['f'][1]) and np.isnan(df['n'][0])
+
+    def test_columnar_fetch_matches_rows(self):
+        columnar = Query(FakeDbConnect(rows=ROWS, description=DESCRIPTION), 'select 1', timeme=False, internal=True,
+                         columnar=True)
+        rows = Query(FakeDbConnect(rows=ROWS, description=DESCRIPTION), 'select 1', timeme=False, internal=True)
+
+        pd.testing.assert_frame_equal(columnar.dfquery(), rows.dfquery())
+
+        # Rows are only built from the DataFrame when data is read
+        assert columnar.data == rows.data
+        assert [type(v) for v in columnar.data[0]] == [int, float, bool, str, datetime.datetime, type(None)]
+
+    def test_columnar_fetch_empty(self):
+        dbo = FakeDbConnect(rows=[], description=DESCRIPTION)
+        df = Query(dbo, 'select 1', timeme=False, internal=True, columnar=True).dfquery()
+
+        assert df.empty
+        assert list(df.columns) == ['i', 'f', 'b', 's', 'ts', 'n']
@@ -264,6 +264,82 @@ class TestBulkCSVToTablePG:
         # Test input schema
         return
 
+    def test_copy_csv_to_table(self):
+        db.query('drop table if exists working.{}'.format(create_table_name))
+
+        fp = os.path.dirname(os.path.abspath(__file__)) + "\\test_data\\copy.csv"
+        pd.DataFrame({'id': range(5000), 'name': ['a', None, "it's, quoted", '', 'e'] * 1000,
+                      'value': [1.5, None, 3.0, 4.0, 5.0] * 1000}).to_csv(fp, index=False)
+
+        # Streams straight into the typed table; no staging table
+        db.csv_to_table(input_file=fp, table=create_table_name, schema='working')
+        assert not db.table_exists(table='stg_' + create_table_name, schema='working')
+
+        db_df = db.dfquery("select * from working.{} order by id".format(create_table_name))
+        pd.testing.assert_frame_equal(db_df, pd.read_csv(fp))
+
+        # Cleanup
+        db.drop_table(schema='working', table=create_table_name)
+        os.remove(fp)
+
+    def test_csv_to_table_infer_types(self):
+        db.query('drop table if exists working.{}'.format(create_table_name))
+
+        fp = os.path.dirname(os.path.abspath(__file__)) + "\\test_data\\infer.csv"
+        pd.DataFrame({'id': range(3000), 'flag': ['true', 'false', ''] * 1000, 'amount': ['1.25', '', '10'] * 1000,
+                      'dt': ['2020-01-01', '2021-06-30', ''] * 1000, 'zip': ['01234', '10001', '11201'] * 1000}
+                     ).to_csv(fp, index=False)
+
+        db.csv_to_table(input_file=fp, table=create_table_name, schema='working', infer_types=True,
+                        column_type_overrides={'zip': 'varchar (10)'})
+
+        types = dict(db.get_table_columns(create_table_name, schema='working'))
+        assert types == {'id': 'smallint', 'flag': 'boolean', 'amount': 'numeric', 'dt': 'date',
+                         'zip': 'character varying'}
+
+        db_df = db.dfquery("select * from working.{} order by id".format(create_table_name))
+        assert len(db_df) == 3000
+        assert list(db_df['zip'][:2]) == ['01234', '10001']
+        assert pd.isnull(db_df['flag'][2])
+
+        # Cleanup
+        db.drop_table(schema='working', table=create_table_name)
+        os.remove(fp)
+
+    def test_copy_csv_to_table_parallel(self):
+        db.query('drop table if exists working.{}'.format(create_table_name))
+
+        fp = os.path.dirname(os.path.abspath(__file__)) + "\\test_data\\copy.csv"
+        pd.DataFrame({'id': range(50000), 'name': ['a', None, 'quoted "newline"\nvalue', '', 'e'] * 10000,
+                      'value': [1.5, None, 3.0, 4.0, 5.0] * 10000}).to_csv(fp, index=False)
+
+        db.csv_to_table(input_file=fp, table=create_table_name, schema='working', parallel=4)
+
+        db_df = db.dfquery("select * from working.{} order by id".format(create_table_name))
+        pd.testing.assert_frame_equal(db_df, pd.read_csv(fp))
+
+        # Cleanup
+        db.drop_table(schema='working', table=create_table_name)
+        os.remove(fp)
+
+    def test_copy_csv_to_table_cast_fails(self):
+        db.query('drop table if exists working.{}'.format(create_table_name))
+
+        # Types are inferred from the first 1000 rows only; the text value further down cannot be cast to bigint
+        fp = os.path.dirname(os.path.abspath(__file__)) + "\\test_data\\copy.csv"
+        pd.DataFrame({'id': list(range(200000)) + ['x']}).to_csv(fp, index=False)
+
+        input_schema = db.dataframe_to_table_schema(df=pd.read_csv(fp, nrows=1000), table=create_table_name,
+                                                    schema='working')
+        assert not db._copy_csv_to_table(fp, 'working', create_table_name, input_schema)
+
+        # Failed COPY is rolled back
+        assert db.dfquery("select count(*) as cnt from working.{}".format(create_table_name)).cnt.values[0] == 0
+
+        # Cleanup
+        db.drop_table(schema='working', table=create_table_name)
+        os.remove(fp)
+
     # Temp test is in logging tests
 
     @classmethod
@@ -0,0 +1,135 @@
+import csv
+import gzip
+import os
+
+import pandas as pd
+
+from .helpers import FakeDbConnect
+from .. import query
+from ..query import Query
+from ..util import MS
+
+ROWS = [(i, 'name {}'.format(i), None if i % 3 else i / 2) for i in range(7)]
+DESCRIPTION = [('id', 23), ('name', 1043), ('value', 701)]
+
+
+class FakeRow(list):
+    # pyodbc Rows are sequences, not tuples
+    pass
+
+
+class TestCsvWriter:
+    def test_to_csv_streams_in_order(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(query, 'CSV_BATCH_SIZE', 3)
+        dbo = FakeDbConnect(rows=ROWS, description=DESCRIPTION)
+        output = os.path.join(str(tmp_path), 'out.csv')
+
+        qry = Query(dbo, 'select * from t', timeme=False, internal=True,
+                    to_csv={'output': output, 'quote_strings': True, 'sep': ','})
+
+        # Fetched a batch at a time; nothing kept on the query
+        assert dbo.conn.fetches == [('fetchmany', 3), ('fetchmany', 3), ('fetchmany', 1), ('fetchmany', 0)]
+        assert qry.data is None
+        assert qry.rows_written == 7
+
+        # Header once, rows in cursor order
+        with open(output) as f:
+            lines = f.read().splitlines()
+        assert lines[0] == '"id","name","value"'
+        assert len(lines) == 8
+
+        df = pd.read_csv(output)
+        assert list(df['id']) == list(range(7))
+        assert df['value'][3] == 1.5 and pd.isnull(df['value'][1])
+
+    def test_to_csv_ms_rows_sep(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(query, 'CSV_BATCH_SIZE', 4)
+        output = os.path.join(str(tmp_path), 'out.csv')
+
+        dbo = FakeDbConnect(rows=[FakeRow(r) for r in ROWS], description=DESCRIPTION, db_type=MS)
+        Query(dbo, 'select * from t', timeme=False, internal=True,
+              to_csv={'output': output, 'quote_strings': False, 'sep': ';'})
+
+        df = pd.read_csv(output, sep=';')
+        assert list(df.columns) == ['id', 'name', 'value']
+        assert list(df['name']) == ['name {}'.format(i) for i in range(7)]
+
+        raw = pd.read_csv(output, sep=';', quoting=csv.QUOTE_NONE)
+        assert '"' not in raw['name'][0]
+
+    def test_to_csv_null_in_later_batch(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(query, 'CSV_BATCH_SIZE', 2)
+        output = os.path.join(str(tmp_path), 'out.csv')
+        rows = [(1, 'a', 1.0), (2, 'b', 2.5), (None, 'c', None), (2 ** 60 + 1, 'd', 4.0)]
+
+        Query(FakeDbConnect(rows=rows, description=DESCRIPTION), 'select * from t', timeme=False, internal=True,
+              to_csv={'output': output, 'quote_strings': False})
+
+        # Same types in every batch: no 1 in one batch and 1.0 in the next
+        with open(output) as f:
+            assert f.read().splitlines() == ['id,name,value', '1,a,1.0', '2,b,2.5', ',c,', '1152921504606846977,d,4.0']
+
+    def test_to_csv_compressed(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(query, 'CSV_BATCH_SIZE', 3)
+        output = os.path.join(str(tmp_path), 'out.csv.gz')
+
+        Query(FakeDbConnect(rows=ROWS, description=DESCRIPTION), 'select * from t', timeme=False, internal=True,
+              to_csv={'output': output, 'compression': 'gzip', 'compression_thread': True})
+
+        with gzip.open(output, 'rt') as f:
+            df = pd.read_csv(f)
+        assert list(df['id']) == list(range(7))
+
+    def test_to_csv_server_side_cursor(self, tmp_path):
+        output = os.path.join(str(tmp_path), 'out.csv')
+
+        # A PG select is streamed from a named (server-side) cursor so libpq doesn't buffer the whole result
+        dbo = FakeDbConnect(rows=ROWS, description=DESCRIPTION)
+        Query(dbo, 'select * from t', timeme=False, internal=True, to_csv={'output': output})
+        assert dbo.conn.cursors == ['ss_csv']
+        assert len(pd.read_csv(output)) == 7
+
+        # Statements a server-side cursor can't run, and MS, use a client-side cursor
+        dbo = FakeDbConnect(rows=ROWS, description=DESCRIPTION)
+        Query(dbo, 'create temp table x as select 1; select * from t', timeme=False, internal=True,
+              to_csv={'output': output})
+        assert dbo.conn.cursors == [None]
+
+        dbo = FakeDbConnect(rows=[FakeRow(r) for r in ROWS], description=DESCRIPTION, db_type=MS)
+        Query(dbo, 'select * from t', timeme=False, internal=True, to_csv={'output': output})
+        assert dbo.conn.cursors == [None]
+
+    def test_to_csv_empty(self, tmp_path):
+        output = os.path.join(str(tmp_path), 'out.csv')
+
+        qry = Query(FakeDbConnect(rows=[], description=DESCRIPTION), 'select * from t', timeme=False, internal=True,
+                    to_csv={'output': output})
+
+        assert qry.rows_written == 0
+        with open(output) as f:
+            assert f.read().splitlines() == ['"id","name","value"']
+
+    def test_iterable_query_to_csv(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(query, 'CSV_BATCH_SIZE', 2)
+        dbo = FakeDbConnect(rows=ROWS + [(None, None, None)], description=DESCRIPTION)
+        output = os.path.join(str(tmp_path), 'out.csv')
+
+        # Server-side cursor: columns come from the description after the first fetch
+        qry = Query(dbo, 'select * from t', timeme=False, internal=True, iterate=True)
+        qry.iterable_query_to_csv(output, False, True, ',')
+
+        # Empty rows are dropped, as before
+        df = pd.read_csv(output)
+        assert list(df['id']) == list(range(7))
+        assert dbo.conn.fetches == [('fetchmany', 2)] * 4 + [('fetchmany', 0)]
+
+    def test_query_to_csv_fetched_data(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(query, 'CSV_BATCH_SIZE', 3)
+        output = os.path.join(str(tmp_path), 'out.csv')
+
+        qry = Query(FakeDbConnect(rows=ROWS, description=DESCRIPTION), 'select * from t', timeme=False, internal=True)
+        qry.query_to_csv(output)
+
+        # Already fetched data is written in order (not strided across chunks)
+        df = pd.read_csv(output)
+        assert list(df['id']) == list(range(7))
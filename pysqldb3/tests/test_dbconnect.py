@@ -3,6 +3,7 @@ import os
 
 import configparser
 import pandas as pd
+import pytest
 
 from . import helpers
 from .. import pysqldb3 as pysqldb
@@ -187,6 +188,44 @@ class TestMisc:
 
         sql.drop_table(table=table_for_testing, schema='dbo')
 
+    def test_tables_exist_pg(self):
+        db.drop_table(table=table_for_testing, schema='working')
+        tables = ['working.{}'.format(pg_table_name), 'working.{}'.format(table_for_testing),
+                  'Working."{}"'.format(pg_table_name)]
+
+        queries = len(db.queries)
+        exists = db.tables_exist(tables)
+
+        # One catalog query for all tables
+        assert len(db.queries) == queries + 1
+        assert list(exists.keys()) == tables
+        assert list(exists.values()) == [True, False, True]
+        assert exists['working.{}'.format(pg_table_name)] == db.table_exists(pg_table_name, schema='working')
+
+    def test_tables_exist_ms(self):
+        sql.drop_table(table=table_for_testing, schema='dbo')
+        tables = ['{}.{}'.format(sql.default_schema, sql_table_name), 'dbo.{}'.format(table_for_testing),
+                  '[{}].[{}]'.format(sql.default_schema, sql_table_name.upper())]
+
+        exists = sql.tables_exist(tables)
+        assert list(exists.values()) == [True, False, True]
+
+    def test_cleanup_new_tables_pg(self):
+        cleanup_db = pysqldb.DbConnect(type=test_config.get('PG_DB', 'TYPE'),
+                                       server=test_config.get('PG_DB', 'SERVER'),
+                                       database=test_config.get('PG_DB', 'DB_NAME'),
+                                       user=test_config.get('PG_DB', 'DB_USER'),
+                                       password=test_config.get('PG_DB', 'DB_PASSWORD'))
+        cleanup_db.query('create table working.{} as select 1 as a'.format(table_for_testing), timeme=False)
+        cleanup_db.query('create table working.{}_2 as select 1 as a'.format(table_for_testing), timeme=False)
+        cleanup_db.query('drop table working.{}_2'.format(table_for_testing), timeme=False)
+
+        cleanup_db.cleanup_new_tables()
+
+        assert not cleanup_db.table_exists(table_for_testing, schema='working')
+        assert cleanup_db.tables_created == []
+        assert not cleanup_db.check_table_in_log(table_for_testing, schema='working')
+
     @classmethod
     def teardown_class(cls):
         helpers.clean_up_test_table_pg(db)
@@ -339,6 +378,114 @@ class TestLogging:
 
         assert len(new_log_tbl_df) == 0
 
+    def test_orphaned_log_entry_deletion(self):
+        db.query("""
+        INSERT INTO working.__temp_log_table_{u}__ (table_owner, table_schema, table_name, created_on, expires)
+        VALUES ('{u}', 'working', '{t}_orphan', now(), now()::date + interval '7 days')
+        ON CONFLICT (table_schema, table_name) DO NOTHING;
+        """.format(u=db.user, t=table_for_testing_logging))
+
+        reconnect_db = pysqldb.DbConnect(type=db.type,
+                                         server=db.server,
+                                         database=db.database,
+                                         user=db.user,
+                                         password=db.password)
+
+        # Table never existed, so the set-based cleanup removes it from the log
+        assert len(reconnect_db.dfquery("""
+        SELECT *
+        FROM working.__temp_log_table_{}__
+        WHERE table_name='{}_orphan';
+        """.format(db.user, table_for_testing_logging))) == 0
+
+        assert reconnect_db.cleanup_time is not None
+
+    def test_cleanup_policy_off_and_background(self):
+        insert_orphan = """
+        INSERT INTO working.__temp_log_table_{u}__ (table_owner, table_schema, table_name, created_on, expires)
+        VALUES ('{u}', 'working', '{t}_orphan', now(), now()::date + interval '7 days')
+        ON CONFLICT (table_schema, table_name) DO NOTHING;
+        """.format(u=db.user, t=table_for_testing_logging)
+        check_orphan = """
+        SELECT *
+        FROM working.__temp_log_table_{}__
+        WHERE table_name='{}_orphan';
+        """.format(db.user, table_for_testing_logging)
+
+        db.query(insert_orphan)
+
+        # No cleanup, the entry stays
+        off_db = pysqldb.DbConnect(type=db.type, server=db.server, database=db.database, user=db.user,
+                                   password=db.password, cleanup='off')
+        assert off_db.cleanup_thread is None
+        assert len(off_db.dfquery(check_orphan)) == 1
+
+        # Background cleanup returns immediately and cleans on its own thread
+        background_db = pysqldb.DbConnect(type=db.type, server=db.server, database=db.database, user=db.user,
+                                          password=db.password, cleanup='background')
+        background_db.wait_for_cleanup(60)
+        assert not background_db.cleanup_thread.is_alive()
+        assert len(background_db.dfquery(check_orphan)) == 0
+
+    def test_cleanup_policy_periodic(self):
+        check_stamp = """
+        SELECT created_on
+        FROM {s}.__temp_log_table_{u}__
+        WHERE table_schema='{s}' AND table_name='__temp_log_table_{u}__';
+        """.format(s=db.default_schema, u=db.user)
+        insert_orphan = """
+        INSERT INTO working.__temp_log_table_{u}__ (table_owner, table_schema, table_name, created_on, expires)
+        VALUES ('{u}', 'working', '{t}_orphan', now(), now()::date + interval '7 days')
+        ON CONFLICT (table_schema, table_name) DO NOTHING;
+        """.format(u=db.user, t=table_for_testing_logging)
+        check_orphan = """
+        SELECT *
+        FROM working.__temp_log_table_{}__
+        WHERE table_name='{}_orphan';
+        """.format(db.user, table_for_testing_logging)
+
+        # First periodic cleanup runs and records itself in the log table
+        periodic_db = pysqldb.DbConnect(type=db.type, server=db.server, database=db.database, user=db.user,
+                                        password=db.password, cleanup='periodic')
+        periodic_db.wait_for_cleanup(60)
+        stamp = periodic_db.dfquery(check_stamp)
+        assert len(stamp) == 1
+
+        # A second one within the interval (from any host) skips the cleanup
+        db.query(insert_orphan)
+        skipped_db = pysqldb.DbConnect(type=db.type, server=db.server, database=db.database, user=db.user,
+                                       password=db.password, cleanup='periodic')
+        skipped_db.wait_for_cleanup(60)
+        assert skipped_db.cleanup_time is None
+        assert len(skipped_db.dfquery(check_orphan)) == 1
+        assert skipped_db.dfquery(check_stamp)['created_on'][0] == stamp['created_on'][0]
+
+        db.query("DELETE FROM working.__temp_log_table_{}__ WHERE table_name='{}_orphan'".format(
+            db.user, table_for_testing_logging))
+
+    def test_cleanup_policy_periodic_mixed_case_user(self):
+        # A user with capitals: PG folds the unquoted log table name, so the stamp must be logged in lowercase or the
+        # nonexistent table cleanup deletes it
+        mixed_db = pysqldb.DbConnect(type=db.type, server=db.server, database=db.database, user=db.user,
+                                     password=db.password, cleanup='off', allow_temp_tables=True)
+        mixed_db.log_table = mixed_db.log_table.upper()
+
+        mixed_db._DbConnect__record_cleanup()
+        mixed_db._DbConnect__remove_nonexistent_tables_from_logs()
+
+        assert not mixed_db._DbConnect__cleanup_is_due()
+        assert len(mixed_db.dfquery("""
+        SELECT *
+        FROM {s}.__temp_log_table_{u}__
+        WHERE table_name='__temp_log_table_{u}__';
+        """.format(s=mixed_db.default_schema, u=db.user.lower()))) == 1
+        mixed_db.disconnect(True)
+
+    def test_cleanup_policy_invalid(self):
+        with pytest.raises(ValueError):
+            pysqldb.DbConnect(type=db.type, server=db.server, database=db.database, user=db.user,
+                              password=db.password, cleanup='sometimes')
+
     def test_custom_logging_expiration_date(self):
         db.query("""
             drop table if exists working.{};
@@ -913,3 +1060,177 @@ class TestLogging:
     @classmethod
     def teardown_class(cls):
         helpers.clean_up_test_table_pg(db)
+
+
+class TestPool:
+    def test_pool_reuses_connection_pg(self):
+        pool_db = pysqldb.DbConnect(type=test_config.get('PG_DB', 'TYPE'),
+                                    server=test_config.get('PG_DB', 'SERVER'),
+                                    database=test_config.get('PG_DB', 'DB_NAME'),
+                                    user=test_config.get('PG_DB', 'DB_USER'),
+                                    password=test_config.get('PG_DB', 'DB_PASSWORD'),
+                                    use_pool=True, pool_max_size=2)
+        count = pool_db.connection_count
+
+        for _ in range(10):
+            pool_db.query('select 1', timeme=False)
+
+        # No new connections are opened and the connection is back in the pool between queries
+        assert pool_db.connection_count == count
+        assert pool_db.conn is None
+        assert pool_db.pool.in_use == 0
+
+        pool_db.close_pool()
+        assert pool_db.pool is None
+
+    def test_pool_reuses_connection_ms(self):
+        pool_sql = pysqldb.DbConnect(type=test_config.get('SQL_DB', 'TYPE'),
+                                     server=test_config.get('SQL_DB', 'SERVER'),
+                                     database=test_config.get('SQL_DB', 'DB_NAME'),
+                                     ldap=True,
+                                     use_pool=True, pool_max_size=2)
+        count = pool_sql.connection_count
+
+        for _ in range(10):
+            pool_sql.query('select 1', timeme=False)
+
+        assert pool_sql.connection_count == count
+        assert pool_sql.pool.in_use == 0
+
+        pool_sql.close_pool()
+
+    def test_pool_logging_pg(self):
+        pool_db = pysqldb.DbConnect(type=test_config.get('PG_DB', 'TYPE'),
+                                    server=test_config.get('PG_DB', 'SERVER'),
+                                    database=test_config.get('PG_DB', 'DB_NAME'),
+                                    user=test_config.get('PG_DB', 'DB_USER'),
+                                    password=test_config.get('PG_DB', 'DB_PASSWORD'),
+                                    use_pool=True)
+        pool_db.drop_table(schema='working', table=table_for_testing_logging)
+        pool_db.query('create table working.{} as select 1 as a'.format(table_for_testing_logging))
+
+        assert pool_db.table_exists(table_for_testing_logging, schema='working')
+        assert len(pool_db.dfquery("select * from working.{} where table_name = '{}'".format(
+            pool_db.log_table, table_for_testing_logging))) == 1
+
+        pool_db.drop_table(schema='working', table=table_for_testing_logging)
+        assert pool_db.pool.in_use == 0
+        pool_db.close_pool()
+
+
+class TestMetadataCache:
+    def test_metadata_cache_pg(self):
+        cache_db = pysqldb.DbConnect(type=test_config.get('PG_DB', 'TYPE'),
+                                     server=test_config.get('PG_DB', 'SERVER'),
+                                     database=test_config.get('PG_DB', 'DB_NAME'),
+                                     user=test_config.get('PG_DB', 'DB_USER'),
+                                     password=test_config.get('PG_DB', 'DB_PASSWORD'),
+                                     use_metadata_cache=True)
+        cache_db.drop_table(schema='working', table=table_for_testing)
+        assert not cache_db.table_exists(table_for_testing, schema='working')
+
+        # Repeated lookups are answered from the cache
+        queries = len(cache_db.internal_queries)
+        for _ in range(5):
+            assert not cache_db.table_exists(table_for_testing, schema='working')
+            cache_db.get_schemas()
+            cache_db.get_schemas()
+        assert len(cache_db.internal_queries) == queries + 1
+        assert cache_db.metadata_cache_hits >= 9
+
+        # Creating, altering and dropping the table invalidates it
+        cache_db.query('create table working.{} as select 1 as a'.format(table_for_testing), timeme=False)
+        assert cache_db.table_exists(table_for_testing, schema='working')
+        assert [c[0] for c in cache_db.get_table_columns(table_for_testing, schema='working')] == ['a']
+
+        cache_db.query('alter table working.{} add column b int'.format(table_for_testing), timeme=False)
+        assert [c[0] for c in cache_db.get_table_columns(table_for_testing, schema='working')] == ['a', 'b']
+
+        cache_db.drop_table(schema='working', table=table_for_testing)
+        assert not cache_db.table_exists(table_for_testing, schema='working')
+
+    def test_metadata_cache_ms(self):
+        cache_sql = pysqldb.DbConnect(type=test_config.get('SQL_DB', 'TYPE'),
+                                      server=test_config.get('SQL_DB', 'SERVER'),
+                                      database=test_config.get('SQL_DB', 'DB_NAME'),
+                                      ldap=True,
+                                      use_metadata_cache=True)
+        cache_sql.drop_table(schema='dbo', table=table_for_testing)
+        assert not cache_sql.table_exists(table_for_testing, schema='dbo')
+
+        cache_sql.query('select 1 as a into dbo.{}'.format(table_for_testing), timeme=False)
+        assert cache_sql.table_exists(table_for_testing, schema='dbo')
+        assert cache_sql.table_exists(table_for_testing, schema='dbo')
+        assert cache_sql.metadata_cache_hits >= 1
+
+        cache_sql.drop_table(schema='dbo', table=table_for_testing)
+        assert not cache_sql.table_exists(table_for_testing, schema='dbo')
+
+    def test_metadata_cache_off_by_default(self):
+        assert db.metadata_cache is None
+        assert db.metadata_cache_hits == 0
+
+
+class TestRunMany:
+    def test_run_many_pg(self):
+        queries = ['select {n} as n, pg_sleep(0.5)'.format(n=n) for n in range(8)]
+
+        count = len(db.queries)
+        start = datetime.datetime.now()
+        results = db.run_many(queries, max_workers=4)
+        wall_time = (datetime.datetime.now() - start).total_seconds()
+
+        # Results and history are in input order
+        assert [q.data[0][0] for q in results] == list(range(8))
+        assert db.queries[count:] == results
+        assert db.data == results[-1].data
+
+        # Queries ran concurrently: 8 half second queries on 4 connections take well under the summed 4 seconds
+        assert wall_time < sum([q.query_time.total_seconds() for q in results]) / 2
+
+    def test_run_many_pg_df(self):
+        dfs = db.run_many(['select {} as n'.format(n) for n in range(3)], max_workers=2, return_df=True)
+        assert [df.n.values[0] for df in dfs] == [0, 1, 2]
+
+    def test_run_many_pg_logging(self):
+        tables = ['{}_{}'.format(table_for_testing, n) for n in range(3)]
+        for t in tables:
+            db.drop_table(schema='working', table=t)
+
+        db.run_many(['create table working.{} as select 1 as a'.format(t) for t in tables], max_workers=3)
+
+        for t in tables:
+            assert 'working.{}'.format(t) in db.tables_created
+            assert db.table_exists(t, schema='working')
+            assert len(db.dfquery("select * from working.{} where table_name = '{}'".format(
+                db.log_table, t))) == 1
+            db.drop_table(schema='working', table=t)
+
+    def test_run_many_ms(self):
+        results = sql.run_many(['select {} as n'.format(n) for n in range(4)], max_workers=2)
+        assert [q.data[0][0] for q in results] == list(range(4))
+
+
+class TestParams:
+    def test_query_params_pg(self):
+        params_db = pysqldb.DbConnect(type=test_config.get('PG_DB', 'TYPE'),
+                                      server=test_config.get('PG_DB', 'SERVER'),
+                                      database=test_config.get('PG_DB', 'DB_NAME'),
+                                      user=test_config.get('PG_DB', 'DB_USER'),
+                                      password=test_config.get('PG_DB', 'DB_PASSWORD'),
+                                      allow_temp_tables=True)
+
+        for i in range(5):
+            df = params_db.dfquery('select %s::int as n, %s::text as t', params=(i, "it's"))
+            assert df.n.values[0] == i
+            assert df.t.values[0] == "it's"
+
+        # Statement prepared once on the connection and reused
+        cache = params_db._statement_cache(params_db.conn)
+        assert len(cache.statements) == 1
+        assert cache.hits == 4
+        params_db.disconnect(True)
+
+    def test_query_params_ms(self):
+        df = sql.dfquery('select ? as n', params=(1,))
+        assert df.n.values[0] == 1
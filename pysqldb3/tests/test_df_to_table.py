@@ -491,6 +491,32 @@ class TestDfToTablePG:
         # Cleanup
         db.drop_table(table=table_name, schema='working')
 
+    def test_df_to_table_pg_copy_nulls(self):
+        # Setup test df with nulls, empty strings, quotes and datetimes, loaded over several COPY chunks
+        test_df = pd.DataFrame({'id': [1, 2, 3, 4, 5],
+                                'name': ['a', '', None, "it's, \"quoted\"", 'line\nbreak'],
+                                'value': [1.5, None, 3.0, float('nan'), 5.0],
+                                'dt': pd.to_datetime(['2020-01-01 10:30:15', None, '2020-01-03', '2020-01-04',
+                                                      '2020-01-05'])})
+
+        # Assert does not already exist
+        assert not db.table_exists(table=table_name, schema='working')
+
+        # Dataframe_to_table
+        db.dataframe_to_table(df=test_df, table=table_name, schema='working', chunk_size=2)
+
+        # Assert table correctness
+        table_df = db.dfquery('select * from working.{} order by id'.format(table_name))
+        assert list(table_df['id']) == [1, 2, 3, 4, 5]
+        assert list(table_df['name']) == ['a', '', None, "it's, \"quoted\"", 'line\nbreak']
+        assert pd.isnull(table_df['value'][1]) and pd.isnull(table_df['value'][3])
+        assert table_df['value'][4] == 5.0
+        assert pd.isnull(table_df['dt'][1])
+        assert table_df['dt'][0] == pd.Timestamp('2020-01-01 10:30:15')
+
+        # Cleanup
+        db.drop_table(table=table_name, schema='working')
+
     # Log tests are in test_dbconnect
 
 
@@ -639,4 +665,24 @@ class TestDfToTableMS:
         # Cleanup
         sql.drop_table(table=table_name, schema='dbo')
 
+    def test_df_to_table_ms_nulls_batches(self):
+        # Setup test df with nulls, empty strings and quotes, inserted over several batches
+        test_df = pd.DataFrame({'id': list(range(10)),
+                                'name': ['a', '', None, "it's", 'e'] * 2,
+                                'value': [1.5, None, 3.0, float('nan'), 5.0] * 2})
+        sql.drop_table(table=table_name, schema='dbo')
+
+        # Dataframe_to_table
+        sql.dataframe_to_table(df=test_df, table=table_name, schema='dbo', chunk_size=3)
+
+        # Assert table correctness
+        table_df = sql.dfquery('select * from [dbo].{} order by id'.format(table_name))
+        assert list(table_df['id']) == list(range(10))
+        assert list(table_df['name'][:5]) == ['a', '', None, "it's", 'e']
+        assert pd.isnull(table_df['value'][1]) and pd.isnull(table_df['value'][3])
+        assert table_df['value'][9] == 5.0
+
+        # Cleanup
+        sql.drop_table(table=table_name, schema='dbo')
+
     # Log tests are in test_dbconnect
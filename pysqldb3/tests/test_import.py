@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+from ..Config import CONFIG_PATH
+
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Seconds allowed for a cold import of the package in a fresh interpreter (pandas is the bulk of it)
+IMPORT_TIME_BUDGET = 5
+
+
+def run_in_fresh_interpreter(code):
+    """
+    Runs python code in a new interpreter so nothing is already imported/cached
+    :param code: python code to run
+    :return: stdout as str
+    """
+    return subprocess.check_output([sys.executable, '-c', code], cwd=PACKAGE_PARENT, stderr=subprocess.STDOUT,
+                                   universal_newlines=True)
+
+
+class TestImport:
+    def test_import_time(self):
+        output = run_in_fresh_interpreter("""
+import time
+start = time.perf_counter()
+import pysqldb3.pysqldb3
+print(time.perf_counter() - start)
+""")
+        import_time = float(output.strip().split('\n')[-1])
+        print('Cold import of pysqldb3: {} seconds'.format(round(import_time, 3)))
+
+        assert import_time < IMPORT_TIME_BUDGET
+
+    def test_import_skips_optional_modules(self):
+        output = run_in_fresh_interpreter("""
+import sys
+import pysqldb3.pysqldb3
+print([m for m in ('plotly', 'openpyxl', 'shapely', 'tqdm', 'pyodbc') if m in sys.modules])
+""")
+        assert output.strip().split('\n')[-1] == '[]'
+
+    def test_import_does_not_write_config(self):
+        before = os.path.getmtime(CONFIG_PATH) if os.path.isfile(CONFIG_PATH) else None
+
+        run_in_fresh_interpreter('import pysqldb3.pysqldb3')
+
+        after = os.path.getmtime(CONFIG_PATH) if os.path.isfile(CONFIG_PATH) else None
+        assert before == after
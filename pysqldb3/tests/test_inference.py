@@ -0,0 +1,94 @@
+import os
+
+import pandas as pd
+import pytest
+
+from ..inference import TypeInference, infer_csv_types
+from ..util import MS, PG
+
+
+def infer(data, db_type=PG, **kwargs):
+    inference = TypeInference(db_type, **kwargs)
+    inference.update(pd.DataFrame(data))
+    return inference.types()
+
+
+class TestTypeInference:
+    def test_inference_integers(self):
+        types = infer({'small': ['1', '-32768', '32767'], 'int': ['1', '40000', None], 'big': ['1', '3000000000', '2'],
+                       'huge': ['1', '12345678901234567890', '0']})
+
+        assert types == {'small': 'smallint', 'int': 'integer', 'big': 'bigint', 'huge': 'numeric (20, 0)'}
+        assert infer({'int': ['40000']}, db_type=MS) == {'int': 'int'}
+
+    def test_inference_numeric(self):
+        types = infer({'numeric': ['1.5', '-123.25', '.5'], 'float': ['1.5', '1e10', '-2'],
+                       'zeros': ['0.001', '0.1', '10']})
+
+        assert types == {'numeric': 'numeric (5, 2)', 'float': 'float', 'zeros': 'numeric (5, 3)'}
+
+    def test_inference_leading_zeros(self):
+        # Zip codes and ids with leading zeros are kept as text
+        assert infer({'zip': ['01234', '10001']}) == {'zip': 'varchar (5)'}
+
+    def test_inference_boolean(self):
+        assert infer({'b': ['True', 'false', None]}) == {'b': 'boolean'}
+        assert infer({'b': ['True', 'false']}, db_type=MS) == {'b': 'bit'}
+        assert infer({'b': ['True', 'no']}) == {'b': 'varchar (4)'}
+
+    def test_inference_dates(self):
+        types = infer({'date': ['2020-01-01', '2021-12-31'], 'ts': ['2020-01-01', '2020-01-01 10:30:15.25'],
+                       'bad': ['2020-01-01', '2020-13-45']})
+
+        assert types == {'date': 'date', 'ts': 'timestamp', 'bad': 'varchar (10)'}
+        assert infer({'ts': ['2020-01-01T10:30']}, db_type=MS) == {'ts': 'datetime2'}
+
+    def test_inference_varchar(self):
+        assert infer({'s': ['a', 'abcdef', None]}) == {'s': 'varchar (6)'}
+        assert infer({'s': [None, None]}) == {'s': 'varchar (500)'}
+        assert infer({'s': ['a' * 9000]}, db_type=MS) == {'s': 'varchar (max)'}
+        assert infer({'s': ['a' * 70000]}) == {'s': 'text'}
+
+    def test_inference_across_chunks(self):
+        inference = TypeInference(PG)
+        inference.update(pd.DataFrame({'a': ['1', '2'], 'b': ['1', '2']}))
+        inference.update(pd.DataFrame({'a': ['100000', None], 'b': ['x', '3']}))
+
+        assert inference.rows == 4
+        assert inference.types() == {'a': 'integer', 'b': 'varchar (1)'}
+
+    def test_inference_sample(self):
+        inference = TypeInference(PG, sample_size=100, random_state=1)
+
+        for i in range(10):
+            inference.update(pd.DataFrame({'a': [str(i * 1000 + n) for n in range(1000)]}))
+
+        assert inference.rows == 10000
+        assert len(inference.reservoir) == 100
+
+        # Sample is drawn from the whole input, not just the first rows
+        assert pd.to_numeric(inference.reservoir['a']).max() > 1000
+        assert inference.types() == {'a': 'smallint'}
+
+    def test_inference_sample_small_chunks(self):
+        inference = TypeInference(PG, sample_size=5, random_state=1)
+
+        for i in range(4):
+            inference.update(pd.DataFrame({'a': [str(i)] * 2}))
+
+        assert len(inference.reservoir) == 5
+
+    def test_inference_bad_type(self):
+        with pytest.raises(ValueError):
+            TypeInference('ORACLE')
+
+    def test_infer_csv_types(self):
+        fp = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data', 'inference.csv')
+        pd.DataFrame({'id': range(2500), 'flag': ['true', 'false', ''] * 833 + ['true'],
+                      'note': ['NA', 'abc', ''] * 833 + ['x']}).to_csv(fp, index=False)
+
+        # Only empty cells are nulls; 'NA' is text
+        types = infer_csv_types(fp, PG, chunksize=1000)
+        os.remove(fp)
+
+        assert types == {'id': 'smallint', 'flag': 'boolean', 'note': 'varchar (3)'}
@@ -0,0 +1,83 @@
+import pytest
+
+from .helpers import FakeConnection
+from ..pool import ConnectionPool
+
+
+class TestConnectionPool:
+    def test_pool_min_size(self):
+        pool = ConnectionPool(FakeConnection, min_size=2, max_size=3)
+        assert pool.size == 2
+        assert pool.connections_opened == 2
+
+    def test_pool_reuses_connections(self):
+        pool = ConnectionPool(FakeConnection, min_size=1, max_size=3)
+
+        for _ in range(10):
+            conn = pool.acquire()
+            pool.release(conn)
+
+        assert pool.connections_opened == 1
+        assert pool.connections_reused == 10
+        assert pool.in_use == 0
+
+    def test_pool_release_rolls_back(self):
+        pool = ConnectionPool(FakeConnection, min_size=0, max_size=1, pre_ping=False)
+        conn = pool.acquire()
+        pool.release(conn)
+        assert conn.rollbacks == 1
+
+    def test_pool_grows_to_max(self):
+        pool = ConnectionPool(FakeConnection, min_size=0, max_size=2, timeout=0)
+        c1 = pool.acquire()
+        c2 = pool.acquire()
+        assert c1 is not c2
+        assert pool.size == 2
+
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+        pool.release(c1)
+        assert pool.acquire() is c1
+
+    def test_pool_pre_ping_replaces_broken(self):
+        pool = ConnectionPool(FakeConnection, min_size=1, max_size=1, pre_ping=True)
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.broken = True
+
+        new_conn = pool.acquire()
+        assert new_conn is not conn
+        assert conn.closed
+        assert pool.connections_opened == 2
+
+    def test_pool_discards_closed(self):
+        pool = ConnectionPool(FakeConnection, min_size=0, max_size=1, pre_ping=False)
+        conn = pool.acquire()
+        conn.close()
+        pool.release(conn)
+        assert pool.size == 0
+        assert pool.acquire() is not conn
+
+    def test_pool_idle_timeout(self):
+        pool = ConnectionPool(FakeConnection, min_size=1, max_size=3, idle_timeout=0)
+        c1 = pool.acquire()
+        c2 = pool.acquire()
+        pool.release(c1)
+        pool.release(c2)
+
+        # Idle connections past the timeout are closed down to min_size
+        assert pool.size == 1
+        assert c1.closed
+
+    def test_pool_close(self):
+        pool = ConnectionPool(FakeConnection, min_size=2, max_size=2)
+        pool.close()
+        assert pool.size == 0
+
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+
+    def test_pool_bad_sizes(self):
+        with pytest.raises(ValueError):
+            ConnectionPool(FakeConnection, min_size=3, max_size=2)
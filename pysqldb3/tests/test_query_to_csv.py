@@ -223,6 +223,91 @@ class TestQueryToCSVPG:
         db.drop_table(schema='working', table=test_csv_name)
         os.remove(output)
 
+    def test_query_to_csv_copy_geom(self):
+        output = os.path.dirname(os.path.abspath(__file__)) + 'test_query_to_csv.csv'
+        db.drop_table(schema='working', table=test_csv_name)
+
+        # Setup table
+        db.query("""
+            create table working.{} (id int, geom geometry);
+
+            insert into working.{} values (1, st_setsrid(st_makepoint(1, 2), 2263)), (2, null);
+        """.format(test_csv_name, test_csv_name))
+
+        # Query_to_csv with COPY; geometry is converted to WKT on the server
+        db.query_to_csv(query='select * from working.{} order by id'.format(test_csv_name),
+                        output_file=output, use_copy=True)
+
+        result_df = pd.read_csv(output)
+        assert list(result_df['id']) == [1, 2]
+        assert result_df['geom'][0] == 'POINT(1 2)'
+        assert pd.isnull(result_df['geom'][1])
+
+        # Without wkt, geometry is written as it is returned (WKB hex)
+        db.query_to_csv(query='select * from working.{} order by id'.format(test_csv_name),
+                        output_file=output, use_copy=True, wkt=False)
+
+        result_df = pd.read_csv(output)
+        assert result_df['geom'][0].startswith('0101000020')
+
+        # Cleanup
+        db.drop_table(schema='working', table=test_csv_name)
+        os.remove(output)
+
+    def test_query_to_csv_copy_fallback(self):
+        output = os.path.dirname(os.path.abspath(__file__)) + 'test_query_to_csv.csv'
+
+        # Several statements cannot be a COPY source, so this uses the pandas writer
+        db.query_to_csv(query="""
+            drop table if exists test_csv_temp;
+            create temp table test_csv_temp as select 1 as col1;
+            select * from test_csv_temp
+        """, output_file=output, use_copy=True)
+
+        result_df = pd.read_csv(output)
+        assert list(result_df['col1']) == [1]
+
+        # Cleanup
+        os.remove(output)
+
+
+    def test_query_to_csv_copy_matches_default(self):
+        output = os.path.dirname(os.path.abspath(__file__)) + 'test_query_to_csv.csv'
+        copy_output = os.path.dirname(os.path.abspath(__file__)) + 'test_query_to_csv_copy.csv'
+        db.drop_table(schema='working', table=test_csv_name)
+
+        # Setup table
+        db.query("""
+            create table working.{} (id int, name varchar, amount numeric, flag boolean, geom geometry);
+
+            insert into working.{} values (1, 'a, b', 1.5, true, st_setsrid(st_makepoint(1, 2), 2263)),
+                (2, null, null, false, null);
+        """.format(test_csv_name, test_csv_name))
+
+        query = 'select * from working.{} order by id'.format(test_csv_name)
+        db.query_to_csv(query=query, output_file=output)
+        db.query_to_csv(query=query, output_file=copy_output, use_copy=True)
+
+        # The default writer is unchanged: pandas formatting, shapely WKT, quoted header and nulls
+        with open(output) as f:
+            assert f.read().splitlines() == ['"id","name","amount","flag","geom"',
+                                             '"1","a, b","1.5","True","POINT (1 2)"',
+                                             '"2","","","False",""']
+
+        # COPY writes the same values the way PG formats them
+        with open(copy_output) as f:
+            assert f.read().splitlines() == ['id,name,amount,flag,geom',
+                                             '"1","a, b","1.5","t","POINT(1 2)"',
+                                             '"2",,,"f",']
+
+        default_df, copy_df = pd.read_csv(output), pd.read_csv(copy_output)
+        pd.testing.assert_frame_equal(default_df[['id', 'name', 'amount']], copy_df[['id', 'name', 'amount']])
+
+        # Cleanup
+        db.drop_table(schema='working', table=test_csv_name)
+        os.remove(output)
+        os.remove(copy_output)
+
 
 class TestQueryToCSVMS:
     def test_query_to_csv_basic(self):
@@ -354,3 +439,17 @@ class TestQueryToCSVMS:
         # Cleanup
         sql.drop_table(schema='dbo', table=test_csv_name)
         os.remove(output)
+
+    def test_query_to_csv_wkt(self):
+        output = os.path.dirname(os.path.abspath(__file__)) + 'test_query_to_csv.csv'
+        query = 'select 1 as id, geometry::Point(1, 2, 2263) as geom'
+
+        # By default the query isn't described and geometry is written as returned
+        sql.query_to_csv(query=query, output_file=output)
+        assert pd.read_csv(output)['geom'][0] != 'POINT (1 2)'
+
+        # Converted on the server when asked for
+        sql.query_to_csv(query=query, output_file=output, wkt=True)
+        assert pd.read_csv(output)['geom'][0] == 'POINT (1 2)'
+
+        os.remove(output)
@@ -0,0 +1,94 @@
+import datetime
+import decimal
+import json
+import os
+
+import pytest
+
+from .helpers import FakeDbConnect
+from ..query import Query
+
+pa = pytest.importorskip('pyarrow')
+pq = pytest.importorskip('pyarrow.parquet')
+
+GEOMETRY_OID = 90001
+
+# POINT (1 2) with SRID 2263, as PostGIS returns it
+EWKB_POINT = '0101000020D7080000000000000000F03F0000000000000040'
+
+ROWS = [
+    (1, 'a', decimal.Decimal('1.50'), decimal.Decimal('3.14159'), datetime.datetime(2020, 1, 1), True, EWKB_POINT),
+    (2, None, None, decimal.Decimal('2'), None, None, None),
+    (3, 'c', decimal.Decimal('-2.25'), None, datetime.datetime(2020, 1, 3), False, EWKB_POINT),
+]
+
+# name, type_code, display_size, internal_size, precision, scale, null_ok
+DESCRIPTION = [('id', 23, None, 4, None, None, None), ('name', 1043, None, -1, None, None, None),
+               ('amount', 1700, None, -1, 10, 2, None), ('ratio', 1700, None, -1, None, None, None),
+               ('ts', 1114, None, 8, None, None, None), ('flag', 16, None, 1, None, None, None),
+               ('geom', GEOMETRY_OID, None, -1, None, None, None)]
+
+# The pg_type lookup finds the geometry type oid
+RESPONSES = {'pg_type': [(GEOMETRY_OID,)]}
+
+
+class TestQueryToParquet:
+    def test_query_to_parquet_row_groups(self, tmp_path):
+        dbo = FakeDbConnect(rows=ROWS, description=DESCRIPTION, responses=RESPONSES)
+        output = os.path.join(str(tmp_path), 'out.parquet')
+
+        qry = Query(dbo, 'select * from t', timeme=False, iterate=True, no_comment=True, temp=False)
+        assert qry.iterable_query_to_parquet(output, row_group_size=2, compression='zstd') == 3
+
+        # The geometry type lookup, then one row group per fetched batch
+        assert dbo.conn.fetches == [('fetchall', 1), ('fetchmany', 2), ('fetchmany', 1), ('fetchmany', 0)]
+        pf = pq.ParquetFile(output)
+        assert pf.metadata.num_row_groups == 2
+        assert pf.metadata.row_group(0).column(0).compression == 'ZSTD'
+
+        schema = pf.schema_arrow
+        assert schema.field('id').type == pa.int32()
+        assert schema.field('name').type == pa.string()
+        assert schema.field('amount').type == pa.decimal128(10, 2)
+        assert schema.field('ratio').type == pa.float64()
+        assert schema.field('ts').type == pa.timestamp('us')
+        assert schema.field('flag').type == pa.bool_()
+        assert schema.field('geom').type == pa.binary()
+
+        table = pf.read().to_pydict()
+        assert table['id'] == [1, 2, 3]
+        assert table['name'] == ['a', None, 'c']
+        assert table['amount'] == [decimal.Decimal('1.50'), None, decimal.Decimal('-2.25')]
+        assert table['ratio'] == [3.14159, 2.0, None]
+        assert table['flag'] == [True, None, False]
+
+    def test_query_to_parquet_geometry(self, tmp_path):
+        shapely = pytest.importorskip('shapely')
+        output = os.path.join(str(tmp_path), 'out.parquet')
+
+        dbo = FakeDbConnect(rows=ROWS, description=DESCRIPTION, responses=RESPONSES)
+        qry = Query(dbo, 'select * from t', timeme=False, iterate=True, no_comment=True, temp=False)
+        qry.iterable_query_to_parquet(output)
+
+        # Plain WKB (no SRID) with GeoParquet metadata
+        pf = pq.ParquetFile(output)
+        geo = json.loads(pf.schema_arrow.metadata[b'geo'])
+        assert geo['primary_column'] == 'geom'
+        assert geo['columns']['geom']['encoding'] == 'WKB'
+
+        geoms = pf.read().column('geom').to_pylist()
+        assert shapely.from_wkb(geoms[0]).wkt == 'POINT (1 2)'
+        assert shapely.get_srid(shapely.from_wkb(geoms[0])) == 0
+        assert geoms[1] is None
+
+    def test_query_to_parquet_empty(self, tmp_path):
+        output = os.path.join(str(tmp_path), 'out.parquet')
+
+        dbo = FakeDbConnect(rows=[], description=DESCRIPTION, responses=RESPONSES)
+        qry = Query(dbo, 'select * from t', timeme=False, iterate=True, no_comment=True, temp=False)
+        assert qry.iterable_query_to_parquet(output) == 0
+
+        # Schema is still written
+        table = pq.read_table(output)
+        assert table.num_rows == 0
+        assert table.column_names == [desc[0] for desc in DESCRIPTION]
@@ -429,6 +429,27 @@ class TestQueryToShpPg:
         assert Failed
         assert not os.path.isfile(os.path.join(fldr, shp + '.dbf'))
 
+    def test_query_to_shp_describe(self):
+        db.query("""
+            DROP TABLE IF EXISTS {s}.{t};
+            CREATE TABLE {s}.{t} (id int, dte timestamp, dtz timestamptz, geom geometry(Point));
+            INSERT INTO {s}.{t} VALUES (1, now(), now(), st_setsrid(st_makepoint(1015329.1, 213793.1), 2263));
+        """.format(s=pg_schmma, t=test_table))
+
+        # Columns and types come from the query's metadata; no rows are read and no temp table is made
+        assert db._describe_query("select * from {}.{}".format(pg_schmma, test_table)) == [
+            ('id', 'integer'), ('dte', 'timestamp without time zone'), ('dtz', 'timestamp with time zone'),
+            ('geom', 'geometry')]
+
+        # Declared types of table columns keep their modifiers; expressions don't have one
+        assert db._describe_query("select geom, st_buffer(geom, 1) as buffered from {}.{}".format(
+            pg_schmma, test_table), declared=True) == [('geom', 'geometry(Point)'), ('buffered', 'geometry')]
+        assert db.dfquery("""
+            select * from information_schema.tables where table_name like 'tmp_query_to_shp%'
+        """).empty
+
+        db.drop_table(schema=pg_schmma, table=test_table)
+
 
 class TestQueryToShpMs:
     # @classmethod
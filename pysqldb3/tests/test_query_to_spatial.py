@@ -0,0 +1,109 @@
+import datetime
+import decimal
+import os
+
+import pytest
+
+from .helpers import FakeDbConnect
+from ..query import Query
+from ..util import MS
+
+pytest.importorskip('pyarrow')
+pyogrio = pytest.importorskip('pyogrio')
+shapely = pytest.importorskip('shapely')
+
+GEOMETRY_OID = 90001
+
+# POINT (1 2) with SRID 2263, as PostGIS returns it
+EWKB_POINT = '0101000020D7080000000000000000F03F0000000000000040'
+
+ROWS = [
+    (1, 'a', decimal.Decimal('1.50'), datetime.datetime(2020, 1, 1, 5, 6, 7), EWKB_POINT),
+    (2, None, None, None, None),
+    (3, 'c', decimal.Decimal('-2.25'), datetime.datetime(2020, 1, 3), EWKB_POINT),
+]
+
+# name, type_code, display_size, internal_size, precision, scale, null_ok
+DESCRIPTION = [('id', 23, None, 4, None, None, None), ('name', 1043, None, -1, None, None, None),
+               ('amount', 1700, None, -1, 10, 2, None), ('ts', 1114, None, 8, None, None, None),
+               ('geom', GEOMETRY_OID, None, -1, None, None, None)]
+
+# The pg_type lookup finds the geometry type oid
+RESPONSES = {'pg_type': [(GEOMETRY_OID,)]}
+
+
+class TestQueryToSpatial:
+    def test_query_to_spatial_gpkg(self, tmp_path):
+        dbo = FakeDbConnect(rows=ROWS, description=DESCRIPTION, responses=RESPONSES)
+        output = os.path.join(str(tmp_path), 'out.gpkg')
+
+        qry = Query(dbo, 'select * from t', timeme=False, iterate=True, no_comment=True, temp=False)
+        assert qry.iterable_query_to_spatial(output, geometry_type='Point', batch_size=2) == 3
+
+        # The geometry type lookup, then a batch at a time
+        assert dbo.conn.fetches == [('fetchall', 1), ('fetchmany', 2), ('fetchmany', 1), ('fetchmany', 0)]
+
+        info = pyogrio.read_info(output)
+        assert info['geometry_type'] == 'Point'
+        assert info['crs'] == 'EPSG:2263'
+        assert list(info['fields']) == ['id', 'name', 'amount', 'ts']
+
+        _, _, geometry, field_data = pyogrio.raw.read(output)
+        assert [None if g is None else shapely.from_wkb(g).wkt for g in geometry] == [
+            'POINT (1 2)', None, 'POINT (1 2)']
+        assert list(field_data[0]) == [1, 2, 3]
+        assert list(field_data[2][[0, 2]]) == [1.5, -2.25]
+
+    @pytest.mark.parametrize('extension, driver', [('shp', 'ESRI Shapefile'), ('fgb', 'FlatGeobuf')])
+    def test_query_to_spatial_drivers(self, tmp_path, extension, driver):
+        output = os.path.join(str(tmp_path), 'out.' + extension)
+
+        dbo = FakeDbConnect(rows=ROWS, description=DESCRIPTION, responses=RESPONSES)
+        qry = Query(dbo, 'select * from t', timeme=False, iterate=True, no_comment=True, temp=False)
+        qry.iterable_query_to_spatial(output)
+
+        info = pyogrio.read_info(output)
+        assert info['driver'] == driver
+        assert info['features'] == 3
+
+    def test_query_to_spatial_wkb_column(self, tmp_path):
+        # MS geometry converted with .STAsBinary(): WKB bytes in a column that isn't typed as geometry
+        polygon = shapely.to_wkb(shapely.box(0, 0, 1, 1))
+        multi = shapely.to_wkb(shapely.multipolygons([shapely.box(0, 0, 1, 1), shapely.box(2, 2, 3, 3)]))
+        description = [('id', int, None, 10, 10, 0, True), ('shape', bytes, None, 0, 0, 0, True)]
+        dbo = FakeDbConnect(rows=[(1, polygon), (2, memoryview(multi))], description=description, db_type=MS)
+        output = os.path.join(str(tmp_path), 'out.gpkg')
+
+        qry = Query(dbo, 'select * from t', timeme=False, iterate=True, no_comment=True, temp=False)
+        qry.iterable_query_to_spatial(output, geometry_column='shape', srid=4326)
+
+        # No declared type: the layer takes any geometry, whatever the first batch has
+        info = pyogrio.read_info(output)
+        assert info['geometry_type'] == 'Unknown'
+        assert info['crs'] == 'EPSG:4326'
+
+        geometry = pyogrio.raw.read(output)[2]
+        assert [shapely.from_wkb(g).geom_type for g in geometry] == ['Polygon', 'MultiPolygon']
+
+    def test_query_to_spatial_shp_multi(self, tmp_path):
+        # A point first and multipoints later; a shapefile has one shape type, so all are written as multipoints
+        rows = [(1, shapely.to_wkb(shapely.points(1, 2), hex=True)), (2, None),
+                (3, shapely.to_wkb(shapely.multipoints([[1, 2], [3, 4]]), hex=True))]
+        description = [('id', 23, None, 4, None, None, None), ('geom', GEOMETRY_OID, None, -1, None, None, None)]
+        output = os.path.join(str(tmp_path), 'out.shp')
+
+        dbo = FakeDbConnect(rows=rows, description=description, responses=RESPONSES)
+        qry = Query(dbo, 'select * from t', timeme=False, iterate=True, no_comment=True, temp=False)
+        qry.iterable_query_to_spatial(output, batch_size=1)
+
+        assert pyogrio.read_info(output)['geometry_type'] == 'MultiPoint'
+        geometry = pyogrio.raw.read(output)[2]
+        assert [None if g is None else shapely.from_wkb(g).wkt for g in geometry] == [
+            'MULTIPOINT ((1 2))', None, 'MULTIPOINT ((1 2), (3 4))']
+
+    def test_query_to_spatial_unknown_driver(self, tmp_path):
+        dbo = FakeDbConnect(rows=ROWS, description=DESCRIPTION, responses=RESPONSES)
+        qry = Query(dbo, 'select * from t', timeme=False, iterate=True, no_comment=True, temp=False)
+
+        with pytest.raises(ValueError):
+            qry.iterable_query_to_spatial(os.path.join(str(tmp_path), 'out.xyz'))
@@ -0,0 +1,68 @@
+import datetime
+import os
+import struct
+
+import pytest
+
+from .helpers import FakeDbConnect, read_binary_copy
+from ..shapefile import Shapefile
+
+pa = pytest.importorskip('pyarrow')
+pytest.importorskip('pyogrio')
+shapely = pytest.importorskip('shapely')
+
+from pyogrio.raw import write_arrow
+
+
+@pytest.fixture
+def shp(tmp_path):
+    table = pa.table({
+        'ID': pa.array([1, 2, 3], pa.int32()),
+        'Name Field': ['a', 'café', None],
+        'dte': pa.array([datetime.date(2000, 1, 2), None, datetime.date(1999, 12, 31)], pa.date32()),
+        'geom': shapely.to_wkb([shapely.box(0, 0, 1, 1),
+                                shapely.multipolygons([shapely.box(0, 0, 1, 1), shapely.box(2, 2, 3, 3)]), None])
+    })
+    write_arrow(table, os.path.join(str(tmp_path), 'test.shp'), geometry_name='geom', geometry_type='Polygon',
+                crs='EPSG:2263')
+    return Shapefile(dbo=FakeDbConnect(default_schema='working'), path=str(tmp_path), shp_name='test.shp', srid=2263,
+                     gdal_data_loc='gdal-data')
+
+
+class TestReadNative:
+    def test_read_native_shp(self, shp):
+        dbo = shp.dbo
+        rows = shp.read_native(batch_size=2)
+
+        assert rows == 3
+        assert len(dbo.copies) == 2
+
+        # Table made with geom (multi) from the start; spatial index after the load
+        assert dbo.queries[0] == ('create table working."test" (ogc_fid serial primary key, "id" integer, '
+                                  '"name_field" varchar, "dte" date, geom geometry(MultiPolygon, 2263))')
+        assert dbo.copies[0][0] == ('COPY working."test" ("id", "name_field", "dte", "geom") '
+                                    'FROM STDIN WITH (FORMAT binary)')
+        assert dbo.queries[1] == ('create index test_geom_idx on working."test" using gist (geom); '
+                                  'analyze working."test";')
+        assert dbo.queries[-1] == 'grant select on working."test" to public;'
+
+    def test_read_native_values(self, shp):
+        dbo = shp.dbo
+
+        shp.read_native(private=True)
+        rows = read_binary_copy(dbo.copies[0][1])
+
+        assert [struct.unpack('>i', r[0])[0] for r in rows] == [1, 2, 3]
+        assert [r[1] for r in rows] == [b'a', 'café'.encode('utf-8'), None]
+
+        # Days from 2000-01-01
+        assert struct.unpack('>i', rows[0][2])[0] == 1
+        assert struct.unpack('>i', rows[2][2])[0] == -1
+
+        # EWKB with the SRID; polygons promoted to multipolygons
+        geoms = [shapely.from_wkb(r[3]) for r in rows[:2]]
+        assert [g.geom_type for g in geoms] == ['MultiPolygon', 'MultiPolygon']
+        assert shapely.get_srid(geoms[0]) == 2263
+        assert rows[2][3] is None
+
+        assert not any(q.startswith('grant') for q in dbo.queries)
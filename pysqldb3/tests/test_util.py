@@ -1,6 +1,16 @@
+import bz2
+import datetime
+import gzip
+import io
+import os
+
+import numpy as np
 import pandas as pd
+import pytest
 
-from ..util import convert_geom_col, parse_table_string
+from ..util import BackgroundWriter, FileRange, conform_to_schema, convert_geom_col, csv_byte_ranges, \
+    dataframe_rows, declared_geometry_type, is_single_select, max_string_lengths, numbered_placeholders, \
+    open_text_output, parse_table_string, pg_binary_column, pg_binary_copy, varchar_type
 
 
 class TestStringParser:
@@ -144,3 +154,170 @@ class TestUtil:
         converted_df = convert_geom_col(df)
         assert converted_df.iloc[0][
                    "geom"]== "MULTIPOLYGON (((982616.6246337891 198679.9625854492, 982660.08203125 198669.5866088867, 982680.0684204102 198670.9069824219, 982782.9066162109 198677.7001953125, 982806.4891967773 198673.7631835938, 982829.225402832 198664.7670288086, 982849.5369873047 198651.1516113281, 982866.1610107422 198633.9697875977, 983021.4133911133 198499.9248046875, 983071.0751953125 198454.8461914062, 983165.7305908203 198376.673828125, 983181.8756103516 198364.7612304688, 983247.9219970703 198316.0310058594, 983265.7139892578 198303.2125854492, 983298.5189819336 198269.2001953125, 983312.7905883789 198249.6530151367, 983374.94921875 198193.8395996094, 983395.5758056641 198176.1002197266, 983665.1553955078 197909.9949951172, 983788.4852294922 197774.7712402344, 984011.5391845703 197508.1453857422, 984115.9401855469 197347.8084106445, 984213.6550292969 197188.3790283203, 984229.1654052734 197164.3214111328, 984240.6306152344 197149.5897827148, 984261.4180297852 197106.374206543, 984278.9044189453 197080.7088012695, 984282.4462280273 197083.0214233398, 984358.2708129883 197132.5294189453, 984360.20703125 197129.6641845703, 984368.8024291992 197116.9454345703, 984374.4255981445 197108.6220092773, 984377.9788208008 197108.3004150391, 984391.2236328125 197118.6384277344, 984385.265625 197128.424987793, 984382.1782226563 197133.4971923828, 984399.6224365234 197145.774230957, 984410.4459838867 197154.0122070312, 984421.2694091797 197162.2504272461, 984436.774597168 197176.1416015625, 985070.9658203125 196514.1310424805, 985030.6982421875 196477.4346313477, 984061.6229858398 195594.3049926758, 983903.8356323242 195400.4276123047, 983486.4639892578 194887.592590332, 982927.0477905273 194200.2239990234, 982534.6724243164 193790.7208251953, 982237.1456298828 193480.2064208984, 981770.6950073242 192582.9462280273, 981515.364440918 192091.7946166992, 981074.2158203125 191219.3392333984, 981066.0314331055 191203.1096191406, 981014.9285888672 191101.7728271484, 980969.2861938477 191011.2644042969, 981008.5933837891 189908.0128173828, 979564.5368041992 188810.5765991211, 978328.7186279297 188115.967590332, 977971.4100341797 188196.5106201172, 977853.108215332 188064.6534423828, 977791.9638061523 188106.0158081055, 977872.3342285156 188218.8436279297, 976912.3674316406 188435.2344360352, 974661.4465942383 188793.4025878906, 971312.3619995117 189709.4916381836, 970357.3693847656 191098.0862426758, 971922.9838256836 193996.7756347656, 972473.4891967773 195048.6718139648, 977064.5093994141 194895.257019043, 977219.1777954102 196031.5474243164, 977317.5665893555 196754.3837890625, 977485.8837890625 198057.4478149414, 977620.4661865234 199099.3461914062, 977696.8306274414 199589.9180297852, 977822.8884277344 200399.724609375, 977979.307434082 201404.573425293, 978247.7615966797 203129.1478271484, 978237.5222167969 203585.6724243164, 978286.957824707 204319.9786376953, 978289.2969970703 204347.0390014648, 978294.4904174805 204377.0355834961, 978302.3056030273 204416.7969970703, 978493.7618408203 205390.8656005859, 980309.0106201172 205061.9423828125, 981119.2348022461 204938.4725952148, 981291.9711914063 204912.1494140625, 981327.5126342773 204907.5660400391, 981658.6567993164 204866.526184082, 981868.4365844727 204840.1712036133, 982284.8696289063 204788.0256347656, 982777.2471923828 204726.8710327148, 983383.1251831055 204650.0798339844, 983469.1583862305 204638.9020385742, 983496.0895996094 204624.2136230469, 983522.7247924805 204608.1193847656, 983654.3975830078 204519.4827880859, 983864.6466064453 204382.7214355469, 984074.7216186523 204246.681640625, 984273.3397827148 204118.4732055664, 984494.3958129883 203975.5108032227, 984704.2313842773 203838.9462280273, 984912.3904418945 203704.0284423828, 985144.7882080078 203570.9841918945, 985125.0540161133 203540.3411865234, 984863.9291992188 203134.8532104492, 984579.3728027344 202692.7377929688, 984382.5982055664 202387.4038085938, 984290.6625976563 202244.7465820312, 984066.8508300781 201897.9067993164, 983855.1287841797 201569.065612793, 983727.7374267578 201372.4650268555, 983670.2014160156 201283.5051879883, 983546.4614257813 201091.6848144531, 983405.8154296875 200872.7022094727, 983270.7764282227 200662.7124023438, 983133.9426269531 200451.9846191406, 983086.2031860352 200378.9138183594, 982993.2540283203 200236.6340332031, 982870.541015625 200047.1986083984, 982747.6243896484 199856.3394165039, 982617.5920410156 199652.7703857422, 982500.8140258789 199466.4385986328, 982914.1628417969 199214.7233886719, 983124.7366333008 199090.7636108398, 983081.7512207031 199034.6416015625, 983060.3798217773 199008.0767822266, 982974.0260009766 198916.8872070312, 982903.3098144531 198842.2109985352, 982867.4110107422 198813.9104003906, 982828.6086425781 198789.107421875, 982787.440612793 198768.2216186523, 982744.5078125 198751.5582275391, 982736.8229980469 198749.4199829102, 982700.4689941406 198739.3043823242, 982658.5728149414 198709.6882324219, 982616.6246337891 198679.9625854492)))"
+
+    def test_wkt_nulls(self):
+        pytest.importorskip('shapely')
+        point = '0101000000000000000000F03F0000000000000040'
+        df = pd.DataFrame({'id': range(5), 'geom': [point, None, '', np.nan, bytes.fromhex(point)]})
+
+        # Nulls and empty strings become None; hex and bytes WKB are both read
+        assert list(convert_geom_col(df)['geom']) == ['POINT (1 2)', None, None, None, 'POINT (1 2)']
+
+    def test_wkt_missing_column(self):
+        df = pd.DataFrame({'id': [1]})
+        assert convert_geom_col(df).equals(pd.DataFrame({'id': [1]}))
+
+    def test_numbered_placeholders(self):
+        assert numbered_placeholders("select %s, '100%%' where a = %s") == ("select $1, '100%' where a = $2", 2)
+        assert numbered_placeholders('select 1') == ('select 1', 0)
+
+    def test_is_single_select(self):
+        assert is_single_select('select 1')
+        assert is_single_select('-- comment; here\nWITH a AS (select 1) SELECT * FROM a;')
+        assert is_single_select('select update_date from t')
+
+        assert not is_single_select('create table t as select 1')
+        assert not is_single_select('select 1; select 2')
+        assert not is_single_select('select * into t from s')
+        assert not is_single_select('with d as (delete from t returning *) select * from d')
+
+    def test_dataframe_rows(self):
+        df = pd.DataFrame({'i': [1, 2], 'f': [1.5, np.nan], 'b': [True, False], 's': ['x', None], 'o': [3, 'y'],
+                           'd': pd.to_datetime(['2020-01-01 10:30', None])})
+
+        rows = dataframe_rows(df)
+        assert rows == [(1, 1.5, True, 'x', '3', datetime.datetime(2020, 1, 1, 10, 30)),
+                        (2, None, False, None, 'y', None)]
+        assert [type(v) for v in rows[0][:3]] == [int, float, bool]
+
+    def test_max_string_lengths(self):
+        lengths = max_string_lengths(pd.DataFrame({'a': ['x', 'xyz', None], 'b': [1, 2, 3], 'c': [None, None, None]}))
+        assert lengths == {'a': 3, 'c': 0}
+
+        # Accumulates over chunks
+        lengths = max_string_lengths(pd.DataFrame({'a': ['x' * 600, None, 'y'], 'c': ['ab', None, None]}), lengths)
+        assert lengths == {'a': 600, 'c': 2}
+
+    def test_conform_to_schema(self):
+        table_schema = [['i', 'integer'], ['f', 'float'], ['d', 'timestamp'], ['s', 'varchar (500)']]
+
+        # A later chunk with blanks in the integer column is still written as integers
+        chunk = pd.DataFrame({'i': [None, 2], 'f': [None, 1], 'd': [None, datetime.datetime(2020, 1, 1)],
+                              's': [1, None]}, dtype=object)
+        conformed, widened = conform_to_schema(chunk, table_schema, 'PG')
+        assert widened == []
+        assert str(conformed['i'].dtype) == 'Int64'
+        assert conformed.to_csv(index=False, header=False, na_rep='\\N') == \
+            '\\N,\\N,\\N,1\n2,1.0,2020-01-01,\\N\n'
+
+        # Values that don't fit widen the column, unless it was a user override
+        chunk = pd.DataFrame({'i': [1.5, 2], 'f': ['x', 1], 'd': ['soon', None], 's': ['y' * 600, None]})
+        conformed, widened = conform_to_schema(chunk, table_schema, 'PG', fixed=['d'])
+        assert widened == [('i', 'float'), ('f', 'varchar (500)'), ('s', 'varchar (600)')]
+        assert table_schema == [['i', 'float'], ['f', 'varchar (500)'], ['d', 'timestamp'], ['s', 'varchar (600)']]
+        assert conformed['i'].tolist() == [1.5, 2.0]
+
+        conformed, widened = conform_to_schema(pd.DataFrame({'i': [2 ** 40]}), [['i', 'int']], 'MS')
+        assert widened == [('i', 'bigint')]
+        assert str(conformed['i'].dtype) == 'Int64'
+
+    def test_declared_geometry_type(self):
+        assert declared_geometry_type('geometry(MultiPolygon,2263)') == 'MultiPolygon'
+        assert declared_geometry_type('geometry(PointZ,2263)') == 'Point Z'
+        assert declared_geometry_type('geography(LineString,4326)') == 'LineString'
+
+        # Not limited to one type
+        assert declared_geometry_type('geometry') is None
+        assert declared_geometry_type('geometry(Geometry,2263)') is None
+        assert declared_geometry_type('geometry(PointM)') is None
+
+    def test_varchar_type(self):
+        assert varchar_type(600, 'PG') == 'varchar (600)'
+        assert varchar_type(0, 'MS') == 'varchar (1)'
+        assert varchar_type(9000, 'MS') == 'varchar (max)'
+        assert varchar_type(70000, 'PG') == 'text'
+
+    def test_csv_byte_ranges(self):
+        fp = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_data', 'byte_ranges.csv')
+
+        # Quoted newlines, commas and escaped quotes must not be split
+        df = pd.DataFrame({'id': range(2000), 'text': ['a "quoted"\nvalue, with a newline', 'plain', '', 'x\n'] * 500})
+        df.to_csv(fp, index=False)
+
+        for parts, block_size in [(1, 2 ** 24), (4, 2 ** 24), (7, 100), (16, 37)]:
+            ranges = csv_byte_ranges(fp, parts, block_size=block_size)
+            assert len(ranges) == parts
+            assert ranges[-1][1] == os.path.getsize(fp)
+
+            chunks = list()
+            for start, end in ranges:
+                with FileRange(fp, start, end) as f:
+                    chunks.append(pd.read_csv(io.BytesIO(f.read()), header=None, names=['id', 'text'],
+                                              keep_default_na=False))
+
+            pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True),
+                                          pd.read_csv(fp, keep_default_na=False))
+
+        os.remove(fp)
+
+    def test_pg_binary_column(self):
+        pa = pytest.importorskip('pyarrow')
+
+        typ, encode = pg_binary_column(pa.int64())
+        assert typ == 'bigint'
+        assert encode([7, None]) == [b'\x00\x00\x00\x08' + (7).to_bytes(8, 'big'), b'\xff\xff\xff\xff']
+
+        # Microseconds from 2000-01-01 (UTC for time zone aware timestamps)
+        typ, encode = pg_binary_column(pa.timestamp('us', tz='UTC'))
+        assert typ == 'timestamptz'
+        assert encode([datetime.datetime(2000, 1, 1, 0, 0, 1, tzinfo=datetime.timezone.utc)]) == [
+            b'\x00\x00\x00\x08' + (1000000).to_bytes(8, 'big')]
+
+        typ, encode = pg_binary_column(pa.string(), 'latin-1')
+        assert typ == 'varchar'
+        assert encode(['é']) == [b'\x00\x00\x00\x01\xe9']
+
+        assert pg_binary_column(pa.decimal128(10, 2))[0] == 'varchar'
+
+    def test_pg_binary_copy(self):
+        data = pg_binary_copy([[b'\x00\x00\x00\x01a', b'\xff\xff\xff\xff']], 2)
+        assert data == b'PGCOPY\n\xff\r\n\x00' + bytes(8) + b'\x00\x01\x00\x00\x00\x01a\x00\x01\xff\xff\xff\xff\xff\xff'
+
+    def test_open_text_output(self, tmp_path):
+        text = 'id,name\r\n' + ''.join('{},é {}\n'.format(i, i) for i in range(50000))
+        readers = {None: open, 'gzip': gzip.open, 'bz2': bz2.open}
+
+        for compression, reader in readers.items():
+            for threaded in (False, True):
+                fp = os.path.join(str(tmp_path), 'out_{}_{}'.format(compression, threaded))
+                with open_text_output(fp, compression, threaded) as f:
+                    f.write(text)
+
+                # Written as utf8, newlines untranslated
+                with reader(fp, 'rb') as f:
+                    assert f.read().decode('utf8') == text
+
+        with pytest.raises(ValueError):
+            open_text_output(os.path.join(str(tmp_path), 'out'), 'zip')
+
+    def test_open_text_output_zstd(self, tmp_path):
+        zstandard = pytest.importorskip('zstandard')
+        fp = os.path.join(str(tmp_path), 'out.zst')
+
+        with open_text_output(fp, 'zstd', True) as f:
+            f.write('a,b\n1,2\n')
+
+        with zstandard.open(fp, 'rb') as f:
+            assert f.read() == b'a,b\n1,2\n'
+
+    def test_background_writer_error(self):
+        class FailingFile(io.BytesIO):
+            def write(self, b):
+                raise OSError('disk full')
+
+        writer = BackgroundWriter(FailingFile())
+        writer.write(b'abc')
+
+        # Raised on close (or the next write) on the calling thread
+        with pytest.raises(OSError):
+            writer.close()
@@ -277,6 +277,61 @@ class TestBulkXLSToTablePG:
         db.drop_table(schema=db.default_schema, table=xls_table_name)
         # os.remove(fp_xlsx)  # TODO: this is failing and i have no idea why...
 
+    def test_xlsx_to_table_streaming(self):
+        fp = os.path.dirname(os.path.abspath(__file__)) + "\\test_data\\stream.xlsx"
+        db.query('drop table if exists working.{}'.format(xls_table_name))
+
+        # Second sheet is streamed in several chunks; no intermediate file is written
+        data = pd.DataFrame({'id': range(2500), 'name': ['a', None, "it's"] * 833 + ['b'],
+                             'value': [1.5, 2.5] * 1250})
+        with pd.ExcelWriter(fp) as writer:
+            pd.DataFrame({'other': [1]}).to_excel(writer, sheet_name='Sheet1', index=False)
+            data.to_excel(writer, sheet_name='Data', index=False)
+
+        files_before = set(os.listdir(os.path.dirname(fp)))
+        db.xls_to_table(input_file=fp, table=xls_table_name, schema='working', sheet_name='Data', chunk_size=1000)
+        assert set(os.listdir(os.path.dirname(fp))) == files_before
+
+        db_df = db.dfquery("select * from working.{} order by id".format(xls_table_name))
+        pd.testing.assert_frame_equal(db_df, data)
+
+        # Cleanup
+        db.drop_table(schema='working', table=xls_table_name)
+        os.remove(fp)
+
+    def test_xlsx_to_table_streaming_later_nulls(self):
+        fp = os.path.dirname(os.path.abspath(__file__)) + "\\test_data\\stream_nulls.xlsx"
+        db.query('drop table if exists working.{}'.format(xls_table_name))
+
+        # Blanks and text only after the first chunk; ids past the integer range in the last chunk
+        data = pd.DataFrame({'id': list(range(1, 2500)) + [2 ** 40],
+                             'cnt': [1] * 1000 + [None, 2] * 750,
+                             'code': [5] * 1000 + ['A1'] + [6] * 1499})
+        data.to_excel(fp, index=False)
+
+        db.xls_to_table(input_file=fp, table=xls_table_name, schema='working', chunk_size=1000)
+
+        pd.testing.assert_frame_equal(
+            pd.DataFrame([{"column_name": 'id', "data_type": 'bigint'},
+                          {"column_name": 'cnt', "data_type": 'integer'},
+                          {"column_name": 'code', "data_type": 'character varying'}]),
+            db.dfquery("""
+            select column_name, data_type
+            from information_schema.columns
+            where table_schema = 'working' and table_name = '{}'
+            order by ordinal_position
+            """.format(xls_table_name))
+        )
+
+        db_df = db.dfquery("select * from working.{} order by id".format(xls_table_name))
+        assert db_df['cnt'].isnull().sum() == 750
+        assert db_df['cnt'].dropna().tolist() == [1] * 1000 + [2] * 750
+        assert db_df['code'].tolist()[999:1002] == ['5', 'A1', '6']
+
+        # Cleanup
+        db.drop_table(schema='working', table=xls_table_name)
+        os.remove(fp)
+
     def test_bulk_xls_to_table_input_schema(self):
         # Test input schema
         return
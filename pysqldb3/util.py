@@ -1,25 +1,28 @@
+import bz2
 import datetime
 import decimal
+import gzip
+import io
+import itertools
+import queue
 import re
 import os
-import configparser
+import struct
+import threading
 
 import numpy as np
 import pandas as pd
-from shapely import wkb
-from .Config import write_config
-write_config(confi_path=os.path.dirname(os.path.abspath(__file__)) + "\\config.cfg")
-
-config = configparser.ConfigParser()
-config.read(os.path.dirname(os.path.abspath(__file__)) + "\\config.cfg")
+from .Config import get_config
 
 POSTGRES_TYPES = ['PG', 'POSTGRESQL', 'POSTGRES']
 SQL_SERVER_TYPES = ['MS', 'SQL', 'MSSQL', 'SQLSERVER']
 TEMP_LOG_TABLE = '__temp_log_table_{}__'
 
-GDAL_DATA_LOC = config.get('GDAL DATA', 'GDAL_DATA_LOC')
-
-os.environ['GDAL_DATA'] = GDAL_DATA_LOC
+EAGER_CLEANUP = 'eager'
+BACKGROUND_CLEANUP = 'background'
+PERIODIC_CLEANUP = 'periodic'
+OFF_CLEANUP = 'off'
+CLEANUP_POLICIES = [EAGER_CLEANUP, BACKGROUND_CLEANUP, PERIODIC_CLEANUP, OFF_CLEANUP]
 
 UNICODE_REPLACEMENTS = {
     u'\xc4': 'A'
@@ -32,6 +35,63 @@ VARCHAR_MAX = {
     PG: 65535
 }
 
+# Output compression: file extension added to default output names
+COMPRESSION_EXTENSIONS = {
+    'gzip': '.gz',
+    'bz2': '.bz2',
+    'zstd': '.zst'
+}
+
+# In-process spatial exports: OGR driver by file extension
+SPATIAL_DRIVERS = {
+    '.shp': 'ESRI Shapefile',
+    '.gpkg': 'GPKG',
+    '.fgb': 'FlatGeobuf'
+}
+
+# OGR layer geometry types by (lowercase) PostGIS type modifier
+OGR_GEOMETRY_TYPES = {
+    'point': 'Point',
+    'linestring': 'LineString',
+    'polygon': 'Polygon',
+    'multipoint': 'MultiPoint',
+    'multilinestring': 'MultiLineString',
+    'multipolygon': 'MultiPolygon',
+    'geometrycollection': 'GeometryCollection'
+}
+
+# PG binary COPY framing: signature, flags and header extension length; a field count of -1 ends the data
+PG_COPY_BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PG_COPY_BINARY_TRAILER = struct.pack('>h', -1)
+PG_EPOCH = datetime.datetime(2000, 1, 1)
+
+# Integer column types and their (exclusive) absolute limits, for conforming chunks to a table
+INTEGER_LIMITS = {
+    'smallint': 2 ** 15,
+    'int': 2 ** 31,
+    'integer': 2 ** 31,
+    'bigint': 2 ** 63
+}
+FLOAT_TYPES = ('float', 'double', 'real', 'numeric', 'decimal')
+TIMESTAMP_TYPES = ('timestamp', 'datetime')
+
+
+def get_gdal_data_loc():
+    """
+    Gets the GDAL data location from the config (read on first use, not on import) and sets GDAL_DATA for ogr2ogr
+    :return: GDAL data location
+    """
+    gdal_data_loc = get_config().get('GDAL DATA', 'GDAL_DATA_LOC')
+    os.environ['GDAL_DATA'] = gdal_data_loc
+    return gdal_data_loc
+
+
+def __getattr__(name):
+    # GDAL_DATA_LOC is kept as a lazy module attribute for backwards compatibility (util.GDAL_DATA_LOC)
+    if name == 'GDAL_DATA_LOC':
+        return get_gdal_data_loc()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
 
 def clean_query_special_characters(query_string):
     # type(str) -> str
@@ -46,6 +106,42 @@ def clean_query_special_characters(query_string):
     return query_string
 
 
+def numbered_placeholders(query_string):
+    # type(str) -> (str, int)
+    """
+    Converts psycopg2 %s placeholders to the $1, $2... placeholders used by PREPARE (and asyncpg)
+    :param query_string: query string with %s placeholders (and %% for literal %)
+    :return: converted query string, number of placeholders
+    """
+    count = [0]
+
+    def replace(match):
+        if match.group(0) == '%%':
+            return '%'
+        count[0] += 1
+        return '${}'.format(count[0])
+
+    query_string = re.sub(r'%%|%s', replace, query_string)
+    return query_string, count[0]
+
+
+def is_single_select(query_string):
+    # type(str) -> bool
+    """
+    Checks if a query is one read-only SELECT (or WITH/VALUES/TABLE) statement, the only kind a PG server-side cursor
+    can run. Comments are ignored; anything unsure (ex. a ; inside a string, select ... into) is treated as not a
+    single select.
+    :param query_string: query string
+    :return: bool
+    """
+    query = re.sub(r'/\*.*?\*/|--[^\n]*', ' ', query_string, flags=re.S).strip().rstrip(';').strip().lower()
+
+    if ';' in query or not re.match(r'(select|with|values|table)\b', query):
+        return False
+
+    return not re.search(r'\b(into|insert|update|delete|merge)\b', query)
+
+
 def clean_geom_column(db, table, schema):
     """
     Checks for column named wkb_geometry and renames to geom
@@ -211,6 +307,132 @@ def type_decoder(typ, varchar_length=500):
         return 'varchar ({})'.format(varchar_length)
 
 
+def declared_geometry_type(column_type):
+    """
+    OGR layer geometry type from a declared PostGIS column type, ex. geometry(MultiPolygon,2263) -> MultiPolygon and
+    geometry(PointZ) -> Point Z
+    :param column_type: column type with its modifier (from _describe_query)
+    :return: geometry type; None if the column is not limited to one type (geometry, measured types)
+    """
+    match = re.match(r'(?:geometry|geography)\(([a-z]+?)(zm|z|m)?(?:,\d+)?\)$', column_type.lower().replace(' ', ''))
+
+    if not match or match.group(1) not in OGR_GEOMETRY_TYPES or match.group(2) in ('m', 'zm'):
+        return None
+
+    return OGR_GEOMETRY_TYPES[match.group(1)] + (' Z' if match.group(2) else '')
+
+
+def varchar_type(length, db_type):
+    """
+    Varchar type sized to a string length; lengths past VARCHAR_MAX are unlimited (text/varchar (max))
+    :param length: maximum string length
+    :param db_type: PG or MS
+    :return: String representing data type
+    """
+    if length > VARCHAR_MAX[db_type]:
+        return 'text' if db_type == PG else 'varchar (max)'
+
+    return 'varchar ({})'.format(max(int(length), 1))
+
+
+def conform_series(series, column_type, db_type):
+    """
+    Casts one column of a chunk to a table column type: integers to nullable Int64, floats to float64 and timestamps
+    to datetime64. Other types are left as they are.
+    :param series: Pandas Series
+    :param column_type: table column type (from dataframe_to_table_schema)
+    :param db_type: PG or MS
+    :return: (cast Series, wider column type needed for the values or None)
+    """
+    typ = column_type.lower().replace(' ', '')
+    values = series.dropna()
+
+    if typ in INTEGER_LIMITS or typ.startswith(FLOAT_TYPES):
+        numbers = pd.to_numeric(series, errors='coerce')
+    elif typ.startswith(TIMESTAMP_TYPES):
+        dates = values.map(lambda v: isinstance(v, (datetime.date, np.datetime64)))
+        numbers = pd.to_datetime(series, errors='coerce') if dates.all() else None
+    else:
+        numbers = series
+
+    # Values that don't parse as the column type need text
+    if numbers is None or (numbers.isnull() & series.notnull()).any():
+        length = values.astype(str).str.len().max()
+        return series, varchar_type(max(500, 0 if pd.isnull(length) else int(length)), db_type)
+
+    if typ in INTEGER_LIMITS:
+        present = numbers.dropna()
+        if (present % 1 != 0).any():
+            return numbers, 'float'
+
+        if (present.abs() >= INTEGER_LIMITS[typ]).any():
+            return numbers, 'bigint' if (present.abs() < INTEGER_LIMITS['bigint']).all() else 'float'
+
+        return numbers.astype('Int64'), None
+
+    length = re.match(r'(n?varchar|charactervarying)\((\d+)\)$', typ)
+    if length and len(values):
+        longest = values.astype(str).str.len().max()
+        if longest > int(length.group(2)):
+            return series, varchar_type(longest, db_type)
+
+    return numbers, None
+
+
+def conform_to_schema(df, table_schema, db_type, fixed=None):
+    """
+    Casts a chunk to the column types of the table it is loaded into, so every chunk of a file is written the same
+    way (an integer column with blanks in a later chunk stays 1, not 1.0). Columns whose values don't fit are widened:
+    integers to bigint or float, numbers and timestamps to varchar and varchar to a longer varchar. table_schema is
+    updated in place.
+    :param df: Pandas DataFrame chunk; columns in table_schema order
+    :param table_schema: [[column, type], ...] (from dataframe_to_table_schema)
+    :param db_type: PG or MS
+    :param fixed: columns that are never widened (user type overrides)
+    :return: (conformed DataFrame, list of (column, type) widened by this chunk)
+    """
+    fixed = fixed or list()
+    columns = list()
+    widened = list()
+
+    for i, col in enumerate(table_schema):
+        series = df.iloc[:, i]
+
+        while True:
+            cast, wider = conform_series(series, col[1], db_type)
+            if not wider or col[0] in fixed:
+                break
+
+            col[1] = wider
+            widened.append((col[0], wider))
+
+        columns.append(cast)
+
+    conformed = pd.DataFrame(dict(enumerate(columns)), index=df.index)
+    conformed.columns = df.columns
+    return conformed, widened
+
+
+def max_string_lengths(df, lengths=None):
+    """
+    Maximum string length of each text (object) column, vectorized per column. Pass the result back in as lengths to
+    accumulate over chunks of a file.
+    :param df: Pandas DataFrame (or chunk)
+    :param lengths: dict of column name: length from previous chunks
+    :return: dict of column name: maximum length
+    """
+    lengths = dict() if lengths is None else lengths
+
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+
+        length = df[col].dropna().astype(str).str.len().max()
+        lengths[col] = max(lengths.get(col, 0), 0 if pd.isnull(length) else int(length))
+
+    return lengths
+
+
 def clean_cell(x):
     """
     Formats csv cells for SQL to add to database
@@ -255,6 +477,292 @@ def clean_cell(x):
         return "'" + x + "'"
 
 
+def dataframe_rows(df):
+    """
+    Converts a DataFrame into rows of python values for DBAPI executemany. Conversion is done a column at a time:
+    ints, floats and bools become python types, datetimes become (naive) datetime.datetime and all other columns
+    become str. Nulls (None, NaN, NaT, pd.NA) become None.
+
+    :param df: Pandas DataFrame
+    :return: list of row tuples
+    """
+    columns = list()
+
+    for col in df.columns:
+        series = df[col]
+        nulls = series.isnull().values
+
+        if pd.api.types.is_datetime64_any_dtype(series):
+            if series.dt.tz is not None:
+                series = series.dt.tz_localize(None)
+            values = np.array(series.dt.to_pydatetime(), dtype=object)
+        elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            values = series.astype(object).values.copy()
+        else:
+            values = series.astype(str).values.astype(object)
+
+        values[nulls] = None
+        columns.append(values)
+
+    return list(zip(*columns))
+
+
+def pg_binary_column(arrow_type, codec='utf-8'):
+    """
+    Maps an Arrow type to a PG column type and an encoder of values for binary COPY (ints, floats and bools as fixed
+    width big-endian, dates/timestamps/times as offsets from 2000-01-01, text in the client encoding). Types without a
+    mapping (ex. decimals, lists) are written as text.
+
+    :param arrow_type: pyarrow DataType
+    :param codec: python codec of the connection's client encoding
+    :return: (PG type, function taking a list of values and returning a list of length-prefixed binary fields)
+    """
+    import pyarrow as pa
+
+    null = struct.pack('>i', -1)
+
+    def fixed(fmt, convert=None):
+        field = struct.Struct('>i' + fmt)
+        return lambda values: [null if v is None else field.pack(field.size - 4, convert(v) if convert else v)
+                               for v in values]
+
+    def variable(to_bytes):
+        def encode(value):
+            data = to_bytes(value)
+            return struct.pack('>i', len(data)) + data
+        return lambda values: [null if v is None else encode(v) for v in values]
+
+    def timestamp(value):
+        if value.tzinfo is not None:
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        delta = value - PG_EPOCH
+        return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+    def time(value):
+        return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond
+
+    if pa.types.is_boolean(arrow_type):
+        return 'boolean', fixed('?')
+    if pa.types.is_int8(arrow_type) or pa.types.is_int16(arrow_type) or pa.types.is_uint8(arrow_type):
+        return 'smallint', fixed('h')
+    if pa.types.is_int32(arrow_type) or pa.types.is_uint16(arrow_type):
+        return 'integer', fixed('i')
+    if pa.types.is_int64(arrow_type) or pa.types.is_uint32(arrow_type):
+        return 'bigint', fixed('q')
+    if pa.types.is_float32(arrow_type):
+        return 'real', fixed('f')
+    if pa.types.is_float64(arrow_type):
+        return 'double precision', fixed('d')
+    if pa.types.is_date(arrow_type):
+        return 'date', fixed('i', lambda v: (v - PG_EPOCH.date()).days)
+    if pa.types.is_timestamp(arrow_type):
+        return 'timestamptz' if arrow_type.tz else 'timestamp', fixed('q', timestamp)
+    if pa.types.is_time(arrow_type):
+        return 'time', fixed('q', time)
+    if pa.types.is_binary(arrow_type) or pa.types.is_large_binary(arrow_type):
+        return 'bytea', variable(bytes)
+    return 'varchar', variable(lambda v: str(v).encode(codec))
+
+
+def pg_binary_copy(columns, rows):
+    """
+    Builds a PG binary COPY ... FROM STDIN stream from encoded columns
+
+    :param columns: lists of length-prefixed binary fields (from pg_binary_column encoders), one list per column
+    :param rows: number of rows
+    :return: bytes
+    """
+    count = struct.pack('>h', len(columns))
+    return PG_COPY_BINARY_HEADER + b''.join(itertools.chain.from_iterable(
+        zip(itertools.repeat(count, rows), *columns))) + PG_COPY_BINARY_TRAILER
+
+
+def csv_byte_ranges(input_file, parts, quotechar='"', block_size=2 ** 24):
+    """
+    Splits a csv file into about equal byte ranges that start and end on record boundaries, after the header row.
+    A newline only ends a record if it is outside of a quoted field: the count of quote characters before it must be
+    even (escaped quotes are doubled, so they do not change this).
+
+    :param input_file: csv file path
+    :param parts: number of ranges wanted
+    :param quotechar: csv quote character (defaults to ")
+    :param block_size: bytes read at a time while scanning (defaults to 16 MB)
+    :return: list of (start, end) byte offsets; fewer than parts if records are too long to split evenly
+    """
+    size = os.path.getsize(input_file)
+    quote = quotechar.encode('utf-8')
+
+    # The first target (0) finds the end of the header row
+    targets = [0] + [size * k // parts for k in range(1, parts)]
+    boundaries = list()
+    position = 0
+    quotes = 0
+
+    with open(input_file, 'rb') as f:
+        while len(boundaries) < len(targets):
+            block = f.read(block_size)
+            if not block:
+                break
+
+            while len(boundaries) < len(targets):
+                target = max(targets[len(boundaries)], boundaries[-1] if boundaries else 0)
+                i = block.find(b'\n', max(target - position, 0))
+
+                # Walk newlines from the target until one is outside quotes, counting quotes incrementally
+                block_quotes, counted_to = 0, 0
+                while i != -1:
+                    block_quotes += block.count(quote, counted_to, i)
+                    counted_to = i
+
+                    if (quotes + block_quotes) % 2 == 0:
+                        break
+
+                    i = block.find(b'\n', i + 1)
+
+                if i == -1:
+                    # Keep looking in the next block
+                    targets[len(boundaries)] = position + len(block)
+                    break
+
+                boundaries.append(position + i + 1)
+
+            quotes += block.count(quote)
+            position += len(block)
+
+    boundaries.append(size)
+    return [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+
+
+class FileRange:
+    """
+    Read-only file-like view of a byte range of a file (ex. for COPY ... FROM STDIN of part of a csv)
+    """
+
+    def __init__(self, input_file, start, end):
+        """
+        :param input_file: file path
+        :param start: first byte offset
+        :param end: byte offset the range stops before
+        """
+        self.remaining = end - start
+        self.file = open(input_file, 'rb')
+        self.file.seek(start)
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def readline(self, size=-1):
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+
+        data = self.file.readline(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class BackgroundWriter(io.RawIOBase):
+    """
+    Binary file-like object that hands each write to a background thread, which writes it to another file object
+    (ex. a compressor), so compression overlaps with producing the data. Errors on the thread are raised by the next
+    write or by close.
+    """
+
+    def __init__(self, file, max_blocks=16):
+        """
+        :param file: binary file object written to on the background thread; closed by close()
+        :param max_blocks: writes queued before write() waits for the thread
+        """
+        super().__init__()
+        self.file = file
+        self.error = None
+        self.blocks = queue.Queue(max_blocks)
+        self.thread = threading.Thread(target=self.__write_blocks, daemon=True)
+        self.thread.start()
+
+    def __write_blocks(self):
+        while True:
+            block = self.blocks.get()
+            if block is None:
+                return
+
+            # After an error, keep draining so write() never blocks
+            if self.error is None:
+                try:
+                    self.file.write(block)
+                except Exception as e:
+                    self.error = e
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        if self.error is not None:
+            raise self.error
+
+        block = bytes(b)
+        self.blocks.put(block)
+        return len(block)
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.blocks.put(None)
+        self.thread.join()
+
+        try:
+            self.file.close()
+        finally:
+            super().close()
+
+        if self.error is not None:
+            raise self.error
+
+
+def open_text_output(output, compression=None, threaded=False):
+    """
+    Opens a file for writing utf8 text (newline='', as for csv), optionally through a compressor. Everything written
+    goes through this one handle; nothing is reopened or appended.
+    :param output: file path
+    :param compression: None (default, plain text), 'gzip', 'bz2' or 'zstd' (requires zstandard)
+    :param threaded: if True, compression and writing run on a background thread (BackgroundWriter)
+    :return: text file object
+    """
+    if compression is not None and compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError('compression must be None or one of {}'.format(', '.join(COMPRESSION_EXTENSIONS)))
+
+    if compression == 'gzip':
+        # Level 6 (as gzip on the command line) rather than the slow default of 9
+        binary = gzip.open(output, 'wb', compresslevel=6)
+    elif compression == 'bz2':
+        binary = bz2.open(output, 'wb')
+    elif compression == 'zstd':
+        import zstandard
+        binary = zstandard.open(output, 'wb')
+    else:
+        binary = open(output, 'wb')
+
+    if threaded:
+        # Text is handed to the thread in 1 MB blocks
+        binary = io.BufferedWriter(BackgroundWriter(binary), buffer_size=2 ** 20)
+
+    return io.TextIOWrapper(binary, encoding='utf8', newline='')
+
+
 def clean_column(x):
     """
     Reformats column names to for database
@@ -280,11 +788,26 @@ def clean_column(x):
 
 def convert_geom_col(df, geom_name="geom"):
     """
+    Converts a column of WKB (hex or bytes) to WKT. With shapely 2 the whole column is converted at once
+    (from_wkb/to_wkt); otherwise one geometry at a time.
     df: DataFrame
     geom_name: column of geom to be converted, defaulted to "geom"
     """
     if geom_name in df.columns:
-        df[geom_name] = df[geom_name].apply(lambda x: wkb.loads(x, hex=True).wkt if x else None)
+        import shapely
+
+        if hasattr(shapely, 'to_wkt'):
+            # Empty values and nulls become None, as below
+            values = df[geom_name].values
+            present = df[geom_name].notnull().values & df[geom_name].astype(bool).values
+            geoms = shapely.from_wkb(np.where(present, values, None))
+
+            # Full precision, as geometry.wkt
+            df[geom_name] = shapely.to_wkt(geoms, rounding_precision=-1)
+        else:
+            from shapely import wkb
+
+            df[geom_name] = df[geom_name].apply(lambda x: wkb.loads(x, hex=True).wkt if x else None)
 
     return df
 